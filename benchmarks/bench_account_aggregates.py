@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: features + targets from one per-account aggregation
+
+Times the two separate passes (the feature pipeline's groupby and
+create_target_variable's own groupby over the raw transactions) against
+build_features_and_aggregates followed by targets_from_aggregates, which
+group the transactions by account once.
+
+Usage (from the repository root):
+    python benchmarks/bench_account_aggregates.py                # 100k and 1M rows
+    python benchmarks/bench_account_aggregates.py 200000         # custom sizes
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from feature_engineering import create_feature_pipeline, build_features_and_aggregates
+from target_generator import create_target_variable, targets_from_aggregates
+
+def make_transactions(n_rows, n_accounts=None, seed=0):
+    rng = np.random.RandomState(seed)
+    n_accounts = n_accounts or max(n_rows // 20, 1)
+    amount = np.round(rng.lognormal(7, 1.5, n_rows) * np.where(rng.rand(n_rows) < 0.3, -1, 1), 0)
+    times = pd.Timestamp('2018-11-15', tz='UTC') + pd.to_timedelta(rng.randint(0, 90 * 86400, n_rows), unit='s')
+    return pd.DataFrame({
+        'AccountId': np.char.add('AccountId_', rng.randint(0, n_accounts, n_rows).astype(str)),
+        'ProviderId': np.char.add('ProviderId_', rng.randint(1, 7, n_rows).astype(str)),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv'], n_rows),
+        'ChannelId': np.char.add('ChannelId_', rng.randint(1, 5, n_rows).astype(str)),
+        'Amount': amount,
+        'Value': np.abs(amount).astype(np.int64),
+        'TransactionStartTime': times,
+        'FraudResult': (rng.rand(n_rows) < 0.002).astype(np.int64),
+    })
+
+def separate(df):
+    return create_feature_pipeline().fit_transform(df), create_target_variable(df)
+
+def combined(df):
+    feature_df, _, aggregates = build_features_and_aggregates(df)
+    return feature_df, targets_from_aggregates(aggregates)
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main(sizes):
+    print(f"{'rows':>10} {'targets only':>13} {'separate':>10} {'combined':>10} {'saved':>8}")
+    for n_rows in sizes:
+        df = make_transactions(n_rows)
+        _, targets_seconds = timed(create_target_variable, df)
+        (_, separate_targets), separate_seconds = timed(separate, df)
+        (_, combined_targets), combined_seconds = timed(combined, df)
+        pd.testing.assert_frame_equal(combined_targets, separate_targets)
+        print(f"{n_rows:>10,} {targets_seconds:>12.2f}s {separate_seconds:>9.2f}s {combined_seconds:>9.2f}s "
+              f"{1 - combined_seconds / separate_seconds:>7.0%}")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
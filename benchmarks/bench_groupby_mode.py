@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-account mode aggregation, lambda vs vectorized groupby_mode
+
+Usage (from the repository root):
+    python benchmarks/bench_groupby_mode.py            # 100k, 1M and 10M rows
+    python benchmarks/bench_groupby_mode.py 100000     # custom sizes
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from feature_engineering import groupby_mode
+
+MODE_COLUMNS = ['ProductCategory', 'ProviderId', 'ChannelId']
+
+def make_transactions(n_rows, seed=0):
+    """Transaction-shaped frame with roughly 25 transactions per account"""
+    rng = np.random.RandomState(seed)
+    n_accounts = max(n_rows // 25, 1)
+    return pd.DataFrame({
+        'AccountId': np.char.add('AccountId_', rng.randint(0, n_accounts, n_rows).astype(str)),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill',
+                                       'data_bundles', 'tv', 'ticket', 'movies', 'transport', 'other'], n_rows),
+        'ProviderId': np.char.add('ProviderId_', rng.randint(1, 7, n_rows).astype(str)),
+        'ChannelId': np.char.add('ChannelId_', rng.randint(1, 5, n_rows).astype(str)),
+    })
+
+def lambda_modes(df):
+    mode = lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0]
+    return df.groupby('AccountId').agg({col: mode for col in MODE_COLUMNS})
+
+def vectorized_modes(df):
+    return pd.DataFrame({col: groupby_mode(df['AccountId'], df[col].values) for col in MODE_COLUMNS})
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000, 10_000_000]
+    print(f"{'rows':>12} {'accounts':>10} {'lambda (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n_rows in sizes:
+        df = make_transactions(n_rows)
+        lambda_time, expected = timed(lambda_modes, df)
+        vector_time, result = timed(vectorized_modes, df)
+        assert result.equals(expected), "vectorized modes differ from the lambda implementation"
+        print(f"{n_rows:>12,} {len(expected):>10,} {lambda_time:>12.2f} {vector_time:>15.3f} "
+              f"{lambda_time / vector_time:>8.1f}x")
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: RFM recency and clustering for large customer counts
+
+Times the per-customer lambda recency against the vectorized groupby max,
+and full-batch KMeans against the minibatch and sampled-init modes of
+cluster_rfm, including how many high-risk labels each mode changes, and
+the per-call latency of labelling one new customer with assign_proxy_label
+from the persisted clustering (the /proxy-label path).
+
+Usage (from the repository root):
+    python benchmarks/bench_rfm.py                 # 100k and 1M customers
+    python benchmarks/bench_rfm.py 200000          # custom sizes
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from proxy_target_engineering import (CLUSTERING_METHODS, RFM_COLUMNS, calculate_rfm, cluster_rfm, assign_high_risk,
+                                      high_risk_cluster, save_proxy_label_model, load_proxy_label_model,
+                                      assign_proxy_label)
+
+def make_transactions(n_customers, per_customer=5, seed=0):
+    rng = np.random.RandomState(seed)
+    n_rows = n_customers * per_customer
+    return pd.DataFrame({
+        'CustomerId': rng.randint(0, n_customers, n_rows),
+        'TransactionStartTime': pd.Timestamp('2018-11-15') + pd.to_timedelta(rng.randint(0, 90 * 86400, n_rows), unit='s'),
+        'TransactionId': np.arange(n_rows),
+        'Value': rng.lognormal(7, 1.5, n_rows).round(),
+    })
+
+def lambda_recency(df):
+    snapshot_date = df['TransactionStartTime'].max() + pd.Timedelta(days=1)
+    return df.groupby('CustomerId')['TransactionStartTime'].agg(lambda x: (snapshot_date - x.max()).days)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def single_row_latency(clustered, model, n_calls=1000):
+    """Mean seconds per assign_proxy_label call on one customer row"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = save_proxy_label_model(model, high_risk_cluster(clustered), None, os.path.join(directory, 'proxy.json'))
+        proxy_model = load_proxy_label_model(path)
+    row = clustered[RFM_COLUMNS].to_numpy()[:1]
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        assign_proxy_label(row, proxy_model)
+    return (time.perf_counter() - start) / n_calls
+
+def main(sizes):
+    for n_customers in sizes:
+        df = make_transactions(n_customers)
+        print(f"\n{n_customers:,} customers, {len(df):,} transactions")
+        _, lambda_seconds = timed(lambda_recency, df)
+        rfm, vectorized_seconds = timed(calculate_rfm, df)
+        print(f"  recency   lambda {lambda_seconds:8.2f}s  vectorized {vectorized_seconds:8.2f}s "
+              f"({lambda_seconds / vectorized_seconds:.0f}x)")
+        labels = {}
+        for method in CLUSTERING_METHODS:
+            (clustered, model), seconds = timed(cluster_rfm, rfm.copy(), method=method)
+            labels[method] = assign_high_risk(clustered)['is_high_risk'].to_numpy()
+            changed = (labels[method] != labels['kmeans']).mean()
+            print(f"  {method:<10} {seconds:8.2f}s  high-risk {labels[method].mean():6.1%}  "
+                  f"labels differing from kmeans {changed:6.2%}")
+        print(f"  assign_proxy_label, one customer: {single_row_latency(clustered, model) * 1e6:.1f}us per call")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100000, 1000000])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: RiskFeatureExtractor.transform cost against batch size
+
+Compares recomputing the fraud rates and Value quantiles from every batch
+(the previous behaviour) with the fitted lookup tables.
+
+Usage (from the repository root):
+    python benchmarks/bench_risk_features.py            # fit on 1M rows
+    python benchmarks/bench_risk_features.py 200000     # custom training size
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from feature_engineering import RiskFeatureExtractor
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+
+def make_transactions(n_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill',
+                                       'data_bundles', 'tv', 'ticket', 'movies', 'transport', 'other'], n_rows),
+        'ProviderId': np.char.add('ProviderId_', rng.randint(1, 7, n_rows).astype(str)),
+        'Value': rng.lognormal(7, 1.5, n_rows).round().astype(np.int64),
+        'FraudResult': (rng.rand(n_rows) < 0.002).astype(np.int8),
+    })
+
+def recompute_transform(X):
+    """Per-batch statistics, as transform used to compute them"""
+    X_copy = X.copy()
+    fraud_by_category = X_copy.groupby('ProductCategory', observed=True)['FraudResult'].mean()
+    fraud_by_provider = X_copy.groupby('ProviderId', observed=True)['FraudResult'].mean()
+    X_copy['category_fraud_rate'] = X_copy['ProductCategory'].map(fraud_by_category).astype(float)
+    X_copy['provider_fraud_rate'] = X_copy['ProviderId'].map(fraud_by_provider).astype(float)
+    X_copy['high_value_transaction'] = (X_copy['Value'] > X_copy['Value'].quantile(0.95)).astype(int)
+    X_copy['low_value_transaction'] = (X_copy['Value'] < X_copy['Value'].quantile(0.05)).astype(int)
+    return X_copy
+
+def timed(fn, X, min_seconds=0.2):
+    """Mean seconds per call over enough repetitions to fill min_seconds"""
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+def main(n_train=1_000_000):
+    train = make_transactions(n_train)
+    start = time.perf_counter()
+    extractor = RiskFeatureExtractor().fit(train)
+    print(f"fit on {n_train:,} rows: {time.perf_counter() - start:.3f}s")
+    print(f"{'batch':>8} {'recompute':>12} {'fitted':>12} {'speedup':>8}")
+    for batch_size in BATCH_SIZES:
+        batch = make_transactions(batch_size, seed=batch_size)
+        recompute = timed(recompute_transform, batch)
+        fitted = timed(extractor.transform, batch)
+        print(f"{batch_size:>8,} {recompute * 1e3:>10.3f}ms {fitted * 1e3:>10.3f}ms {recompute / fitted:>7.1f}x")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
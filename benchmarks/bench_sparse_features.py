@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of the preprocessed feature matrix by categorical encoding
+
+Builds the account features of synthetic transactions with many providers
+and channels under each encoding (dense one-hot, sparse one-hot, capped
+one-hot, hashed) and reports the matrix width, the bytes held by the feature
+frame and by the training matrix, and the peak traced memory of the build.
+
+Usage (from the repository root):
+    python benchmarks/bench_sparse_features.py                  # 200k rows, 500 providers
+    python benchmarks/bench_sparse_features.py 1000000 2000     # custom rows / providers
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from feature_engineering import build_features
+from model_training import feature_matrix
+
+# (encoding, sparse_output)
+CASES = [('onehot', False), ('onehot', True), ('capped', True), ('hashed', True)]
+
+def make_transactions(n_rows, n_providers, n_accounts=None, seed=0):
+    rng = np.random.RandomState(seed)
+    n_accounts = n_accounts or max(n_rows // 20, 1)
+    amount = np.round(rng.lognormal(7, 1.5, n_rows) * np.where(rng.rand(n_rows) < 0.3, -1, 1), 0)
+    times = pd.Timestamp('2018-11-15', tz='UTC') + pd.to_timedelta(rng.randint(0, 90 * 86400, n_rows), unit='s')
+    # Each account mostly uses its own provider and channel, so the per-account
+    # modes that get one-hot encoded span every ID
+    accounts = rng.randint(0, n_accounts, n_rows)
+    usual = rng.rand(n_rows) < 0.8
+    providers = np.where(usual, rng.randint(0, n_providers, n_accounts)[accounts], rng.randint(0, n_providers, n_rows))
+    n_channels = max(n_providers // 5, 1)
+    channels = np.where(usual, rng.randint(0, n_channels, n_accounts)[accounts], rng.randint(0, n_channels, n_rows))
+    return pd.DataFrame({
+        'AccountId': np.char.add('AccountId_', accounts.astype(str)),
+        'ProviderId': np.char.add('ProviderId_', providers.astype(str)),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv'], n_rows),
+        'ChannelId': np.char.add('ChannelId_', channels.astype(str)),
+        'Amount': amount,
+        'Value': np.abs(amount).astype(np.int64),
+        'TransactionStartTime': times,
+        'FraudResult': (rng.rand(n_rows) < 0.002).astype(np.int64),
+    })
+
+def matrix_bytes(matrix):
+    if sparse.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+def main(n_rows=200_000, n_providers=500):
+    df = make_transactions(n_rows, n_providers)
+    print(f"{n_rows:,} transactions, {df['AccountId'].nunique():,} accounts, "
+          f"{df['ProviderId'].nunique()} providers, {df['ChannelId'].nunique()} channels")
+    print(f"{'encoding':<16} {'columns':>8} {'frame (MB)':>11} {'matrix (MB)':>12} {'peak (MB)':>10} {'time (s)':>9}")
+    for encoding, sparse_output in CASES:
+        tracemalloc.start()
+        start = time.perf_counter()
+        feature_df, _ = build_features(df, encoding=encoding, sparse_output=sparse_output)
+        X = feature_matrix(feature_df.drop(columns=['AccountId']), sparse_matrix=sparse_output)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        frame_mb = feature_df.drop(columns=['AccountId']).memory_usage(index=False).sum() / 1024**2
+        name = f"{encoding}{' (sparse)' if sparse_output else ''}"
+        print(f"{name:<16} {X.shape[1]:>8} {frame_mb:>11.1f} {matrix_bytes(X) / 1024**2:>12.1f} "
+              f"{peak / 1024**2:>10.1f} {elapsed:>9.2f}")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CSV vs Parquet for the processed model dataset
+
+Compares file size, full load time and the column-projected load used by
+model_training.py on a synthetic model_data_with_proxy-shaped frame.
+
+Usage (from the repository root):
+    python benchmarks/bench_storage.py [n_rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from storage import frame_columns, read_frame, write_frame
+
+def make_model_data(n_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame(rng.randn(n_rows, 21), columns=[f'num_feature_{i}' for i in range(21)])
+    for i in range(15):
+        df[f'cat_dummy_{i}'] = (rng.rand(n_rows) < 0.2).astype(float)
+    df['AccountId'] = np.char.add('AccountId_', np.arange(n_rows).astype(str))
+    df['default_risk'] = rng.randint(0, 2, n_rows)
+    df['risk_category'] = rng.choice(['low_risk', 'medium_risk', 'high_risk', 'very_high_risk'], n_rows)
+    df['risk_score'] = rng.rand(n_rows) * 100
+    df['is_high_risk'] = rng.randint(0, 2, n_rows)
+    return df
+
+def timed(fn, *args, repeat=3, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    df = make_model_data(n_rows)
+    non_features = ['AccountId', 'default_risk', 'risk_category', 'risk_score']
+    print(f"{n_rows:,} rows x {df.shape[1]} columns")
+    print(f"{'format':>8} {'size (MB)':>10} {'write (s)':>10} {'load (s)':>9} {'projected (s)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ['csv', 'parquet']:
+            path = os.path.join(tmp, f'model_data_with_proxy.{fmt}')
+            write_time = timed(write_frame, df, path, repeat=1)
+            columns = [col for col in frame_columns(path) if col not in non_features]
+            load_time = timed(read_frame, path)
+            projected_time = timed(read_frame, path, columns=columns)
+            size = os.path.getsize(path) / 1024 ** 2
+            print(f"{fmt:>8} {size:>10.1f} {write_time:>10.2f} {load_time:>9.2f} {projected_time:>14.2f}")
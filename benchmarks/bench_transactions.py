@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: scoring one account's raw transactions (/predict/transactions)
+
+Times the fitted feature pipeline's transform on one account's transactions
+against TransactionFeaturizer, which compiles the pipeline to numpy, and the
+whole endpoint through an in-process ASGI client.
+
+Usage (from the repository root):
+    python benchmarks/bench_transactions.py              # 20 transactions per account
+    python benchmarks/bench_transactions.py 200          # custom transactions per account
+"""
+
+import asyncio
+import os
+import sys
+import time
+import httpx
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from src.feature_engineering import build_features
+from src.api.pydantic_models import TransactionRecord
+from src.api.transactions import TransactionFeaturizer
+from src.api import main as api
+
+def make_transactions(n_rows, n_accounts, seed=0):
+    rng = np.random.RandomState(seed)
+    amount = np.round(rng.lognormal(7, 1.5, n_rows) * np.where(rng.rand(n_rows) < 0.3, -1, 1), 0)
+    times = pd.Timestamp('2018-11-15', tz='UTC') + pd.to_timedelta(rng.randint(0, 90 * 86400, n_rows), unit='s')
+    return pd.DataFrame({
+        'AccountId': np.char.add('AccountId_', rng.randint(0, n_accounts, n_rows).astype(str)),
+        'ProviderId': np.char.add('ProviderId_', rng.randint(1, 7, n_rows).astype(str)),
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv'], n_rows),
+        'ChannelId': np.char.add('ChannelId_', rng.randint(1, 5, n_rows).astype(str)),
+        'Amount': amount,
+        'Value': np.abs(amount).astype(np.int64),
+        'TransactionStartTime': times.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'FraudResult': (rng.rand(n_rows) < 0.01).astype(np.int64),
+    })
+
+def per_call(fn, n_calls):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+def main(per_account=20, n_calls=200):
+    df = make_transactions(per_account * 500, 500)
+    feature_df, pipeline = build_features(df.copy())
+    X = feature_df.drop(columns='AccountId')
+    model = LogisticRegression().fit(X, np.arange(len(X)) % 2)
+    featurizer = TransactionFeaturizer(pipeline)
+
+    account_id = df['AccountId'].iloc[0]
+    rows = df[df['AccountId'] == account_id]
+    records = [TransactionRecord(**record) for record in rows.to_dict('records')]
+    pipeline_seconds = per_call(lambda: pipeline.transform(rows), n_calls)
+    featurizer_seconds = per_call(lambda: featurizer.transform(records), n_calls)
+
+    api.featurizer = featurizer
+    api.model_manager.swap('1', model)
+    payload = {'account_id': account_id, 'transactions': rows.drop(columns=['AccountId']).to_dict('records')}
+
+    async def endpoint():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            await client.post('/predict/transactions', json=payload)
+            start = time.perf_counter()
+            for _ in range(n_calls):
+                await client.post('/predict/transactions', json=payload)
+            return (time.perf_counter() - start) / n_calls
+
+    endpoint_seconds = asyncio.run(endpoint())
+    api.executor.shutdown()
+    print(f"{len(rows)} transactions per request, {n_calls} calls")
+    print(f"  pipeline.transform       {pipeline_seconds * 1e3:8.2f}ms")
+    print(f"  TransactionFeaturizer    {featurizer_seconds * 1e3:8.2f}ms  "
+          f"({pipeline_seconds / featurizer_seconds:.0f}x)")
+    print(f"  /predict/transactions    {endpoint_seconds * 1e3:8.2f}ms")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: 7/30/90-day account windows over many snapshot dates
+
+Times filtering the transaction frame and grouping it once per snapshot and
+window against TransactionIndex, which sorts the transactions once and
+answers every snapshot with binary searches and prefix sums.
+
+Usage (from the repository root):
+    python benchmarks/bench_windows.py                   # 1M rows, 30 snapshots
+    python benchmarks/bench_windows.py 200000 90         # custom rows / snapshots
+"""
+
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from transaction_index import TransactionIndex, DEFAULT_WINDOWS
+
+def make_transactions(n_rows, n_accounts=None, seed=0):
+    rng = np.random.RandomState(seed)
+    n_accounts = n_accounts or max(n_rows // 20, 1)
+    amount = np.round(rng.lognormal(7, 1.5, n_rows), 0)
+    return pd.DataFrame({
+        'AccountId': rng.randint(0, n_accounts, n_rows),
+        'TransactionStartTime': pd.Timestamp('2018-11-15', tz='UTC') + pd.to_timedelta(
+            rng.randint(0, 180 * 86400, n_rows), unit='s'),
+        'Amount': amount,
+        'Value': amount.astype(np.int64),
+        'FraudResult': (rng.rand(n_rows) < 0.002).astype(np.int64),
+    })
+
+def filtered(df, snapshot_date):
+    """One boolean filter and groupby per window"""
+    frames = []
+    for days in DEFAULT_WINDOWS:
+        times = df['TransactionStartTime']
+        grouped = df[(times >= snapshot_date - pd.Timedelta(days=days)) & (times < snapshot_date)].groupby('AccountId')
+        frames.append(grouped.agg(count=('Value', 'size'), value=('Value', 'sum'),
+                                  amount=('Amount', 'sum'), fraud=('FraudResult', 'sum')))
+    return frames
+
+def main(n_rows=1_000_000, n_snapshots=30):
+    df = make_transactions(n_rows)
+    snapshots = pd.date_range('2019-01-15', periods=n_snapshots, freq='D', tz='UTC')
+
+    start = time.perf_counter()
+    for snapshot_date in snapshots:
+        filtered(df, snapshot_date)
+    filter_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = TransactionIndex.from_frame(df)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for snapshot_date in snapshots:
+        index.window_features(snapshot_date)
+    query_seconds = time.perf_counter() - start
+
+    print(f"{n_rows:,} transactions, {len(index.accounts):,} accounts, {n_snapshots} snapshots x {DEFAULT_WINDOWS} days")
+    print(f"  filter + groupby    {filter_seconds:8.2f}s  ({filter_seconds / n_snapshots * 1e3:.1f}ms per snapshot)")
+    print(f"  index build         {build_seconds:8.2f}s")
+    print(f"  index queries       {query_seconds:8.2f}s  ({query_seconds / n_snapshots * 1e3:.1f}ms per snapshot)")
+    print(f"  speedup incl. build {filter_seconds / (build_seconds + query_seconds):8.1f}x")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
@@ -0,0 +1,143 @@
+"""
+Micro-batching of concurrent prediction requests
+"""
+
+import asyncio
+import time
+import numpy as np
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus-style cumulative counts"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self):
+        cumulative = np.cumsum(self.counts).tolist()
+        buckets = {str(bound): n for bound, n in zip(self.bounds, cumulative)}
+        buckets['+Inf'] = cumulative[-1]
+        return {
+            'buckets': buckets,
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0.0
+        }
+
+
+class MicroBatcher:
+    """Coalesce single-row predictions into vectorized batches.
+
+    Rows submitted within `max_wait_ms` of the first queued row (or until
+    `max_batch_size` rows are queued) are stacked into one matrix and scored
+    by `predict` in a worker thread (through a BoundedExecutor when one is
+    given); each caller gets its own probability. A row submitted with its
+    own `predict` (e.g. the model snapshot its features were built for) is
+    scored by that function, together with the batch's other rows that share it.
+    """
+
+    def __init__(self, predict=None, max_batch_size=64, max_wait_ms=2.0, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_MS_BUCKETS)
+        self._queue = None
+        self._worker = None
+        self._in_flight = set()
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, row, predict=None):
+        """Queue one float64 feature row and wait for its probability"""
+        predict = predict or self.predict
+        if predict is None:
+            raise ValueError("no predict function for this row")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter(), predict))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        # Dispatch each batch as its own task so the next one can be collected
+        # while earlier batches are still being scored
+        while True:
+            batch = await self._collect()
+            dispatched = time.perf_counter()
+            self.batch_size.observe(len(batch))
+            for _, _, enqueued, _ in batch:
+                self.queue_wait_ms.observe((dispatched - enqueued) * 1000.0)
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[3], []).append(item)
+            for predict, rows in groups.items():
+                task = asyncio.ensure_future(self._score(predict, rows))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+    async def _score(self, predict, batch):
+        X = np.vstack([row for row, _, _, _ in batch])
+        try:
+            if self.executor is not None:
+                probabilities = await self.executor.run(predict, X)
+            else:
+                probabilities = await asyncio.get_running_loop().run_in_executor(None, predict, X)
+        except Exception as e:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _, _), probability in zip(batch, probabilities):
+            if not future.done():
+                future.set_result(float(probability))
+
+    def metrics(self):
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'batch_size': self.batch_size.snapshot(),
+            'queue_wait_ms': self.queue_wait_ms.snapshot()
+        }
@@ -0,0 +1,84 @@
+"""
+Bounded executor that keeps CPU-bound inference off the event loop
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .inference import RowScorer
+
+
+class QueueFullError(Exception):
+    """Raised when the inference queue cannot take another job"""
+
+    def __init__(self, in_flight, capacity):
+        super().__init__(f"Inference queue is full ({in_flight}/{capacity} jobs in flight)")
+        self.in_flight = in_flight
+        self.capacity = capacity
+
+
+# Process workers load their own copy of the model once, in the initializer
+_worker_scorer = None
+
+
+def _init_worker(model):
+    global _worker_scorer
+    _worker_scorer = RowScorer(model)
+
+
+def worker_predict(X):
+    """Score X with the model loaded into this worker process"""
+    return _worker_scorer.predict(X)
+
+
+class BoundedExecutor:
+    """Run inference jobs in a thread or process pool with a bounded backlog.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait; `run` raises QueueFullError instead of queueing beyond that.
+    The in-flight counter is only touched from the event loop thread.
+    """
+
+    def __init__(self, kind='thread', max_workers=None, max_queue=64):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers or min(32, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.pool = None
+        if kind == 'thread':
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='inference')
+
+    def set_model(self, model):
+        """Give process workers a (new) model; thread workers share the caller's.
+
+        A fresh process pool is started for every model so jobs already
+        running on the old pool finish with the model they started on.
+        """
+        if self.kind != 'process':
+            return
+        old_pool = self.pool
+        self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                        initializer=_init_worker, initargs=(model,))
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    @property
+    def capacity(self):
+        return self.max_workers + self.max_queue
+
+    async def run(self, fn, *args):
+        if self.pool is None:
+            raise RuntimeError("process executor has no model yet; call set_model first")
+        if self.in_flight >= self.capacity:
+            raise QueueFullError(self.in_flight, self.capacity)
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+    def shutdown(self, wait=True):
+        if self.pool is not None:
+            self.pool.shutdown(wait=wait)
@@ -0,0 +1,203 @@
+"""
+Vectorized inference helpers shared by the prediction endpoints
+"""
+
+from operator import attrgetter
+import numpy as np
+from scipy.special import expit
+from pydantic import ValidationError
+from .pydantic_models import PredictionRequest
+
+# Column order of the feature matrix handed to the model
+FEATURE_COLUMNS = list(getattr(PredictionRequest, 'model_fields', None) or PredictionRequest.__fields__)
+
+LOW_RISK_THRESHOLD = 0.3
+HIGH_RISK_THRESHOLD = 0.7
+
+
+def risk_category(risk_probability):
+    """Map a probability (or an array of probabilities) to low/medium/high"""
+    probabilities = np.asarray(risk_probability, dtype=np.float64)
+    categories = np.where(
+        probabilities < LOW_RISK_THRESHOLD, 'low',
+        np.where(probabilities < HIGH_RISK_THRESHOLD, 'medium', 'high')
+    )
+    return categories.item() if categories.ndim == 0 else categories
+
+
+def prediction_confidence(risk_probability):
+    """Confidence based on the probability distance from 0.5"""
+    return np.abs(np.asarray(risk_probability, dtype=np.float64) - 0.5) * 2
+
+
+def columns_to_records(columns):
+    """Turn a columnar body ({feature: [values]}) into a list of row dicts"""
+    if not isinstance(columns, dict) or not columns:
+        raise ValueError("'columns' must be a non-empty object of equal-length lists")
+    lengths = {len(values) if isinstance(values, list) else -1 for values in columns.values()}
+    if len(lengths) != 1 or -1 in lengths:
+        raise ValueError("all columns must be lists of the same length")
+    n_rows = lengths.pop()
+    return [{name: values[i] for name, values in columns.items()} for i in range(n_rows)]
+
+
+def records_to_matrix(records, feature_columns=FEATURE_COLUMNS):
+    """Validate raw records and stack the valid ones into a float64 matrix.
+
+    Returns the matrix, the positions of the rows it contains and a dict of
+    validation errors keyed by position, so one bad record does not fail the
+    whole batch.
+    """
+    X = np.empty((len(records), len(feature_columns)), dtype=np.float64)
+    valid_index = []
+    errors = {}
+    for position, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[position] = [{'loc': [], 'msg': 'record must be a JSON object', 'type': 'type_error'}]
+            continue
+        try:
+            validated = PredictionRequest(**record)
+        except ValidationError as e:
+            errors[position] = [
+                {'loc': list(err['loc']), 'msg': err['msg'], 'type': err['type']} for err in e.errors()
+            ]
+            continue
+        row = X[len(valid_index)]
+        for j, name in enumerate(feature_columns):
+            row[j] = getattr(validated, name)
+        valid_index.append(position)
+    return X[:len(valid_index)], valid_index, errors
+
+
+def score_matrix(model, X):
+    """Positive-class probabilities for every row of X in one predict_proba call"""
+    if X.shape[0] == 0:
+        return np.empty(0, dtype=np.float64)
+    return np.asarray(model.predict_proba(X)[:, 1], dtype=np.float64)
+
+
+def model_feature_order(model):
+    """Request schema fields in the order the model was fitted with.
+
+    A model fitted without feature names is taken to use the schema order.
+    Raises ValueError when the model's feature names are not schema fields
+    (e.g. the num_*/cat_* names of a model trained on the feature frame), or
+    when an unnamed model expects a different number of features.
+    """
+    names = getattr(model, 'feature_names_in_', None)
+    if names is not None:
+        unknown = [str(name) for name in names if name not in FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Model features are not PredictionRequest fields: {unknown[:5]}"
+                             f"{' ...' if len(unknown) > 5 else ''}")
+        return [str(name) for name in names]
+    n_features = getattr(model, 'n_features_in_', len(FEATURE_COLUMNS))
+    if n_features != len(FEATURE_COLUMNS):
+        raise ValueError(f"Model expects {n_features} features; PredictionRequest has {len(FEATURE_COLUMNS)}")
+    return list(FEATURE_COLUMNS)
+
+
+def _compile_logistic_regression(model):
+    coef = np.ascontiguousarray(model.coef_[0], dtype=np.float64)
+    intercept = float(model.intercept_[0])
+    
+    def score(X):
+        # expit like sklearn's predict_proba: no overflow warning for large |z|
+        return expit(X @ coef + intercept)
+    
+    return score
+
+
+def _compile_random_forest(model):
+    """Flatten every tree into shared node arrays and walk all trees at once.
+
+    Leaves point to themselves, so after max_depth steps every (row, tree)
+    pair sits on its leaf; thresholds are compared in float32 like sklearn.
+    """
+    left, right, feature, threshold, leaf_proba, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        value = tree.value[:, 0, :]
+        leaf_proba.append(value[:, 1] / value.sum(axis=1))
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+    left, right = np.concatenate(left), np.concatenate(right)
+    feature, threshold = np.concatenate(feature), np.concatenate(threshold)
+    leaf_proba = np.concatenate(leaf_proba)
+    roots = np.asarray(roots)
+    
+    def score(X):
+        X32 = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X32.shape[0])[:, None]
+        nodes = np.broadcast_to(roots, (X32.shape[0], roots.size))
+        for _ in range(max_depth):
+            go_left = X32[rows, feature[nodes]] <= threshold[nodes]
+            nodes = np.where(go_left, left[nodes], right[nodes])
+        return leaf_proba[nodes].mean(axis=1)
+    
+    return score
+
+
+def compile_scorer(model):
+    """Return a function mapping a float64 matrix to positive-class probabilities.
+
+    LogisticRegression and RandomForestClassifier (the families trained in
+    model_training.py) are scored straight from their fitted arrays, skipping
+    sklearn's input validation; any other model goes through predict_proba.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.ensemble import RandomForestClassifier
+    
+    if getattr(model, 'classes_', None) is not None and len(model.classes_) == 2:
+        if isinstance(model, LogisticRegression):
+            return _compile_logistic_regression(model)
+        if isinstance(model, RandomForestClassifier):
+            return _compile_random_forest(model)
+    return lambda X: score_matrix(model, X)
+
+
+class RowScorer:
+    """Score validated requests without going through pandas
+    
+    A model whose features cannot be taken from a PredictionRequest still
+    scores prebuilt matrices with `predict`; `feature_order` and `row` then
+    raise the model_feature_order error.
+    """
+    
+    def __init__(self, model):
+        self.model = model
+        self._feature_order, self._order_error = None, None
+        try:
+            self._feature_order = model_feature_order(model)
+            self._get_features = attrgetter(*self._feature_order)
+        except ValueError as e:
+            self._order_error = str(e)
+        self._score = compile_scorer(model)
+    
+    @property
+    def feature_order(self):
+        if self._feature_order is None:
+            raise ValueError(self._order_error)
+        return self._feature_order
+    
+    def row(self, request):
+        """Validated PredictionRequest -> (1, n_features) float64 row"""
+        row = np.fromiter(self._get_features(request), dtype=np.float64, count=len(self.feature_order))
+        return row.reshape(1, -1)
+    
+    def predict(self, X):
+        if X.shape[0] == 0:
+            return np.empty(0, dtype=np.float64)
+        return self._score(X)
+    
+    def score_request(self, request):
+        return float(self.predict(self.row(request))[0])
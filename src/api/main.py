@@ -1,52 +1,331 @@
-from fastapi import FastAPI, HTTPException
-import mlflow
-import pandas as pd
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+import asyncio
+import json
+import logging
+import os
 import numpy as np
-from .pydantic_models import PredictionRequest, PredictionResponse, HealthResponse
+from .pydantic_models import (
+    PredictionRequest, PredictionResponse, HealthResponse,
+    BatchPredictionResult, BatchPredictionResponse, AccountPredictionResponse,
+    TransactionsRequest, TransactionsPredictionResponse,
+    ProxyLabelRequest, ProxyLabelResult, ProxyLabelResponse
+)
+from .inference import (
+    risk_category as categorize_risk, prediction_confidence as confidence_of,
+    columns_to_records, records_to_matrix
+)
+from .batching import MicroBatcher
+from .executor import BoundedExecutor, QueueFullError, worker_predict
+from .transactions import TransactionFeaturizer, load_feature_pipeline
+from .model_manager import ModelManager, DEFAULT_MODEL_NAME, DEFAULT_MODEL_STAGE, DEFAULT_CACHE_DIR
+from ..score_store import ScoreStore
+from ..proxy_target_engineering import RFM_COLUMNS, assign_proxy_label, load_proxy_label_model
 
-app = FastAPI(title="Credit Risk API", version="1.0.0")
+logger = logging.getLogger(__name__)
 
-# Load model from MLflow registry
-try:
-    model = mlflow.sklearn.load_model("models:/credit-risk-proxy-best/Production")
-except:
-    # Fallback to local model if registry is not available
-    model = mlflow.sklearn.load_model("mlruns/0/latest/artifacts/best_model")
+# Model is resolved from the registry lazily (or in the startup hook) and
+# cached on local disk per version
+MODEL_NAME = os.getenv('MODEL_NAME', DEFAULT_MODEL_NAME)
+MODEL_STAGE = os.getenv('MODEL_STAGE', DEFAULT_MODEL_STAGE)
+MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', DEFAULT_CACHE_DIR)
+MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', '1').lower() in ('1', 'true', 'yes')
+MODEL_POLL_INTERVAL = float(os.getenv('MODEL_POLL_INTERVAL', '0'))
+
+# Precomputed per-account features and scores written by data_processor.py
+SCORE_STORE_PATH = os.getenv('SCORE_STORE_PATH', 'data/processed/scores.sqlite')
+SCORE_CACHE_SIZE = int(os.getenv('SCORE_CACHE_SIZE', '10000'))
+
+# Fitted feature pipeline written by data_processor.py, for raw-transaction scoring
+FEATURE_PIPELINE_PATH = os.getenv('FEATURE_PIPELINE_PATH', 'data/processed/feature_pipeline.pkl')
+
+# RFM scaler and centroids written by the proxy-label stage, for labelling new customers
+PROXY_MODEL_PATH = os.getenv('PROXY_MODEL_PATH', 'data/processed/proxy_label_model.json')
+
+# Inference runs in a bounded thread or process pool, never on the event loop
+INFERENCE_EXECUTOR = os.getenv('INFERENCE_EXECUTOR', 'thread')
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', '0')) or None
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', '64'))
+
+# Optional micro-batching of concurrent /predict calls
+MICROBATCH_ENABLED = os.getenv('MICROBATCH_ENABLED', '0').lower() in ('1', 'true', 'yes')
+MICROBATCH_MAX_BATCH_SIZE = int(os.getenv('MICROBATCH_MAX_BATCH_SIZE', '64'))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', '2.0'))
+
+model_manager = ModelManager(MODEL_NAME, MODEL_STAGE, MODEL_CACHE_DIR)
+
+executor = BoundedExecutor(INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_MAX_QUEUE)
+model_manager.on_swap(lambda loaded: executor.set_model(loaded.model))
+
+score_store = ScoreStore(SCORE_STORE_PATH, memory_size=SCORE_CACHE_SIZE)
+
+def _invalidate_scores(loaded):
+    if score_store.exists():
+        score_store.invalidate(loaded.version)
+
+model_manager.on_swap(_invalidate_scores)
+
+featurizer = None
+
+def get_featurizer():
+    """Compiled feature pipeline, loaded on first use"""
+    global featurizer
+    if featurizer is None:
+        if not os.path.exists(FEATURE_PIPELINE_PATH):
+            raise HTTPException(status_code=503,
+                                detail="Feature pipeline not built; run data_processor.py (from src/) first")
+        featurizer = TransactionFeaturizer(load_feature_pipeline(FEATURE_PIPELINE_PATH))
+    return featurizer
+
+proxy_model = None
+
+def get_proxy_model():
+    """Persisted RFM clustering, loaded on first use"""
+    global proxy_model
+    if proxy_model is None:
+        if not os.path.exists(PROXY_MODEL_PATH):
+            raise HTTPException(status_code=503,
+                                detail="Proxy label model not built; run proxy_target_engineering.py first")
+        proxy_model = load_proxy_label_model(PROXY_MODEL_PATH)
+    return proxy_model
+
+def _predict_fn(loaded):
+    """Job submitted to the executor for a given model snapshot"""
+    return worker_predict if INFERENCE_EXECUTOR == 'process' else loaded.scorer.predict
+
+batcher = None
+if MICROBATCH_ENABLED:
+    batcher = MicroBatcher(max_batch_size=MICROBATCH_MAX_BATCH_SIZE,
+                           max_wait_ms=MICROBATCH_MAX_WAIT_MS, executor=executor)
+
+@asynccontextmanager
+async def lifespan(app):
+    if MODEL_PRELOAD:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, model_manager.refresh)
+        except Exception as e:
+            logger.warning("Model preload failed, loading on first request instead: %s", e)
+    if MODEL_POLL_INTERVAL > 0:
+        model_manager.start_polling(MODEL_POLL_INTERVAL)
+    yield
+    model_manager.stop_polling()
+    if batcher is not None:
+        await batcher.stop()
+    executor.shutdown(wait=False)
+    score_store.close()
+
+app = FastAPI(title="Credit Risk API", version="1.0.0", lifespan=lifespan)
+
+async def get_model():
+    """Current model snapshot, loaded off the event loop on first use"""
+    loaded = model_manager.current
+    if loaded is None:
+        try:
+            loaded = await asyncio.get_running_loop().run_in_executor(None, model_manager.get)
+        except Exception as e:
+            raise HTTPException(status_code=503, detail=f"Model unavailable: {str(e)}")
+    return loaded
+
+def _queue_full(error):
+    """503 telling the client how busy the inference queue is and when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail=str(error),
+        headers={
+            "Retry-After": "1",
+            "X-Inference-Queue-Depth": str(error.in_flight),
+            "X-Inference-Queue-Capacity": str(error.capacity)
+        }
+    )
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
+    loaded = model_manager.current
     return HealthResponse(
         status="healthy",
-        model_version="1.0.0"
+        model_version=loaded.version if loaded is not None else "not loaded"
     )
 
+def _request_feature_order(loaded):
+    """The model's order of PredictionRequest fields; 503 when it was not
+    trained on them"""
+    try:
+        return loaded.scorer.feature_order
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Model version {loaded.version} cannot score "
+                                                    f"PredictionRequest features: {e}")
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_risk(request: PredictionRequest):
+    loaded = await get_model()
+    _request_feature_order(loaded)
     try:
-        # Convert request to DataFrame
-        features = pd.DataFrame([request.dict()])
-        
-        # Make prediction
-        risk_probability = model.predict_proba(features)[0][1]
+        # Score a float64 row in the model's feature order, no DataFrame needed
+        if batcher is not None:
+            risk_probability = await batcher.submit(loaded.scorer.row(request)[0], _predict_fn(loaded))
+        else:
+            risk_probability = float((await executor.run(_predict_fn(loaded), loaded.scorer.row(request)))[0])
         
         # Determine risk category
-        if risk_probability < 0.3:
-            risk_category = "low"
-        elif risk_probability < 0.7:
-            risk_category = "medium"
-        else:
-            risk_category = "high"
+        risk_category = categorize_risk(risk_probability)
         
         # Calculate confidence based on probability distance from 0.5
-        prediction_confidence = abs(risk_probability - 0.5) * 2
+        prediction_confidence = confidence_of(risk_probability)
         
         return PredictionResponse(
             risk_probability=float(risk_probability),
             risk_category=risk_category,
             prediction_confidence=float(prediction_confidence)
         )
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+def _parse_batch_body(body, content_type):
+    """Decode a batch body: a JSON array of records, {"records": [...]},
+    {"columns": {feature: [values]}} or newline-delimited JSON records"""
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        records = []
+        for line_number, line in enumerate(body.decode('utf-8').splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+        return records
+    
+    payload = json.loads(body)
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict) and 'records' in payload:
+        if not isinstance(payload['records'], list):
+            raise ValueError("'records' must be a list")
+        return payload['records']
+    if isinstance(payload, dict) and 'columns' in payload:
+        return columns_to_records(payload['columns'])
+    raise ValueError("Body must be a list of records, {'records': [...]} or {'columns': {...}}")
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_risk_batch(request: Request):
+    try:
+        records = _parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+    
+    # Validate per row and score all valid rows in one predict_proba call
+    loaded = await get_model()
+    X, valid_index, errors = records_to_matrix(records, _request_feature_order(loaded))
+    try:
+        probabilities = await executor.run(_predict_fn(loaded), X) if len(valid_index) else np.empty(0)
+    except QueueFullError as e:
+        raise _queue_full(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    categories = categorize_risk(probabilities)
+    confidences = confidence_of(probabilities)
+    
+    results = [BatchPredictionResult(index=position, errors=row_errors)
+               for position, row_errors in errors.items()]
+    results.extend(
+        BatchPredictionResult(
+            index=position,
+            risk_probability=float(probabilities[i]),
+            risk_category=str(categories[i]),
+            prediction_confidence=float(confidences[i])
+        )
+        for i, position in enumerate(valid_index)
+    )
+    results.sort(key=lambda result: result.index)
+    
+    return BatchPredictionResponse(results=results, n_scored=len(valid_index), n_failed=len(errors))
+
+@app.get("/predict/account/{account_id}", response_model=AccountPredictionResponse)
+async def predict_account(account_id: str):
+    if not score_store.exists():
+        raise HTTPException(status_code=503, detail="Score store not built; run data_processor.py first")
+    loaded = await get_model()
+    
+    risk_probability = score_store.get_score(account_id, loaded.version)
+    cached = risk_probability is not None
+    if not cached:
+        features = score_store.get_features(account_id, _model_columns(loaded))
+        if features is None:
+            raise HTTPException(status_code=404, detail=f"Unknown account: {account_id}")
+        try:
+            risk_probability = float((await executor.run(_predict_fn(loaded), features.reshape(1, -1)))[0])
+        except QueueFullError as e:
+            raise _queue_full(e)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+        score_store.put_score(account_id, loaded.version, risk_probability)
+    
+    return AccountPredictionResponse(
+        account_id=account_id,
+        model_version=loaded.version,
+        cached=cached,
+        risk_probability=risk_probability,
+        risk_category=categorize_risk(risk_probability),
+        prediction_confidence=float(confidence_of(risk_probability))
+    )
+
+@app.post("/predict/transactions", response_model=TransactionsPredictionResponse)
+async def predict_transactions(request: TransactionsRequest):
+    compiled = get_featurizer()
+    loaded = await get_model()
+    try:
+        X = compiled.transform(request.transactions)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        positions = compiled.column_positions(loaded.model)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"Model version {loaded.version} cannot score "
+                                                    f"feature pipeline rows: {e}")
+    if positions is not None:
+        X = X[:, positions]
+    try:
+        risk_probability = float((await executor.run(_predict_fn(loaded), X))[0])
+    except QueueFullError as e:
+        raise _queue_full(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+    
+    return TransactionsPredictionResponse(
+        account_id=request.account_id,
+        transaction_count=len(request.transactions),
+        model_version=loaded.version,
+        risk_probability=risk_probability,
+        risk_category=categorize_risk(risk_probability),
+        prediction_confidence=float(confidence_of(risk_probability))
+    )
+
+@app.post("/proxy-label", response_model=ProxyLabelResponse)
+async def proxy_label(request: ProxyLabelRequest):
+    model = get_proxy_model()
+    rows = np.array([[getattr(customer, col) for col in RFM_COLUMNS] for customer in request.customers])
+    is_high_risk, cluster = assign_proxy_label(rows, model)
+    return ProxyLabelResponse(results=[
+        ProxyLabelResult(is_high_risk=int(label), cluster=int(c)) for label, c in zip(is_high_risk, cluster)
+    ])
+
+def _model_columns(loaded):
+    """Stored columns reordered to the model's training order when it is known"""
+    names = getattr(loaded.model, 'feature_names_in_', None)
+    if names is not None and set(names) <= set(score_store.columns):
+        return [str(name) for name in names]
+    return None
+
+@app.get("/metrics/score-cache")
+async def score_cache_metrics():
+    return score_store.metrics()
+
+@app.get("/metrics/batching")
+async def batching_metrics():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.metrics()}
 
 @app.get("/")
 async def root():
@@ -0,0 +1,168 @@
+"""
+Lazy, hot-swappable model loading backed by a local artifact cache
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from collections import namedtuple
+import mlflow
+import mlflow.sklearn
+from mlflow.tracking import MlflowClient
+from .inference import RowScorer
+
+DEFAULT_MODEL_NAME = 'credit-risk-proxy-best'
+DEFAULT_MODEL_STAGE = 'Production'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'credit-risk-model', 'models')
+
+# Immutable snapshot of the serving model; requests hold on to the snapshot
+# they started with, so a swap never changes the model under their feet
+LoadedModel = namedtuple('LoadedModel', ['version', 'model', 'scorer'])
+
+
+class ModelUnavailableError(Exception):
+    """Raised when neither the registry nor the local cache can provide a model"""
+
+
+class ModelManager:
+    """Resolve, cache and serve the current registry version of the model.
+
+    Nothing is loaded until `get` is first called (or `refresh` is called from
+    a startup hook). Each resolved version is downloaded once into
+    `cache_dir/<name>/<version>` and later loads of that version, including
+    after a restart while the registry is down, read from disk.
+    `start_polling` checks the registry in a background thread and swaps in
+    new versions atomically.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, stage=DEFAULT_MODEL_STAGE,
+                 cache_dir=DEFAULT_CACHE_DIR, client=None):
+        self.model_name = model_name
+        self.stage = stage
+        self.cache_dir = cache_dir
+        self._client = client
+        self._current = None
+        self._load_lock = threading.Lock()
+        self._swap_callbacks = []
+        self._stop_polling = threading.Event()
+        self._poller = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = MlflowClient()
+        return self._client
+
+    @property
+    def current(self):
+        """The loaded model snapshot, or None if nothing has been loaded yet"""
+        return self._current
+
+    def on_swap(self, callback):
+        """Register callback(loaded_model) to run after every swap"""
+        self._swap_callbacks.append(callback)
+
+    def resolve_version(self):
+        """Latest registry version in the configured stage (any stage if stage is None)"""
+        versions = self.client.search_model_versions(f"name='{self.model_name}'")
+        if self.stage:
+            versions = [v for v in versions if v.current_stage == self.stage]
+        if not versions:
+            raise ModelUnavailableError(
+                f"No version of '{self.model_name}' in stage '{self.stage}'"
+            )
+        return str(max(int(v.version) for v in versions))
+
+    def cached_versions(self):
+        model_dir = os.path.join(self.cache_dir, self.model_name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted((v for v in os.listdir(model_dir) if v.isdigit()), key=int)
+
+    def _cache_path(self, version):
+        return os.path.join(self.cache_dir, self.model_name, version)
+
+    def _fetch(self, version):
+        """Download a version into the cache unless it is already there"""
+        path = self._cache_path(version)
+        if os.path.isdir(path):
+            return path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f'.{version}-', dir=os.path.dirname(path))
+        try:
+            mlflow.artifacts.download_artifacts(
+                artifact_uri=f"models:/{self.model_name}/{version}", dst_path=staging
+            )
+            # Rename is atomic, so a half-written download is never picked up
+            os.rename(staging, path)
+        except OSError:
+            # Another process cached the same version first
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return path
+
+    def swap(self, version, model):
+        """Serve `model` as `version` from now on"""
+        loaded = LoadedModel(version=version, model=model, scorer=RowScorer(model))
+        self._current = loaded
+        for callback in self._swap_callbacks:
+            callback(loaded)
+        return loaded
+
+    def refresh(self):
+        """Load the registry's current version if it differs from the served one.
+
+        Falls back to the newest cached version when the registry cannot be
+        reached and nothing is loaded yet. Returns True when a swap happened.
+        """
+        with self._load_lock:
+            try:
+                version = self.resolve_version()
+            except Exception:
+                if self._current is not None:
+                    return False
+                cached = self.cached_versions()
+                if not cached:
+                    raise ModelUnavailableError(
+                        f"Model registry unavailable and no cached version of '{self.model_name}'"
+                    )
+                version = cached[-1]
+            if self._current is not None and self._current.version == version:
+                return False
+            model = mlflow.sklearn.load_model(self._fetch(version))
+            self.swap(version, model)
+            return True
+
+    def get(self):
+        """Return the current model snapshot, loading it on first use"""
+        loaded = self._current
+        if loaded is None:
+            self.refresh()
+            loaded = self._current
+        return loaded
+
+    def start_polling(self, interval):
+        """Check the registry for a new version every `interval` seconds"""
+        if self._poller is not None:
+            return
+        self._stop_polling.clear()
+
+        def poll():
+            while not self._stop_polling.wait(interval):
+                try:
+                    self.refresh()
+                except Exception:
+                    # Keep serving the current version; try again next tick
+                    pass
+
+        self._poller = threading.Thread(target=poll, name='model-poller', daemon=True)
+        self._poller.start()
+
+    def stop_polling(self):
+        if self._poller is not None:
+            self._stop_polling.set()
+            self._poller.join()
+            self._poller = None
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class PredictionRequest(BaseModel):
@@ -29,6 +30,56 @@ class PredictionResponse(BaseModel):
     risk_category: str
     prediction_confidence: float
 
+class AccountPredictionResponse(PredictionResponse):
+    account_id: str
+    model_version: str
+    cached: bool
+
+class TransactionRecord(BaseModel):
+    TransactionStartTime: datetime
+    Amount: float
+    Value: int
+    ProductCategory: str
+    ProviderId: str
+    ChannelId: str
+    FraudResult: int = 0
+
+class TransactionsRequest(BaseModel):
+    account_id: Optional[str] = None
+    transactions: List[TransactionRecord] = Field(..., min_length=1)
+
+class TransactionsPredictionResponse(PredictionResponse):
+    account_id: Optional[str] = None
+    transaction_count: int
+    model_version: str
+
+class RFMRecord(BaseModel):
+    Recency: float
+    Frequency: float
+    Monetary: float
+
+class ProxyLabelRequest(BaseModel):
+    customers: List[RFMRecord] = Field(..., min_length=1)
+
+class ProxyLabelResult(BaseModel):
+    is_high_risk: int
+    cluster: int
+
+class ProxyLabelResponse(BaseModel):
+    results: List[ProxyLabelResult]
+
 class HealthResponse(BaseModel):
     status: str
     model_version: str
+
+class BatchPredictionResult(BaseModel):
+    index: int
+    risk_probability: Optional[float] = None
+    risk_category: Optional[str] = None
+    prediction_confidence: Optional[float] = None
+    errors: Optional[List[dict]] = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionResult]
+    n_scored: int
+    n_failed: int
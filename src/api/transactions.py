@@ -0,0 +1,152 @@
+"""
+Compiled feature pipeline for scoring one account's raw transactions
+"""
+
+from collections import Counter
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.preprocessing import OneHotEncoder
+
+
+def load_feature_pipeline(path):
+    return joblib.load(path)
+
+
+def _mode(values):
+    """Most frequent value; ties go to the smallest value like Series.mode"""
+    counts = Counter(values)
+    return min(counts, key=lambda value: (-counts[value], value))
+
+
+def _std(x):
+    return float(x.std(ddof=1)) if len(x) > 1 else np.nan
+
+
+class TransactionFeaturizer:
+    """The fitted feature pipeline compiled to numpy for a single account.
+
+    Equivalent to `pipeline.transform(transactions)` for one account: fraud
+    rates, value thresholds, scaler statistics and one-hot positions are read
+    out of the fitted steps once, so each call is a few array reductions with
+    no DataFrame, groupby or sklearn input validation.
+    """
+
+    def __init__(self, pipeline):
+        risk = pipeline.named_steps['feature_extraction'].named_steps['risk_extractor']
+        self.category_rates = dict(zip(risk.category_values_, risk.category_rates_))
+        self.provider_rates = dict(zip(risk.provider_values_, risk.provider_rates_))
+        self.fallback_rate = risk.global_fraud_rate_
+        self.high_value_threshold = risk.high_value_threshold_
+        self.low_value_threshold = risk.low_value_threshold_
+
+        preprocessor = pipeline.named_steps['preprocessor']
+        transformers = {name: (step, columns) for name, step, columns in preprocessor.transformers_}
+        scaler, self.numerical_columns = transformers['num']
+        encoder, self.categorical_columns = transformers['cat']
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+
+        # Output position of every kept category; the dropped one encodes as all zeros.
+        # Capped and hashed encodings keep the fitted encoder and call it per request.
+        self.one_hot, self.encoder = [], None
+        offset = len(self.numerical_columns)
+        if isinstance(encoder, OneHotEncoder) and encoder.max_categories is None and encoder.min_frequency is None:
+            for j, categories in enumerate(encoder.categories_):
+                dropped = encoder.drop_idx_[j] if encoder.drop_idx_ is not None else None
+                kept = [category for i, category in enumerate(categories) if i != dropped]
+                self.one_hot.append(({category: offset + i for i, category in enumerate(kept)}, set(categories)))
+                offset += len(kept)
+        else:
+            self.encoder = encoder
+            offset += len(encoder.get_feature_names_out())
+        self.n_features = offset
+        self.feature_names = (
+            [f'num_{col}' for col in scaler.get_feature_names_out()] +
+            [f'cat_{col}' for col in encoder.get_feature_names_out()]
+        )
+
+    def aggregates(self, transactions):
+        """CustomerAggregator's rounded columns plus the ratio features, as a dict"""
+        n = len(transactions)
+        amount = np.fromiter((t.Amount for t in transactions), np.float64, n)
+        value = np.fromiter((t.Value for t in transactions), np.float64, n)
+        fraud = np.fromiter((t.FraudResult for t in transactions), np.float64, n)
+        hour = np.fromiter((t.TransactionStartTime.hour for t in transactions), np.float64, n)
+        day_of_week = np.fromiter((t.TransactionStartTime.weekday() for t in transactions), np.float64, n)
+        category_rate = np.fromiter(
+            (self.category_rates.get(t.ProductCategory, self.fallback_rate) for t in transactions), np.float64, n)
+        provider_rate = np.fromiter(
+            (self.provider_rates.get(t.ProviderId, self.fallback_rate) for t in transactions), np.float64, n)
+
+        features = {
+            'total_amount': amount.sum(),
+            'avg_amount': amount.mean(),
+            'std_amount': _std(amount),
+            'transaction_count': n,
+            'total_value': value.sum(),
+            'avg_value': value.mean(),
+            'fraud_count': fraud.sum(),
+            'fraud_rate': fraud.mean(),
+            'avg_category_fraud_rate': category_rate.mean(),
+            'avg_provider_fraud_rate': provider_rate.mean(),
+            'high_value_count': int((value > self.high_value_threshold).sum()),
+            'low_value_count': int((value < self.low_value_threshold).sum()),
+            'weekend_ratio': (day_of_week >= 5).mean(),
+            'avg_hour': hour.mean(),
+            'std_hour': _std(hour),
+            'avg_day_of_week': day_of_week.mean(),
+            'std_day_of_week': _std(day_of_week),
+        }
+        features = {name: float(np.round(x, 4)) for name, x in features.items()}
+        features['amount_volatility'] = features['std_amount'] / (features['avg_amount'] or 1)
+        features['value_volatility'] = features['std_amount'] / (features['avg_value'] or 1)
+        features['high_value_ratio'] = features['high_value_count'] / n
+        features['low_value_ratio'] = features['low_value_count'] / n
+        for col in self.categorical_columns:
+            features[col] = _mode([getattr(t, col) for t in transactions])
+        return features
+
+    def transform(self, transactions):
+        """Validated TransactionRecords of one account -> (1, n_features) float64 row"""
+        features = self.aggregates(transactions)
+        row = np.zeros((1, self.n_features), dtype=np.float64)
+        numerical = np.fromiter((features[col] for col in self.numerical_columns), np.float64,
+                                len(self.numerical_columns))
+        if not np.isfinite(numerical).all():
+            raise ValueError("At least two transactions are needed for the std features")
+        row[0, :len(numerical)] = (numerical - self.mean) / self.scale
+        if self.encoder is not None:
+            encoded = self.encoder.transform(pd.DataFrame(
+                [[features[col] for col in self.categorical_columns]], columns=self.categorical_columns))
+            row[0, len(numerical):] = encoded.toarray()[0] if sparse.issparse(encoded) else encoded[0]
+        for col, (positions, known) in zip(self.categorical_columns, self.one_hot):
+            category = features[col]
+            if category not in known:
+                raise ValueError(f"Unknown {col} '{category}'; the feature pipeline was fitted without it")
+            if category in positions:
+                row[0, positions[category]] = 1.0
+        return row
+
+    def column_positions(self, model):
+        """Positions reordering transform's columns to the model's training order,
+        or None when they already match (or an unnamed model has as many).
+
+        Raises ValueError when the model was fitted on other features.
+        """
+        names = getattr(model, 'feature_names_in_', None)
+        if names is None:
+            n_features = getattr(model, 'n_features_in_', len(self.feature_names))
+            if n_features != len(self.feature_names):
+                raise ValueError(f"Model expects {n_features} features; "
+                                 f"the feature pipeline builds {len(self.feature_names)}")
+            return None
+        if list(names) == self.feature_names:
+            return None
+        unknown = [str(name) for name in names if name not in set(self.feature_names)]
+        if unknown:
+            raise ValueError(f"Model features are not feature pipeline columns: {unknown[:5]}"
+                             f"{' ...' if len(unknown) > 5 else ''}")
+        index = {name: i for i, name in enumerate(self.feature_names)}
+        return [index[name] for name in names]
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Point-in-Time Backtests for Credit Risk
+Rebuild features and proxy labels from the transactions before each snapshot
+date, then train and score the model families as model_training does
+"""
+
+import argparse
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from joblib import parallel_config
+
+try:
+    from .feature_engineering import build_features_and_aggregates
+    from .proxy_target_engineering import create_proxy_labels, attach_high_risk
+    from .model_search import SEARCH_MODES
+    from .model_training import N_CPUS, TrainingConfig, split_rows, split_training_data, select_families, fit_family
+    from .transaction_index import TransactionIndex, DEFAULT_WINDOWS
+    from .storage import load_raw_transactions, RAW_DATA_PATH
+except ImportError:
+    from feature_engineering import build_features_and_aggregates
+    from proxy_target_engineering import create_proxy_labels, attach_high_risk
+    from model_search import SEARCH_MODES
+    from model_training import N_CPUS, TrainingConfig, split_rows, split_training_data, select_families, fit_family
+    from transaction_index import TransactionIndex, DEFAULT_WINDOWS
+    from storage import load_raw_transactions, RAW_DATA_PATH
+
+# `windows` adds TransactionIndex rolling features (standardized) next to the
+# pipeline features; an empty tuple leaves them out. `max_workers` snapshots
+# run at once, sharing the training n_jobs.
+BacktestConfig = namedtuple('BacktestConfig', [
+    'snapshot_dates', 'raw_path', 'windows', 'max_workers', 'training'
+], defaults=[
+    RAW_DATA_PATH, DEFAULT_WINDOWS, int(os.getenv('BACKTEST_WORKERS', '2')), TrainingConfig(register=False)
+])
+
+SnapshotResult = namedtuple('SnapshotResult', [
+    'snapshot_date', 'n_transactions', 'n_accounts', 'high_risk_rate', 'best_family', 'metrics',
+    'family_metrics', 'dataset_seconds', 'training_seconds', 'total_seconds'
+])
+
+# Set once per worker process by _init_worker
+_transactions, _times, _index = None, None, None
+
+
+def prepare_transactions(df, windows=DEFAULT_WINDOWS):
+    """Parse and sort the transactions by time once, so each snapshot is a
+    leading slice.
+
+    Returns the sorted frame, its int64 nanosecond times and, when `windows`
+    is set, a TransactionIndex over all transactions.
+    """
+    times = pd.DatetimeIndex(pd.to_datetime(df['TransactionStartTime'])).as_unit('ns')
+    order = np.argsort(times.asi8, kind='stable')
+    df = df.assign(TransactionStartTime=times).iloc[order].reset_index(drop=True)
+    index = TransactionIndex.from_frame(df) if windows else None
+    return df, times.asi8[order], index
+
+
+def _init_worker(transactions, times, index):
+    global _transactions, _times, _index
+    _transactions, _times, _index = transactions, times, index
+
+
+def _snapshot_timestamp(snapshot_date, tz):
+    snapshot_date = pd.Timestamp(snapshot_date)
+    if tz is not None and snapshot_date.tzinfo is None:
+        snapshot_date = snapshot_date.tz_localize(tz)
+    return snapshot_date
+
+
+def _n_before(transactions, times, snapshot_date):
+    """Snapshot timestamp and number of sorted transactions before it; raises
+    ValueError when there are none"""
+    snapshot_date = _snapshot_timestamp(snapshot_date, transactions['TransactionStartTime'].dt.tz)
+    n_before = int(np.searchsorted(times, snapshot_date.as_unit('ns').value))
+    if n_before == 0:
+        first = transactions['TransactionStartTime'].iloc[0] if len(transactions) else None
+        raise ValueError(f"Snapshot {snapshot_date}: no transactions before it (first transaction: {first})")
+    return snapshot_date, n_before
+
+
+def snapshot_dataset(transactions, times, snapshot_date, index=None, windows=DEFAULT_WINDOWS,
+                     test_size=0.2, random_state=42):
+    """Model frame built only from the transactions before `snapshot_date`.
+
+    Features come from the feature pipeline fitted on those transactions and
+    is_high_risk from RFM clustering with recency measured at the snapshot.
+    The rolling features are standardized with the statistics of the train
+    rows of split_training_data(test_size, random_state) only.
+    Returns the frame and the number of transactions used; raises ValueError
+    when the snapshot has no earlier transactions or a single label class.
+    """
+    snapshot_date, n_before = _n_before(transactions, times, snapshot_date)
+    before = transactions.iloc[:n_before]
+    feature_df, _, _ = build_features_and_aggregates(before)
+    rfm_high_risk, account_customer_map = create_proxy_labels(before, snapshot_date=snapshot_date)
+    model_data = attach_high_risk(feature_df, rfm_high_risk, account_customer_map)
+    if model_data['is_high_risk'].nunique() < 2:
+        raise ValueError(f"Snapshot {snapshot_date}: every one of the {len(model_data)} accounts has "
+                         f"is_high_risk={model_data['is_high_risk'].iloc[0]}; nothing to train on")
+    if index is not None and windows:
+        rolling = index.window_features(snapshot_date, windows, accounts=model_data['AccountId'])
+        train_rows, _ = split_rows(model_data['is_high_risk'], test_size, random_state)
+        train = rolling.iloc[train_rows]
+        rolling = (rolling - train.mean()) / train.std(ddof=0).replace(0, 1)
+        model_data = pd.concat([model_data, rolling.add_prefix('num_').reset_index(drop=True)], axis=1)
+    # Std features of single-transaction accounts are NaN; 0 is the standardized mean
+    numeric = model_data.columns.drop(['AccountId', 'is_high_risk'])
+    model_data[numeric] = model_data[numeric].fillna(0)
+    return model_data, len(before)
+
+
+def run_snapshot(snapshot_date, windows, training, n_jobs):
+    """Build one snapshot's dataset in this worker and train every family on it"""
+    start = time.perf_counter()
+    model_data, n_transactions = snapshot_dataset(_transactions, _times, snapshot_date, _index, windows,
+                                                  training.test_size, training.random_state)
+    dataset_seconds = time.perf_counter() - start
+
+    data = split_training_data(model_data, training.test_size, training.random_state, training.sparse)
+    family_metrics = {}
+    # Searches use threads here: joblib worker processes started inside a
+    # pool worker outlive it and block the pool's shutdown
+    with parallel_config(backend='threading'):
+        for name, family in select_families(training).items():
+            _, family_metrics[name], _, _ = fit_family(family, data, training, n_jobs)
+    best_family = max(family_metrics, key=lambda name: family_metrics[name]['f1'])
+    total_seconds = time.perf_counter() - start
+    return SnapshotResult(
+        snapshot_date=pd.Timestamp(snapshot_date), n_transactions=n_transactions,
+        n_accounts=len(model_data), high_risk_rate=float(model_data['is_high_risk'].mean()),
+        best_family=best_family, metrics=family_metrics[best_family], family_metrics=family_metrics,
+        dataset_seconds=dataset_seconds, training_seconds=total_seconds - dataset_seconds,
+        total_seconds=total_seconds
+    )
+
+
+def run_backtest(config, transactions=None):
+    """SnapshotResult of every config.snapshot_dates entry, in the given order.
+
+    The raw transactions are loaded and sorted once (or taken from
+    `transactions`); worker processes receive them when they start and reuse
+    them for every snapshot they run. Snapshot dates before the first
+    transaction are rejected with ValueError before any work starts.
+    """
+    if transactions is None:
+        transactions = load_raw_transactions(config.raw_path)
+    shared = prepare_transactions(transactions, config.windows)
+    for snapshot_date in config.snapshot_dates:
+        _n_before(shared[0], shared[1], snapshot_date)
+    workers = max(1, min(config.max_workers, len(config.snapshot_dates)))
+    total_jobs = config.training.n_jobs if config.training.n_jobs > 0 else N_CPUS
+    n_jobs = max(1, total_jobs // workers)
+    args = [(date, config.windows, config.training, n_jobs) for date in config.snapshot_dates]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=shared) as pool:
+        return list(pool.map(run_snapshot, *zip(*args)))
+
+
+def print_report(results):
+    print(f"{'snapshot':<12} {'txns':>9} {'accounts':>9} {'high risk':>9} {'best':<20} "
+          f"{'f1':>6} {'roc_auc':>7} {'data (s)':>9} {'train (s)':>9}")
+    for result in results:
+        print(f"{result.snapshot_date.date()!s:<12} {result.n_transactions:>9,} {result.n_accounts:>9,} "
+              f"{result.high_risk_rate:>9.3f} {result.best_family:<20} {result.metrics['f1']:>6.3f} "
+              f"{result.metrics['roc_auc']:>7.3f} {result.dataset_seconds:>9.2f} {result.training_seconds:>9.2f}")
+
+
+def parse_args(argv=None):
+    defaults = BacktestConfig(snapshot_dates=())
+    parser = argparse.ArgumentParser(description="Point-in-time backtest over snapshot dates")
+    parser.add_argument('snapshot_dates', nargs='+', type=pd.Timestamp)
+    parser.add_argument('--raw', dest='raw_path', default=defaults.raw_path)
+    parser.add_argument('--windows', type=int, nargs='*', default=list(defaults.windows),
+                        help="rolling windows in days; pass no value to leave them out")
+    parser.add_argument('--workers', dest='max_workers', type=int, default=defaults.max_workers)
+    parser.add_argument('--families', nargs='+', default=list(defaults.training.families))
+    parser.add_argument('--search', choices=SEARCH_MODES, default=defaults.training.search)
+    parser.add_argument('--cv', type=int, default=defaults.training.cv)
+    parser.add_argument('--n-jobs', type=int, default=defaults.training.n_jobs)
+    args = parser.parse_args(argv)
+    training = defaults.training._replace(families=tuple(args.families), search=args.search,
+                                          cv=args.cv, n_jobs=args.n_jobs)
+    return BacktestConfig(snapshot_dates=args.snapshot_dates, raw_path=args.raw_path,
+                          windows=tuple(args.windows), max_workers=args.max_workers, training=training)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    print_report(run_backtest(parse_args()))
+    print(f"Total: {time.perf_counter() - start:.1f}s")
@@ -3,49 +3,231 @@
 Main Data Processing Script for Credit Scoring Model
 """
 
-import pandas as pd
 import numpy as np
-from feature_engineering import load_and_process_data, save_features
-from target_generator import create_target_variable, save_targets
 import os
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-def create_model_dataset():
-    """Create the final model-ready dataset"""
+try:
+    from .feature_engineering import build_features_and_aggregates, save_features
+    from .target_generator import targets_from_aggregates, save_targets
+    from .proxy_target_engineering import create_proxy_labels, attach_high_risk, PROXY_MODEL_PATH
+    from .score_store import ScoreStore, DEFAULT_SCORE_STORE_PATH
+    from .storage import save_dataset, load_dataset, load_raw_transactions, write_feature_store
+    from .storage import RAW_DATA_PATH, FEATURE_STORE_DIR
+except ImportError:
+    from feature_engineering import build_features_and_aggregates, save_features
+    from target_generator import targets_from_aggregates, save_targets
+    from proxy_target_engineering import create_proxy_labels, attach_high_risk, PROXY_MODEL_PATH
+    from score_store import ScoreStore, DEFAULT_SCORE_STORE_PATH
+    from storage import save_dataset, load_dataset, load_raw_transactions, write_feature_store
+    from storage import RAW_DATA_PATH, FEATURE_STORE_DIR
+
+TARGET_COLUMNS = ['default_risk', 'risk_category', 'risk_score']
+# Integer targets kept as vectors in the feature store
+STORE_TARGET_COLUMNS = ['is_high_risk', 'default_risk']
+
+# Score every stored account with the registered model at the end of a batch
+# run (same MODEL_* settings as the API)
+PRECOMPUTE_SCORES = os.getenv('PRECOMPUTE_SCORES', '1').lower() in ('1', 'true', 'yes')
+
+class StageReport:
+    """Wall time and peak traced memory of each pipeline stage"""
+    
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = []
+    
+    @contextmanager
+    def stage(self, name):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - baseline if self.trace_memory else None
+        self.stages.append((name, elapsed, peak))
+    
+    def record(self, name, elapsed):
+        """Add a stage timed elsewhere (e.g. in a worker thread)"""
+        self.stages.append((name, elapsed, None))
+    
+    def print(self):
+        print(f"\n{'Stage':<40} {'Time (s)':>9} {'Peak (MB)':>10}")
+        for name, elapsed, peak in self.stages:
+            peak_text = f"{peak / 1024**2:>10.1f}" if peak is not None else f"{'-':>10}"
+            print(f"{name:<40} {elapsed:>9.2f} {peak_text}")
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def merge_features_and_targets(feature_df, targets):
+    """Join account features with their target variables"""
+    return feature_df.merge(targets[['AccountId'] + TARGET_COLUMNS], on='AccountId', how='inner')
+
+def default_model_manager():
+    # Imported here so a run that does not score accounts never loads MLflow
+    try:
+        from .api.model_manager import ModelManager, DEFAULT_MODEL_NAME, DEFAULT_MODEL_STAGE, DEFAULT_CACHE_DIR
+    except ImportError:
+        from api.model_manager import ModelManager, DEFAULT_MODEL_NAME, DEFAULT_MODEL_STAGE, DEFAULT_CACHE_DIR
+    return ModelManager(os.getenv('MODEL_NAME', DEFAULT_MODEL_NAME), os.getenv('MODEL_STAGE', DEFAULT_MODEL_STAGE),
+                        os.getenv('MODEL_CACHE_DIR', DEFAULT_CACHE_DIR))
+
+def precompute_account_scores(store, model_manager=None):
+    """Score every stored account with the current registered model version
+    
+    Returns the number of accounts scored, or 0 when no model can be loaded
+    (scores are then computed on the first /predict/account request).
+    """
+    model_manager = model_manager or default_model_manager()
+    try:
+        loaded = model_manager.get()
+    except Exception as e:
+        print(f"No model to precompute scores ({e}); accounts will be scored on first request")
+        return 0
+    names = getattr(loaded.model, 'feature_names_in_', None)
+    columns = [str(name) for name in names] if names is not None and set(names) <= set(store.columns) else None
+    try:
+        n_scored = store.precompute_scores(loaded.scorer.predict, loaded.version, columns)
+    except Exception as e:
+        print(f"Model version {loaded.version} cannot score the stored features ({e}); "
+              f"accounts will be scored on first request")
+        return 0
+    print(f"Precomputed scores of {n_scored} accounts with model version {loaded.version}")
+    return n_scored
+
+def save_model_dataset(model_data, feature_df, model_manager=None, precompute=PRECOMPUTE_SCORES):
+    """Save the model dataset and refresh the scored-account store
+    
+    With `precompute`, the refreshed store is also scored with the current
+    registered model, so /predict/account/{AccountId} starts with hits.
+    """
+    save_dataset(model_data, 'model_data')
+    
+    # Refresh the scored-account store served by /predict/account/{AccountId}
+    store = ScoreStore(DEFAULT_SCORE_STORE_PATH)
+    n_accounts = store.write_features(feature_df)
+    print(f"Score store refreshed: {n_accounts} accounts")
+    if precompute:
+        precompute_account_scores(store, model_manager)
+    store.close()
+
+def save_feature_store(model_data_with_proxy, directory=FEATURE_STORE_DIR):
+    """Write the feature matrix and integer targets for memory-mapped training
+    
+    Rows are stored as the train rows then the test rows of the default
+    training split, so training slices the mapped matrix instead of copying it.
+    """
+    # model_training imports MLflow; only this stage needs its split
+    try:
+        from .model_training import TrainingConfig, split_rows
+    except ImportError:
+        from model_training import TrainingConfig, split_rows
+    non_features = ['AccountId', 'is_high_risk'] + TARGET_COLUMNS
+    feature_columns = [col for col in model_data_with_proxy.columns if col not in non_features]
+    defaults = TrainingConfig()
+    train_rows, test_rows = split_rows(model_data_with_proxy['is_high_risk'], defaults.test_size,
+                                       defaults.random_state)
+    split = {'test_size': defaults.test_size, 'random_state': defaults.random_state, 'n_train': len(train_rows)}
+    write_feature_store(model_data_with_proxy, feature_columns, STORE_TARGET_COLUMNS, directory,
+                        row_order=np.concatenate([train_rows, test_rows]), split=split)
+    print(f"Feature store written: {len(model_data_with_proxy)} x {len(feature_columns)} in {directory}")
+
+def print_summary(model_data):
+    print(f"\nDataset Summary:")
+    print(f"Shape: {model_data.shape}")
+    print(f"Features: {len(model_data.columns) - 4}")  # Excluding AccountId and target columns
+    print(f"Default rate: {model_data['default_risk'].mean():.3f}")
+    print(f"Risk distribution: {model_data['risk_category'].value_counts().to_dict()}")
+
+def create_model_dataset(df=None):
+    """Create the final model-ready dataset from one load of the raw data"""
     
     # Create processed directory if it doesn't exist
     os.makedirs('../data/processed', exist_ok=True)
     
+    if df is None:
+        df = load_raw_transactions()
+    
     # Load and process features
     print("Creating features...")
-    feature_df, pipeline = load_and_process_data()
+    feature_df, pipeline, aggregates = build_features_and_aggregates(df)
     save_features(feature_df, pipeline)
     
-    # Create target variables
+    # Create target variables from the same per-account aggregates
     print("Creating target variables...")
-    df = pd.read_csv('../data/raw/data.csv')
-    targets = create_target_variable(df)
+    targets = targets_from_aggregates(aggregates)
     save_targets(targets)
     
     # Merge features and targets
     print("Merging features and targets...")
-    model_data = feature_df.merge(targets[['AccountId', 'default_risk', 'risk_category', 'risk_score']], 
-                                 on='AccountId', how='inner')
+    model_data = merge_features_and_targets(feature_df, targets)
     
     # Save final dataset
-    model_data.to_csv('../data/processed/model_data.csv', index=False)
+    save_model_dataset(model_data, feature_df)
     
     # Create summary
-    print(f"\nDataset Summary:")
-    print(f"Shape: {model_data.shape}")
-    print(f"Features: {len(model_data.columns) - 4}")  # Excluding AccountId and target columns
-    print(f"Default rate: {model_data['default_risk'].mean():.3f}")
-    print(f"Risk distribution: {model_data['risk_category'].value_counts().to_dict()}")
+    print_summary(model_data)
     
     return model_data
 
+def run_pipeline(raw_path=RAW_DATA_PATH, max_workers=2, trace_memory=True):
+    """Build features, targets and proxy labels from a single load of the raw data
+    
+    The parsed transaction frame is shared read-only by feature extraction
+    and RFM clustering, which run concurrently in threads (pandas and
+    scikit-learn release the GIL for most of their work). Targets are derived
+    from the feature pipeline's per-account aggregates, so the transactions
+    are grouped by account once for both.
+    """
+    os.makedirs('../data/processed', exist_ok=True)
+    report = StageReport(trace_memory)
+    
+    with report.stage('load raw transactions'):
+        df = load_raw_transactions(raw_path)
+    
+    with report.stage('features + targets + rfm (concurrent)'):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            features_job = pool.submit(_timed, build_features_and_aggregates, df)
+            proxy_job = pool.submit(_timed, create_proxy_labels, df, model_path=PROXY_MODEL_PATH)
+            (feature_df, pipeline, aggregates), features_time = features_job.result()
+            targets, targets_time = _timed(targets_from_aggregates, aggregates)
+            (rfm_high_risk, account_customer_map), proxy_time = proxy_job.result()
+    report.record('  features', features_time)
+    report.record('  targets', targets_time)
+    report.record('  rfm proxy labels', proxy_time)
+    
+    with report.stage('merge'):
+        model_data = merge_features_and_targets(feature_df, targets)
+        model_data_with_proxy = attach_high_risk(model_data, rfm_high_risk, account_customer_map)
+    
+    with report.stage('save'):
+        save_features(feature_df, pipeline)
+        save_targets(targets)
+        save_model_dataset(model_data, feature_df)
+        save_dataset(model_data_with_proxy, 'model_data_with_proxy')
+        save_feature_store(model_data_with_proxy)
+    
+    if trace_memory:
+        tracemalloc.stop()
+    
+    print_summary(model_data)
+    print(f"High-risk (proxy) rate: {model_data_with_proxy['is_high_risk'].mean():.3f}")
+    report.print()
+    
+    return model_data_with_proxy
+
 def get_feature_importance_data():
     """Get feature importance analysis data"""
-    model_data = pd.read_csv('../data/processed/model_data.csv')
+    model_data = load_dataset('model_data')
     
     # Separate features and target
     feature_cols = [col for col in model_data.columns if col not in 
@@ -57,5 +239,10 @@ def get_feature_importance_data():
     return X, y, feature_cols
 
 if __name__ == "__main__":
-    model_data = create_model_dataset()
-    print("Data processing completed successfully!") 
\ No newline at end of file
+    # Run the package module so the pickled feature pipeline refers to
+    # src.feature_engineering, which the API can import
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.data_processor import run_pipeline
+    model_data = run_pipeline()
+    print("Data processing completed successfully!")
@@ -12,6 +12,11 @@ import warnings
 from datetime import datetime, timedelta
 import os
 
+try:
+    from .storage import load_raw_transactions, RAW_ID_COLUMNS
+except ImportError:
+    from storage import load_raw_transactions, RAW_ID_COLUMNS
+
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
@@ -27,7 +32,7 @@ pd.set_option('display.width', 1000)
 def load_data():
     """Load the dataset and perform initial exploration"""
     print("Loading dataset...")
-    df = pd.read_csv('../data/raw/data.csv')
+    df = load_raw_transactions()
     
     print(f"Dataset loaded successfully!")
     print(f"Shape: {df.shape}")
@@ -90,14 +95,14 @@ def summary_statistics(df):
     print("="*50)
     
     # Numerical features
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    numerical_cols = df.select_dtypes(include=[np.number]).columns.difference(RAW_ID_COLUMNS, sort=False)
     print(f"Numerical columns: {list(numerical_cols)}")
     
     print("\nSummary Statistics for Numerical Features:")
     print(df[numerical_cols].describe())
     
     # Categorical features
-    categorical_cols = df.select_dtypes(include=['object']).columns
+    categorical_cols = df.select_dtypes(include=['object', 'category']).columns
     print(f"\nCategorical columns: {list(categorical_cols)}")
     
     for col in categorical_cols:
@@ -113,7 +118,7 @@ def distribution_analysis(df):
     print("DISTRIBUTION ANALYSIS")
     print("="*50)
     
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    numerical_cols = df.select_dtypes(include=[np.number]).columns.difference(RAW_ID_COLUMNS, sort=False)
     
     # Create distribution plots for numerical features
     fig, axes = plt.subplots(2, 3, figsize=(18, 12))
@@ -150,7 +155,7 @@ def correlation_analysis(df):
     print("CORRELATION ANALYSIS")
     print("="*50)
     
-    numerical_cols = df.select_dtypes(include=[np.number]).columns
+    numerical_cols = df.select_dtypes(include=[np.number]).columns.difference(RAW_ID_COLUMNS, sort=False)
     correlation_matrix = df[numerical_cols].corr()
     
     # Create correlation heatmap
@@ -219,7 +224,7 @@ def customer_behavior_analysis(df):
     print("="*50)
     
     # Customer-level analysis
-    customer_stats = df.groupby('AccountId').agg({
+    customer_stats = df.groupby('AccountId', observed=True).agg({
         'TransactionId': 'count',
         'Amount': ['sum', 'mean', 'std'],
         'Value': ['sum', 'mean'],
@@ -279,7 +284,7 @@ def fraud_analysis(df):
     print(f"\nFraud rate: {fraud_rate:.2f}%")
     
     # Fraud by category
-    fraud_by_category = df.groupby('ProductCategory')['FraudResult'].agg(['count', 'sum', 'mean'])
+    fraud_by_category = df.groupby('ProductCategory', observed=True)['FraudResult'].agg(['count', 'sum', 'mean'])
     fraud_by_category.columns = ['Total_Transactions', 'Fraud_Count', 'Fraud_Rate']
     fraud_by_category = fraud_by_category.sort_values('Fraud_Rate', ascending=False)
     
@@ -4,23 +4,169 @@ Feature Engineering Pipeline for Credit Scoring Model
 Bati Bank - Buy Now Pay Later Service
 """
 
+import os
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.pipeline import Pipeline
 from sklearn.compose import ColumnTransformer
 from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 from sklearn.impute import SimpleImputer
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.base import BaseEstimator, TransformerMixin
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .storage import save_dataset, sparse_frame, load_raw_transactions, iter_raw_transactions, RAW_DATA_PATH
+except ImportError:
+    from storage import save_dataset, sparse_frame, load_raw_transactions, iter_raw_transactions, RAW_DATA_PATH
+
+# Encoding of ProductCategory/ProviderId/ChannelId: 'onehot' (one column per
+# category, the default), 'capped' (one-hot of the FEATURE_MAX_CATEGORIES most
+# frequent categories per column plus an infrequent column) or 'hashed'
+# (`column=value` tokens hashed into FEATURE_HASH_SIZE columns). With
+# FEATURE_SPARSE the preprocessor outputs a CSR matrix.
+CATEGORICAL_ENCODINGS = ('onehot', 'capped', 'hashed')
+FEATURE_ENCODING = os.getenv('FEATURE_ENCODING', 'onehot')
+FEATURE_SPARSE = os.getenv('FEATURE_SPARSE', '0').lower() in ('1', 'true', 'yes')
+FEATURE_MAX_CATEGORIES = int(os.getenv('FEATURE_MAX_CATEGORIES', '20'))
+FEATURE_HASH_SIZE = int(os.getenv('FEATURE_HASH_SIZE', '64'))
+
+# Per-account aggregates produced by CustomerAggregator, before the ratio features
+AGGREGATED_COLUMNS = [
+    'total_amount', 'avg_amount', 'std_amount', 'transaction_count',
+    'total_value', 'avg_value', 'fraud_count', 'fraud_rate',
+    'avg_category_fraud_rate', 'avg_provider_fraud_rate',
+    'high_value_count', 'low_value_count', 'weekend_ratio',
+    'avg_hour', 'std_hour', 'avg_day_of_week', 'std_day_of_week',
+    'ProductCategory', 'ProviderId', 'ChannelId'
+]
+
+def add_ratio_features(customer_features):
+    """Volatility and value-ratio features derived from the rounded aggregates"""
+    customer_features['amount_volatility'] = (
+        customer_features['std_amount'] / 
+        customer_features['avg_amount'].replace(0, 1)
+    )
+    
+    customer_features['value_volatility'] = (
+        customer_features['std_amount'] / 
+        customer_features['avg_value'].replace(0, 1)
+    )
+    
+    customer_features['high_value_ratio'] = (
+        customer_features['high_value_count'] / 
+        customer_features['transaction_count']
+    )
+    
+    customer_features['low_value_ratio'] = (
+        customer_features['low_value_count'] / 
+        customer_features['transaction_count']
+    )
+    
+    return customer_features
+
+def groupby_mode(keys, values, max_dense_cells=50_000_000):
+    """Most frequent value of `values` per sorted group of `keys`, without Python lambdas
+    
+    Equivalent to `values.groupby(keys).agg(lambda x: x.mode().iloc[0])`:
+    values are factorized in sorted order, so on ties the smallest value wins
+    just like Series.mode. Pair counts come from one bincount over
+    (key code, value code) when that table is small enough, otherwise from
+    np.unique over the combined codes.
+    """
+    key_codes, key_uniques = pd.factorize(keys, sort=True)
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        value_codes, value_uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        value_codes, value_uniques = pd.factorize(values, sort=True)
+    n_keys, n_values = len(key_uniques), max(len(value_uniques), 1)
+    
+    # NaN values do not count towards the mode and NaN keys form no group
+    valid = (value_codes >= 0) & (key_codes >= 0)
+    combined = key_codes[valid].astype(np.int64) * n_values + value_codes[valid]
+    
+    mode_codes = np.full(n_keys, -1, dtype=np.int64)
+    if n_keys * n_values <= max_dense_cells:
+        counts = np.bincount(combined, minlength=n_keys * n_values).reshape(n_keys, n_values)
+        has_value = counts.any(axis=1)
+        mode_codes[has_value] = counts[has_value].argmax(axis=1)
+    else:
+        pairs, counts = np.unique(combined, return_counts=True)
+        pair_keys, pair_values = pairs // n_values, pairs % n_values
+        order = np.lexsort((pair_values, -counts, pair_keys))
+        first = order[np.r_[True, pair_keys[order][1:] != pair_keys[order][:-1]]]
+        mode_codes[pair_keys[first]] = pair_values[first]
+    
+    modes = pd.Series(np.asarray(value_uniques)).reindex(mode_codes).to_numpy()
+    index = pd.Index(key_uniques, name=getattr(keys, 'name', None))
+    return pd.Series(modes, index=index, name=values.name)
+
+# Per-account aggregations of one transaction frame, shared by the customer
+# features and the target variables; a source column is aggregated only if
+# present, so raw transactions give just the Amount/Value/FraudResult outputs
+ACCOUNT_AGGREGATIONS = {
+    'Amount': ['sum', 'mean', 'std', 'count'],
+    'Value': ['sum', 'mean', 'max'],
+    'FraudResult': ['sum', 'mean'],
+    'category_fraud_rate': ['mean'],
+    'provider_fraud_rate': ['mean'],
+    'high_value_transaction': ['sum'],
+    'low_value_transaction': ['sum'],
+    'is_weekend': ['mean'],
+    'hour': ['mean', 'std'],
+    'day_of_week': ['mean', 'std']
+}
+MODE_COLUMNS = ['ProductCategory', 'ProviderId', 'ChannelId']
+
+# CustomerAggregator column -> account_aggregates column
+FEATURE_AGGREGATES = {
+    'total_amount': 'Amount_sum', 'avg_amount': 'Amount_mean', 'std_amount': 'Amount_std',
+    'transaction_count': 'Amount_count', 'total_value': 'Value_sum', 'avg_value': 'Value_mean',
+    'fraud_count': 'FraudResult_sum', 'fraud_rate': 'FraudResult_mean',
+    'avg_category_fraud_rate': 'category_fraud_rate_mean', 'avg_provider_fraud_rate': 'provider_fraud_rate_mean',
+    'high_value_count': 'high_value_transaction_sum', 'low_value_count': 'low_value_transaction_sum',
+    'weekend_ratio': 'is_weekend_mean', 'avg_hour': 'hour_mean', 'std_hour': 'hour_std',
+    'avg_day_of_week': 'day_of_week_mean', 'std_day_of_week': 'day_of_week_std',
+    **{col: f'{col}_mode' for col in MODE_COLUMNS}
+}
+
+def account_aggregates(X, columns=None, modes=True):
+    """Unrounded per-AccountId aggregates, named `<column>_<function>`
+    
+    One groupby over every column of ACCOUNT_AGGREGATIONS found in X (or in
+    `columns`), plus `<column>_mode` for the categorical columns when `modes`
+    is set. Customer features and targets both read from this frame.
+    """
+    columns = X.columns if columns is None else columns
+    spec = {col: funcs for col, funcs in ACCOUNT_AGGREGATIONS.items() if col in columns}
+    aggregates = X.groupby('AccountId', observed=True).agg(spec)
+    aggregates.columns = [f'{col}_{func}' for col, func in aggregates.columns]
+    if modes:
+        for col in MODE_COLUMNS:
+            if col in columns:
+                aggregates[f'{col}_mode'] = groupby_mode(X['AccountId'], X[col].values)
+    return aggregates
+
+def customer_features_from_aggregates(aggregates):
+    """CustomerAggregator.transform output from account_aggregates"""
+    customer_features = aggregates[list(FEATURE_AGGREGATES.values())].round(4)
+    customer_features.columns = list(FEATURE_AGGREGATES)
+    return add_ratio_features(customer_features[AGGREGATED_COLUMNS]).reset_index()
+
 class TemporalFeatureExtractor(BaseEstimator, TransformerMixin):
     """Extract temporal features from transaction data"""
     
     def fit(self, X, y=None):
         return self
     
+    def __sklearn_is_fitted__(self):
+        # Stateless, so a persisted pipeline can transform without refitting
+        return True
+    
     def transform(self, X):
         X_copy = X.copy()
         X_copy['TransactionStartTime'] = pd.to_datetime(X_copy['TransactionStartTime'])
@@ -35,22 +181,61 @@ class TemporalFeatureExtractor(BaseEstimator, TransformerMixin):
         return X_copy
 
 class RiskFeatureExtractor(BaseEstimator, TransformerMixin):
-    """Extract risk-based features"""
+    """Extract risk-based features
+    
+    `fit` learns the fraud rate per ProductCategory and per ProviderId, kept as
+    a sorted array of category values plus an array of rates, and the 5%/95%
+    Value quantiles. `transform` is then a vectorized O(n) lookup that gives the
+    same values whatever the batch size. Categories not seen during fit get the
+    overall fraud rate of the training data.
+    """
     
     def fit(self, X, y=None):
+        self.category_values_, self.category_rates_ = self._fraud_rates(X, 'ProductCategory')
+        self.provider_values_, self.provider_rates_ = self._fraud_rates(X, 'ProviderId')
+        self.global_fraud_rate_ = float(X['FraudResult'].mean())
+        self.high_value_threshold_ = float(X['Value'].quantile(0.95))
+        self.low_value_threshold_ = float(X['Value'].quantile(0.05))
+        return self
+    
+    def fit_statistics(self, risk_statistics):
+        """Fit from fit_risk_statistics output instead of a transaction frame"""
+        for name, col in [('category', 'category_fraud_rate'), ('provider', 'provider_fraud_rate')]:
+            rates = risk_statistics[col].sort_index()
+            setattr(self, f'{name}_values_', rates.index.to_numpy(dtype=object))
+            setattr(self, f'{name}_rates_', rates.to_numpy(dtype=np.float64))
+        self.global_fraud_rate_ = float(risk_statistics['global_fraud_rate'])
+        self.high_value_threshold_ = float(risk_statistics['high_value_threshold'])
+        self.low_value_threshold_ = float(risk_statistics['low_value_threshold'])
         return self
     
+    @staticmethod
+    def _fraud_rates(X, col):
+        rates = X.groupby(col, observed=True)['FraudResult'].mean().sort_index()
+        return rates.index.to_numpy(dtype=object), rates.to_numpy(dtype=np.float64)
+    
+    def _lookup(self, keys, values, rates):
+        """rates[position of each key in values], or the fallback rate"""
+        index = pd.Index(values)
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # One hash lookup per category instead of per row
+            codes = keys.cat.codes.to_numpy()
+            positions = np.where(codes >= 0, index.get_indexer(keys.cat.categories)[codes], -1)
+        else:
+            positions = index.get_indexer(keys)
+        if len(rates) == 0:
+            return np.full(len(keys), self.global_fraud_rate_)
+        return np.where(positions >= 0, rates[positions], self.global_fraud_rate_)
+    
     def transform(self, X):
         X_copy = X.copy()
         
-        fraud_by_category = X_copy.groupby('ProductCategory')['FraudResult'].mean()
-        fraud_by_provider = X_copy.groupby('ProviderId')['FraudResult'].mean()
-        
-        X_copy['category_fraud_rate'] = X_copy['ProductCategory'].map(fraud_by_category)
-        X_copy['provider_fraud_rate'] = X_copy['ProviderId'].map(fraud_by_provider)
+        X_copy['category_fraud_rate'] = self._lookup(X_copy['ProductCategory'], self.category_values_, self.category_rates_)
+        X_copy['provider_fraud_rate'] = self._lookup(X_copy['ProviderId'], self.provider_values_, self.provider_rates_)
         
-        X_copy['high_value_transaction'] = (X_copy['Value'] > X_copy['Value'].quantile(0.95)).astype(int)
-        X_copy['low_value_transaction'] = (X_copy['Value'] < X_copy['Value'].quantile(0.05)).astype(int)
+        values = X_copy['Value'].to_numpy()
+        X_copy['high_value_transaction'] = (values > self.high_value_threshold_).astype(int)
+        X_copy['low_value_transaction'] = (values < self.low_value_threshold_).astype(int)
         
         return X_copy
 
@@ -60,56 +245,230 @@ class CustomerAggregator(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
     
+    def __sklearn_is_fitted__(self):
+        return True
+    
     def transform(self, X):
-        customer_features = X.groupby('AccountId').agg({
-            'Amount': ['sum', 'mean', 'std', 'count'],
-            'Value': ['sum', 'mean'],
-            'FraudResult': ['sum', 'mean'],
-            'category_fraud_rate': 'mean',
-            'provider_fraud_rate': 'mean',
-            'high_value_transaction': 'sum',
-            'low_value_transaction': 'sum',
-            'is_weekend': 'mean',
-            'hour': ['mean', 'std'],
-            'day_of_week': ['mean', 'std'],
-            'ProductCategory': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0],
-            'ProviderId': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0],
-            'ChannelId': lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0]
-        }).round(4)
+        return customer_features_from_aggregates(account_aggregates(X))
+
+class HashedCategoricalEncoder(BaseEstimator, TransformerMixin):
+    """Hash `column=value` tokens into a fixed number of indicator columns
+    
+    Width stays at `n_features` however many providers or channels appear,
+    and unseen categories need no refit; colliding categories share a column.
+    """
+    
+    def __init__(self, n_features=64, sparse_output=True):
+        self.n_features = n_features
+        self.sparse_output = sparse_output
+    
+    def fit(self, X, y=None):
+        self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self.n_features_in_ = len(self.feature_names_in_)
+        return self
+    
+    def transform(self, X):
+        tokens = [col + '=' + X[col].astype(str) for col in self.feature_names_in_]
+        hasher = FeatureHasher(n_features=self.n_features, input_type='string', alternate_sign=False)
+        encoded = hasher.transform(zip(*tokens)).tocsr()
+        return encoded if self.sparse_output else encoded.toarray()
+    
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f'hash_{i}' for i in range(self.n_features)], dtype=object)
+
+def categorical_encoder(encoding=None, sparse_output=None, max_categories=None, hash_size=None):
+    """Encoder for the mode columns; see CATEGORICAL_ENCODINGS
+    
+    `max_categories` (capped) and `hash_size` (hashed) default to
+    FEATURE_MAX_CATEGORIES and FEATURE_HASH_SIZE.
+    """
+    encoding = encoding or FEATURE_ENCODING
+    sparse_output = FEATURE_SPARSE if sparse_output is None else sparse_output
+    if encoding == 'onehot':
+        return OneHotEncoder(drop='first', sparse_output=sparse_output)
+    if encoding == 'capped':
+        return OneHotEncoder(drop='first', sparse_output=sparse_output,
+                             max_categories=max_categories or FEATURE_MAX_CATEGORIES,
+                             handle_unknown='infrequent_if_exist')
+    if encoding == 'hashed':
+        return HashedCategoricalEncoder(hash_size or FEATURE_HASH_SIZE, sparse_output=sparse_output)
+    raise ValueError(f"Unknown categorical encoding: {encoding}; expected one of {CATEGORICAL_ENCODINGS}")
+
+def fit_risk_statistics(chunks):
+    """First streaming pass: fraud rates per category/provider and Value quantiles.
+
+    Rates come from running sums and counts; the quantiles need the full
+    Value column, which is kept as a single float64 array (8 bytes per row).
+    """
+    category_stats, provider_stats, values, fraud_sum = None, None, [], 0
+    for chunk in chunks:
+        fraud_sum += chunk['FraudResult'].sum()
+        by_category = chunk.groupby('ProductCategory', observed=True)['FraudResult'].agg(['sum', 'count'])
+        by_provider = chunk.groupby('ProviderId', observed=True)['FraudResult'].agg(['sum', 'count'])
+        category_stats = by_category if category_stats is None else category_stats.add(by_category, fill_value=0)
+        provider_stats = by_provider if provider_stats is None else provider_stats.add(by_provider, fill_value=0)
+        values.append(chunk['Value'].to_numpy(dtype=np.float64))
+    values = np.concatenate(values)
+    return {
+        'category_fraud_rate': category_stats['sum'] / category_stats['count'],
+        'provider_fraud_rate': provider_stats['sum'] / provider_stats['count'],
+        'global_fraud_rate': fraud_sum / len(values),
+        'high_value_threshold': np.quantile(values, 0.95),
+        'low_value_threshold': np.quantile(values, 0.05)
+    }
+
+def apply_risk_statistics(X, risk_statistics):
+    """RiskFeatureExtractor's columns computed from precomputed statistics"""
+    X['category_fraud_rate'] = X['ProductCategory'].map(risk_statistics['category_fraud_rate']).astype(float)
+    X['provider_fraud_rate'] = X['ProviderId'].map(risk_statistics['provider_fraud_rate']).astype(float)
+    X['high_value_transaction'] = (X['Value'] > risk_statistics['high_value_threshold']).astype(int)
+    X['low_value_transaction'] = (X['Value'] < risk_statistics['low_value_threshold']).astype(int)
+    return X
+
+class StreamingCustomerAggregator:
+    """Chunk-by-chunk equivalent of CustomerAggregator.transform
+    
+    Keeps running per-AccountId counts and sums, Welford-style (count, mean, M2)
+    moments for the std columns, merged across chunks with Chan's update, and
+    per-account value counts for the mode columns. Memory grows with the number
+    of accounts, not with the number of transactions.
+    """
+    
+    MOMENT_COLUMNS = ['Amount', 'hour', 'day_of_week']
+    SUM_COLUMNS = ['Value', 'FraudResult', 'category_fraud_rate', 'provider_fraud_rate',
+                   'high_value_transaction', 'low_value_transaction', 'is_weekend']
+    MODE_COLUMNS = MODE_COLUMNS
+    
+    def __init__(self):
+        self.stats = None
+        self.mode_counts = {col: None for col in self.MODE_COLUMNS}
+    
+    def update(self, X):
+        """Fold in a chunk that already went through the temporal and risk extractors"""
+        grouped = X.groupby('AccountId', observed=True)
+        count = grouped.size()
+        sums = grouped[self.SUM_COLUMNS + self.MOMENT_COLUMNS].sum()
+        variances = grouped[self.MOMENT_COLUMNS].var(ddof=0)
         
-        customer_features.columns = [
-            'total_amount', 'avg_amount', 'std_amount', 'transaction_count',
-            'total_value', 'avg_value', 'fraud_count', 'fraud_rate',
-            'avg_category_fraud_rate', 'avg_provider_fraud_rate',
-            'high_value_count', 'low_value_count', 'weekend_ratio',
-            'avg_hour', 'std_hour', 'avg_day_of_week', 'std_day_of_week',
-            'ProductCategory', 'ProviderId', 'ChannelId'
-        ]
+        chunk_stats = pd.DataFrame({'count': count})
+        for col in self.SUM_COLUMNS + self.MOMENT_COLUMNS:
+            chunk_stats[f'{col}_sum'] = sums[col].astype(float)
+        for col in self.MOMENT_COLUMNS:
+            chunk_stats[f'{col}_m2'] = variances[col].fillna(0) * count
         
-        customer_features['amount_volatility'] = (
-            customer_features['std_amount'] / 
-            customer_features['avg_amount'].replace(0, 1)
+        chunk_modes = {col: X.groupby(['AccountId', col], observed=True).size() for col in self.MODE_COLUMNS}
+        self._merge(chunk_stats, chunk_modes)
+        return self
+    
+    def merge(self, other):
+        """Combine with another aggregator built over a disjoint set of rows"""
+        if other.stats is not None:
+            self._merge(other.stats, other.mode_counts)
+        return self
+    
+    def _merge(self, stats, mode_counts):
+        for col, counts in mode_counts.items():
+            current = self.mode_counts.get(col)
+            self.mode_counts[col] = counts if current is None else current.add(counts, fill_value=0)
+        if self.stats is None:
+            self.stats = stats.copy()
+            return
+        a, b = self.stats.align(stats, join='outer', fill_value=0)
+        na, nb = a['count'], b['count']
+        n = na + nb
+        merged = a + b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for col in self.MOMENT_COLUMNS:
+                delta = b[f'{col}_sum'] / nb - a[f'{col}_sum'] / na
+                correction = (delta ** 2 * na * nb / n).where((na > 0) & (nb > 0), 0)
+                merged[f'{col}_m2'] = a[f'{col}_m2'] + b[f'{col}_m2'] + correction
+        self.stats = merged
+    
+    @staticmethod
+    def _mode(counts):
+        """Most frequent value per account; ties go to the smallest value like Series.mode"""
+        col = counts.index.names[1]
+        ranked = counts.rename('n').reset_index().sort_values(
+            ['AccountId', 'n', col], ascending=[True, False, True]
         )
+        return ranked.drop_duplicates('AccountId').set_index('AccountId')[col]
+    
+    def account_counts(self, col, accounts=None):
+        """(AccountId, value) counts of `col`, restricted to `accounts` when given"""
+        counts = self.mode_counts[col]
+        if accounts is None:
+            return counts
+        return counts[counts.index.get_level_values('AccountId').isin(accounts)]
+    
+    def _feature_stats(self, stats):
+        """Hook for subclasses that derive some sums at output time"""
+        return stats
+    
+    def to_features(self, accounts=None):
+        """Customer feature frame matching CustomerAggregator.transform, optionally
+        only for the given accounts"""
+        s = self.stats if accounts is None else self.stats.loc[pd.Index(accounts).unique()]
+        s = self._feature_stats(s.sort_index())
+        if accounts is not None:
+            accounts = s.index
+        n = s['count']
         
-        customer_features['value_volatility'] = (
-            customer_features['std_amount'] / 
-            customer_features['avg_value'].replace(0, 1)
-        )
+        def mean(col):
+            return s[f'{col}_sum'] / n
         
-        customer_features['high_value_ratio'] = (
-            customer_features['high_value_count'] / 
-            customer_features['transaction_count']
-        )
+        def std(col):
+            return np.sqrt((s[f'{col}_m2'] / (n - 1)).clip(lower=0)).where(n > 1)
         
-        customer_features['low_value_ratio'] = (
-            customer_features['low_value_count'] / 
-            customer_features['transaction_count']
-        )
+        customer_features = pd.DataFrame({
+            'total_amount': s['Amount_sum'],
+            'avg_amount': mean('Amount'),
+            'std_amount': std('Amount'),
+            'transaction_count': n.astype(np.int64),
+            'total_value': s['Value_sum'],
+            'avg_value': mean('Value'),
+            'fraud_count': s['FraudResult_sum'].round().astype(np.int64),
+            'fraud_rate': mean('FraudResult'),
+            'avg_category_fraud_rate': mean('category_fraud_rate'),
+            'avg_provider_fraud_rate': mean('provider_fraud_rate'),
+            'high_value_count': s['high_value_transaction_sum'].round().astype(np.int64),
+            'low_value_count': s['low_value_transaction_sum'].round().astype(np.int64),
+            'weekend_ratio': mean('is_weekend'),
+            'avg_hour': mean('hour'),
+            'std_hour': std('hour'),
+            'avg_day_of_week': mean('day_of_week'),
+            'std_day_of_week': std('day_of_week'),
+            **{col: self._mode(self.account_counts(col, accounts)) for col in self.MODE_COLUMNS}
+        }, index=s.index)[AGGREGATED_COLUMNS].round(4)
+        customer_features.index.name = 'AccountId'
         
-        return customer_features.reset_index()
+        return add_ratio_features(customer_features).reset_index()
+
+RISK_STATISTICS_COLUMNS = ['ProductCategory', 'ProviderId', 'FraudResult', 'Value']
+
+def stream_customer_features(path, chunksize=100000, risk_statistics=None):
+    """Build the CustomerAggregator output from a CSV in two chunked passes
+    
+    The first pass (fit_risk_statistics) is skipped when `risk_statistics`
+    is given.
+    """
+    if risk_statistics is None:
+        risk_statistics = fit_risk_statistics(iter_raw_transactions(path, chunksize, columns=RISK_STATISTICS_COLUMNS))
+    temporal = TemporalFeatureExtractor()
+    aggregator = StreamingCustomerAggregator()
+    for chunk in iter_raw_transactions(path, chunksize):
+        aggregator.update(apply_risk_statistics(temporal.transform(chunk), risk_statistics))
+    return aggregator.to_features()
 
-def create_feature_pipeline():
-    """Create the complete feature engineering pipeline"""
+def create_feature_pipeline(encoding=None, sparse_output=None, max_categories=None, hash_size=None):
+    """Create the complete feature engineering pipeline
+    
+    `encoding` and `sparse_output` default to FEATURE_ENCODING and
+    FEATURE_SPARSE; `max_categories` and `hash_size` are passed to
+    categorical_encoder. A sparse pipeline always returns a CSR matrix: the scaled
+    numeric block is stored densely inside it and only the categorical
+    indicators benefit, which is where the width grows.
+    """
+    sparse_output = FEATURE_SPARSE if sparse_output is None else sparse_output
     
     feature_extraction = Pipeline([
         ('temporal_extractor', TemporalFeatureExtractor()),
@@ -130,9 +489,10 @@ def create_feature_pipeline():
     preprocessor = ColumnTransformer(
         transformers=[
             ('num', StandardScaler(), numerical_features),
-            ('cat', OneHotEncoder(drop='first', sparse_output=False), categorical_features)
+            ('cat', categorical_encoder(encoding, sparse_output, max_categories, hash_size), categorical_features)
         ],
-        remainder='drop'
+        remainder='drop',
+        sparse_threshold=1.0 if sparse_output else 0
     )
     
     feature_pipeline = Pipeline([
@@ -142,13 +502,46 @@ def create_feature_pipeline():
     
     return feature_pipeline
 
-def load_and_process_data():
-    """Load data and create features"""
-    df = pd.read_csv('../data/raw/data.csv')
+def load_and_process_data(path=RAW_DATA_PATH, chunksize=None):
+    """Load data and create features
+    
+    With `chunksize`, the raw CSV is streamed in chunks and only per-account
+    statistics are kept in memory. The risk extractor is fitted from the
+    streamed risk statistics and the preprocessor on the resulting customer
+    features, so the returned pipeline can transform raw transactions.
+    """
+    if not chunksize:
+        return build_features(load_raw_transactions(path))
     
     pipeline = create_feature_pipeline()
-    features = pipeline.fit_transform(df)
+    risk_statistics = fit_risk_statistics(iter_raw_transactions(path, chunksize, columns=RISK_STATISTICS_COLUMNS))
+    pipeline.named_steps['feature_extraction'].named_steps['risk_extractor'].fit_statistics(risk_statistics)
+    customer_features = stream_customer_features(path, chunksize, risk_statistics)
+    features = pipeline.named_steps['preprocessor'].fit_transform(customer_features)
+    return feature_frame(pipeline, features, customer_features['AccountId'].values), pipeline
+
+def build_features(df, encoding=None, sparse_output=None, max_categories=None, hash_size=None):
+    """Fit the feature pipeline on an already loaded transaction frame"""
+    feature_df, pipeline, _ = build_features_and_aggregates(df, encoding, sparse_output, max_categories, hash_size)
+    return feature_df, pipeline
+
+def build_features_and_aggregates(df, encoding=None, sparse_output=None, max_categories=None, hash_size=None):
+    """Fit the feature pipeline and also return its account_aggregates frame
     
+    Same result as `pipeline.fit_transform(df)`, but the per-account groupby
+    is kept so target_generator.targets_from_aggregates can reuse it instead
+    of grouping the raw transactions again.
+    """
+    pipeline = create_feature_pipeline(encoding, sparse_output, max_categories, hash_size)
+    X = df
+    for _, step in pipeline.named_steps['feature_extraction'].steps[:-1]:
+        X = step.fit_transform(X)
+    aggregates = account_aggregates(X)
+    features = pipeline.named_steps['preprocessor'].fit_transform(customer_features_from_aggregates(aggregates))
+    return feature_frame(pipeline, features, aggregates.index), pipeline, aggregates
+
+def feature_frame(pipeline, features, account_ids):
+    """Name the preprocessed feature matrix and attach AccountId"""
     feature_names = (
         [f'num_{col}' for col in pipeline.named_steps['preprocessor']
          .named_transformers_['num'].get_feature_names_out()] +
@@ -156,14 +549,23 @@ def load_and_process_data():
          .named_transformers_['cat'].get_feature_names_out()]
     )
     
-    feature_df = pd.DataFrame(features, columns=feature_names)
-    feature_df['AccountId'] = df.groupby('AccountId').size().index
+    if sparse.issparse(features):
+        # Dense numeric columns next to Sparse[float64, 0] categorical columns
+        n_numeric = len(pipeline.named_steps['preprocessor'].named_transformers_['num'].get_feature_names_out())
+        features = features.tocsc()
+        feature_df = pd.concat([
+            pd.DataFrame(features[:, :n_numeric].toarray(), columns=feature_names[:n_numeric]),
+            sparse_frame(features[:, n_numeric:], feature_names[n_numeric:])
+        ], axis=1)
+    else:
+        feature_df = pd.DataFrame(features, columns=feature_names)
+    feature_df['AccountId'] = pd.Index(account_ids).astype(str)
     
-    return feature_df, pipeline
+    return feature_df
 
 def save_features(feature_df, pipeline):
     """Save processed features and pipeline"""
-    feature_df.to_csv('../data/processed/features.csv', index=False)
+    save_dataset(feature_df, 'features')
     
     import joblib
     joblib.dump(pipeline, '../data/processed/feature_pipeline.pkl')
@@ -171,6 +573,11 @@ def save_features(feature_df, pipeline):
     return feature_df
 
 if __name__ == "__main__":
+    # Run the package module, not __main__, so the pickled pipeline refers to
+    # src.feature_engineering, which the API can import
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.feature_engineering import load_and_process_data, save_features
     feature_df, pipeline = load_and_process_data()
     save_features(feature_df, pipeline)
     print(f"Features created: {feature_df.shape}")
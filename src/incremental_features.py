@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Incremental Feature Updates for Credit Scoring Model
+Merge newly arrived transactions into saved per-account statistics and
+rebuild the feature rows from them without re-reading earlier transactions
+"""
+
+import os
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+
+try:
+    from .feature_engineering import TemporalFeatureExtractor, StreamingCustomerAggregator, feature_frame
+    from .storage import iter_raw_transactions, save_dataset, PROCESSED_DIR, RAW_DATA_PATH
+except ImportError:
+    from feature_engineering import TemporalFeatureExtractor, StreamingCustomerAggregator, feature_frame
+    from storage import iter_raw_transactions, save_dataset, PROCESSED_DIR, RAW_DATA_PATH
+
+FEATURE_STATE_PATH = os.path.join(PROCESSED_DIR, 'feature_state.pkl')
+FEATURE_PIPELINE_PATH = os.path.join(PROCESSED_DIR, 'feature_pipeline.pkl')
+
+# Per-account Value counts are kept by Value rounded to this many significant
+# digits, so an account holds at most 900 keys per decade of Value
+VALUE_SIGNIFICANT_DIGITS = 3
+
+
+def _lerp(a, b, t):
+    """Linear interpolation exactly as numpy's quantile computes it"""
+    diff = b - a
+    return np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+
+
+def quantile_from_counts(values, counts, q):
+    """np.quantile(np.repeat(values, counts), q) without materialising the repeat"""
+    order = np.argsort(values)
+    values = np.asarray(values, dtype=np.float64)[order]
+    cumulative = np.cumsum(np.asarray(counts, dtype=np.int64)[order])
+    position = q * (cumulative[-1] - 1)
+    lower = np.floor(position)
+    below = values[np.searchsorted(cumulative, lower, side='right')]
+    above = values[np.searchsorted(cumulative, min(lower + 1, cumulative[-1] - 1), side='right')]
+    return float(_lerp(below, above, position - lower))
+
+
+def round_significant(values, digits=VALUE_SIGNIFICANT_DIGITS):
+    """Values rounded to `digits` significant digits; integers below 10**digits are kept"""
+    values = np.asarray(values, dtype=np.float64)
+    magnitude = np.floor(np.log10(np.abs(values), out=np.zeros_like(values), where=values != 0))
+    unit = 10.0 ** np.maximum(magnitude - digits + 1, 0)
+    return np.round(values / unit) * unit
+
+
+class IncrementalCustomerAggregator(StreamingCustomerAggregator):
+    """StreamingCustomerAggregator whose statistics do not depend on the risk encodings
+
+    The risk columns change whenever new transactions arrive (fraud rates per
+    category/provider, Value quantiles), so instead of summing them per account
+    this keeps what they are derived from: per-account counts of every
+    ProductCategory and ProviderId, global fraud sums and counts, global
+    counts of every Value, and per-account counts of Value rounded to
+    VALUE_SIGNIFICANT_DIGITS. Averaged rates, quantiles and high/low value
+    counts are then recomputed from the current global statistics for
+    whichever accounts are emitted, so `to_features()` over all accounts
+    equals a full recompute, except that a transaction within half a rounding
+    unit of a Value threshold may be counted on the wrong side of it.
+    """
+
+    SUM_COLUMNS = ['Value', 'FraudResult', 'is_weekend']
+    COUNT_COLUMNS = StreamingCustomerAggregator.MODE_COLUMNS + ['Value']
+
+    def __init__(self):
+        super().__init__()
+        self.mode_counts = {col: None for col in self.COUNT_COLUMNS}
+        self.value_counts = None
+        self.category_fraud = None
+        self.provider_fraud = None
+
+    def update(self, X):
+        """Fold in raw transactions; returns the AccountIds that changed"""
+        X = TemporalFeatureExtractor().transform(X)
+        grouped = X.groupby('AccountId', observed=True)
+        count = grouped.size()
+        sums = grouped[self.SUM_COLUMNS + self.MOMENT_COLUMNS].sum()
+        variances = grouped[self.MOMENT_COLUMNS].var(ddof=0)
+
+        chunk_stats = pd.DataFrame({'count': count})
+        for col in self.SUM_COLUMNS + self.MOMENT_COLUMNS:
+            chunk_stats[f'{col}_sum'] = sums[col].astype(float)
+        for col in self.MOMENT_COLUMNS:
+            chunk_stats[f'{col}_m2'] = variances[col].fillna(0) * count
+
+        chunk_counts = {col: X.groupby(['AccountId', col], observed=True).size() for col in self.MODE_COLUMNS}
+        chunk_counts['Value'] = X.groupby(
+            [X['AccountId'], pd.Series(round_significant(X['Value']), index=X.index, name='Value')], observed=True
+        ).size()
+        self._merge(chunk_stats, chunk_counts)
+
+        value_counts = X['Value'].astype(np.float64).value_counts()
+        self.value_counts = (value_counts if self.value_counts is None
+                             else self.value_counts.add(value_counts, fill_value=0))
+
+        by_category = X.groupby('ProductCategory', observed=True)['FraudResult'].agg(['sum', 'count'])
+        by_provider = X.groupby('ProviderId', observed=True)['FraudResult'].agg(['sum', 'count'])
+        self.category_fraud = (by_category if self.category_fraud is None
+                               else self.category_fraud.add(by_category, fill_value=0))
+        self.provider_fraud = (by_provider if self.provider_fraud is None
+                               else self.provider_fraud.add(by_provider, fill_value=0))
+        return count.index
+
+    def risk_statistics(self):
+        """Current risk statistics, as fit_risk_statistics would return over all rows"""
+        values, counts = self.value_counts.index.to_numpy(dtype=np.float64), self.value_counts.to_numpy()
+        return {
+            'category_fraud_rate': self.category_fraud['sum'] / self.category_fraud['count'],
+            'provider_fraud_rate': self.provider_fraud['sum'] / self.provider_fraud['count'],
+            'global_fraud_rate': self.category_fraud['sum'].sum() / self.category_fraud['count'].sum(),
+            'high_value_threshold': quantile_from_counts(values, counts, 0.95),
+            'low_value_threshold': quantile_from_counts(values, counts, 0.05)
+        }
+
+    def _weighted_sum(self, col, weights, accounts):
+        """Per-account sum of weights[value] over the account's counts of `col`"""
+        counts = self.account_counts(col, accounts)
+        values = counts.index.get_level_values(col)
+        weighted = counts * pd.Series(values).map(weights).to_numpy(dtype=np.float64)
+        return weighted.groupby(level='AccountId').sum().reindex(accounts, fill_value=0)
+
+    def _feature_stats(self, stats):
+        stats = stats.copy()
+        accounts = stats.index
+        risk_statistics = self.risk_statistics()
+        value_counts = self.account_counts('Value', accounts)
+        values = value_counts.index.get_level_values('Value').to_numpy(dtype=np.float64)
+
+        stats['category_fraud_rate_sum'] = self._weighted_sum(
+            'ProductCategory', risk_statistics['category_fraud_rate'], accounts)
+        stats['provider_fraud_rate_sum'] = self._weighted_sum(
+            'ProviderId', risk_statistics['provider_fraud_rate'], accounts)
+        stats['high_value_transaction_sum'] = (
+            value_counts[values > risk_statistics['high_value_threshold']]
+            .groupby(level='AccountId').sum().reindex(accounts, fill_value=0)
+        )
+        stats['low_value_transaction_sum'] = (
+            value_counts[values < risk_statistics['low_value_threshold']]
+            .groupby(level='AccountId').sum().reindex(accounts, fill_value=0)
+        )
+        return stats
+
+    def save(self, path=FEATURE_STATE_PATH):
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path=FEATURE_STATE_PATH):
+        return joblib.load(path)
+
+
+def build_feature_state(path=RAW_DATA_PATH, chunksize=100000):
+    """Sufficient statistics of a full transaction file, read in chunks"""
+    state = IncrementalCustomerAggregator()
+    for chunk in iter_raw_transactions(path, chunksize):
+        state.update(chunk)
+    return state
+
+
+def update_features(delta_path, directory=PROCESSED_DIR, chunksize=100000):
+    """Merge a file of new transactions and rewrite the feature rows of every account
+
+    New transactions move the global statistics every row is derived from:
+    the category and provider fraud rates, the Value quantiles, the scaler
+    and the encoder's categories. So the saved pipeline's risk extractor is
+    refitted from the merged statistics, its preprocessor on all accounts'
+    customer features, and all rows are re-emitted; only the delta is read.
+    The rows and pipeline match build_features over every transaction (up to
+    the Value rounding of the high/low value counts). Returns the AccountIds
+    that received new transactions.
+    """
+    state_path = os.path.join(directory, os.path.basename(FEATURE_STATE_PATH))
+    pipeline_path = os.path.join(directory, os.path.basename(FEATURE_PIPELINE_PATH))
+    state = IncrementalCustomerAggregator.load(state_path)
+    changed = pd.Index([])
+    for chunk in iter_raw_transactions(delta_path, chunksize):
+        changed = changed.union(state.update(chunk))
+
+    customer_features = state.to_features()
+    pipeline = joblib.load(pipeline_path)
+    pipeline.named_steps['feature_extraction'].named_steps['risk_extractor'].fit_statistics(state.risk_statistics())
+    features = pipeline.named_steps['preprocessor'].fit_transform(customer_features)
+    save_dataset(feature_frame(pipeline, features, customer_features['AccountId'].values), 'features', directory)
+    joblib.dump(pipeline, pipeline_path)
+    state.save(state_path)
+    return changed
+
+
+if __name__ == "__main__":
+    # Run the package module so the pickled feature pipeline refers to
+    # src.feature_engineering, which the API can import
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src.incremental_features import build_feature_state, update_features
+    if len(sys.argv) > 1:
+        changed = update_features(sys.argv[1])
+        print(f"Rewrote feature rows; {len(changed):,} accounts had new transactions")
+    else:
+        state = build_feature_state()
+        state.save()
+        print(f"Saved feature state for {len(state.stats):,} accounts to {FEATURE_STATE_PATH}")
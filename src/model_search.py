@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Search Modes for Credit Risk Model Training
+Exhaustive grid search (the baseline) or successive halving
+"""
+
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
+from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import RandomForestClassifier
+
+SEARCH_MODES = ('grid', 'halving')
+
+
+def model_families(random_state=42):
+    """Estimator, baseline grid and halving setup of every model family.
+
+    Halving trains all candidates on a small budget and keeps the best
+    1/factor of them for each larger budget: LogisticRegression grows the
+    number of training rows, RandomForest the number of trees up to the
+    largest n_estimators of the baseline grid.
+    """
+    return {
+        'LogisticRegression': {
+            'estimator': LogisticRegression(max_iter=500, random_state=random_state),
+            'grid': {'C': [0.01, 0.1, 1, 10]},
+            'halving': {'param_grid': {'C': [0.01, 0.1, 1, 10]}, 'resource': 'n_samples'}
+        },
+        'RandomForest': {
+            'estimator': RandomForestClassifier(random_state=random_state),
+            'grid': {'n_estimators': [50, 100], 'max_depth': [3, 5, 10]},
+            'halving': {'param_grid': {'max_depth': [3, 5, 10]}, 'resource': 'n_estimators',
+                        'min_resources': 'exhaust', 'max_resources': 100}
+        }
+    }
+
+
+def make_search(family, mode='grid', cv=3, n_jobs=None, scoring='f1', factor=3, random_state=42):
+    """Search object for one entry of model_families()"""
+    if mode == 'grid':
+        return GridSearchCV(family['estimator'], family['grid'], cv=cv, scoring=scoring, n_jobs=n_jobs)
+    if mode == 'halving':
+        halving = dict(family['halving'])
+        return HalvingGridSearchCV(
+            family['estimator'], halving.pop('param_grid'), cv=cv, scoring=scoring, n_jobs=n_jobs,
+            factor=factor, random_state=random_state, **halving
+        )
+    raise ValueError(f"Unknown search mode: {mode}; expected one of {SEARCH_MODES}")
@@ -3,75 +3,387 @@
 Model Training and Tracking for Credit Risk
 """
 
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
+from scipy import sparse
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import mlflow
 import mlflow.sklearn
+import psutil
 
-# Load data
-df = pd.read_csv('../data/processed/model_data_with_proxy.csv')
+try:
+    from .model_search import SEARCH_MODES, model_families, make_search
+    from .storage import dataset_path, frame_columns, read_frame, sparse_frame, PROCESSED_DIR
+    from .storage import open_feature_store, feature_store_exists, FEATURE_STORE_DIR, FEATURE_STORE_MANIFEST
+except ImportError:
+    from model_search import SEARCH_MODES, model_families, make_search
+    from storage import dataset_path, frame_columns, read_frame, sparse_frame, PROCESSED_DIR
+    from storage import open_feature_store, feature_store_exists, FEATURE_STORE_DIR, FEATURE_STORE_MANIFEST
 
-# Features and target
-X = df.drop(columns=['AccountId', 'default_risk', 'risk_category', 'risk_score', 'is_high_risk'], errors='ignore')
-y = df['is_high_risk']
+N_CPUS = os.cpu_count() or 1
+NON_FEATURE_COLUMNS = ['AccountId', 'default_risk', 'risk_category', 'risk_score']
+TARGET_COLUMN = 'is_high_risk'
 
-# Split
-test_size = 0.2
-random_state = 42
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+# Newer MLflow defaults to skops, which refuses to log tree ensembles
+SERIALIZATION_FORMAT = mlflow.sklearn.SERIALIZATION_FORMAT_CLOUDPICKLE
 
-mlflow.set_experiment('credit-risk-proxy')
+# Training configuration; `grids` maps a family name to a replacement grid.
+# Parallelism: the search fits candidates x folds in joblib worker processes
+# and up to `parallel_families` families run concurrently, sharing n_jobs
+# (each in its own MLflow run; needs mlflow>=2.18's thread-local active runs).
+# `sparse` trains on CSR matrices, for wide one-hot/hashed categorical features.
+TrainingConfig = namedtuple('TrainingConfig', [
+    'data_path', 'families', 'grids', 'search', 'cv', 'n_jobs', 'parallel_families',
+    'test_size', 'random_state', 'cache_dir', 'experiment', 'register', 'sparse'
+], defaults=[
+    None, ('LogisticRegression', 'RandomForest'), None,
+    os.getenv('TRAINING_SEARCH', 'grid'), 3,
+    int(os.getenv('TRAINING_N_JOBS', '-1')), int(os.getenv('TRAINING_PARALLEL_FAMILIES', '2')),
+    0.2, 42, os.path.join(PROCESSED_DIR, 'training_cache'), 'credit-risk-proxy', True,
+    os.getenv('TRAINING_SPARSE', '0').lower() in ('1', 'true', 'yes')
+])
 
-results = []
+# Split arrays; X_train/X_test are read-only memory maps of the .npy cache
+# (CSR matrices over memory-mapped data/indices/indptr when sparse)
+TrainingData = namedtuple('TrainingData', ['X_train', 'X_test', 'y_train', 'y_test', 'columns', 'cache_hit'])
 
-with mlflow.start_run(run_name="LogisticRegression"):
-    params = {'C': [0.01, 0.1, 1, 10]}
-    model = GridSearchCV(LogisticRegression(max_iter=500, random_state=random_state), params, cv=3, scoring='f1')
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-    y_proba = model.predict_proba(X_test)[:, 1]
-    metrics = {
-        'accuracy': accuracy_score(y_test, y_pred),
-        'precision': precision_score(y_test, y_pred),
-        'recall': recall_score(y_test, y_pred),
-        'f1': f1_score(y_test, y_pred),
-        'roc_auc': roc_auc_score(y_test, y_proba)
-    }
-    mlflow.log_params(model.best_params_)
-    mlflow.log_metrics(metrics)
-    mlflow.sklearn.log_model(model.best_estimator_, "model")
-    results.append(("LogisticRegression", metrics, model.best_estimator_))
-
-with mlflow.start_run(run_name="RandomForest"):
-    params = {'n_estimators': [50, 100], 'max_depth': [3, 5, 10]}
-    model = GridSearchCV(RandomForestClassifier(random_state=random_state), params, cv=3, scoring='f1')
-    model.fit(X_train, y_train)
+FamilyResult = namedtuple('FamilyResult', [
+    'name', 'best_params', 'metrics', 'fit_seconds', 'cpu_seconds', 'cpu_utilization', 'estimator', 'run_id'
+])
+
+TrainingResult = namedtuple('TrainingResult', [
+    'best', 'families', 'load_seconds', 'total_seconds', 'cache_hit', 'registered_version'
+])
+
+# Splits already mapped in this process, by (resolved cache directory, cache key)
+_loaded = {}
+
+
+def cpu_seconds():
+    """User + system CPU time of this process and its live worker processes"""
+    process = psutil.Process()
+    total = sum(process.cpu_times()[:2])
+    for child in process.children(recursive=True):
+        try:
+            total += sum(child.cpu_times()[:2])
+        except psutil.Error:
+            pass
+    return total
+
+
+def _cache_key(data_path, test_size, random_state, sparse_matrix=False):
+    # A feature store changes when its manifest is replaced
+    stat = os.stat(os.path.join(data_path, FEATURE_STORE_MANIFEST) if os.path.isdir(data_path) else data_path)
+    source = f"{os.path.abspath(data_path)}:{stat.st_size}:{stat.st_mtime_ns}:{test_size}:{random_state}"
+    if sparse_matrix:
+        source += ':csr'
+    return hashlib.sha1(source.encode()).hexdigest()[:16]
+
+
+def feature_matrix(X, sparse_matrix=False):
+    """float64 matrix of a feature frame; CSR when `sparse_matrix`.
+
+    Pandas sparse columns go into the CSR matrix without being densified.
+    """
+    if not sparse_matrix:
+        return X.to_numpy(dtype=np.float64)
+    is_sparse = np.array([isinstance(dtype, pd.SparseDtype) for dtype in X.dtypes])
+    blocks = [sparse.csr_matrix(X.loc[:, ~is_sparse].to_numpy(dtype=np.float64))]
+    if is_sparse.any():
+        blocks.append(X.loc[:, is_sparse].sparse.to_coo().astype(np.float64))
+    matrix = sparse.hstack(blocks, format='csc')
+    # Columns were grouped dense-first; put them back in frame order
+    order = np.concatenate([np.flatnonzero(~is_sparse), np.flatnonzero(is_sparse)])
+    return matrix[:, np.argsort(order)].tocsr()
+
+
+def split_training_data(df, test_size=0.2, random_state=42, sparse_matrix=False):
+    """Stratified in-memory train/test split of a model frame"""
+    X = df.drop(columns=[col for col in NON_FEATURE_COLUMNS + [TARGET_COLUMN] if col in df.columns])
+    y = df[TARGET_COLUMN]
+    X_train, X_test, y_train, y_test = train_test_split(
+        feature_matrix(X, sparse_matrix), y.to_numpy(dtype=np.int8),
+        test_size=test_size, random_state=random_state, stratify=y
+    )
+    return TrainingData(X_train, X_test, y_train, y_test, columns=list(X.columns), cache_hit=False)
+
+
+def split_rows(y, test_size=0.2, random_state=42):
+    """Row positions of the stratified train/test split that split_training_data makes"""
+    return train_test_split(np.arange(len(y)), test_size=test_size, random_state=random_state, stratify=y)
+
+
+def stored_split(store, test_size, random_state):
+    """Number of train rows when the store's rows are already in this split's order, else None"""
+    split = store.split
+    if split and split['test_size'] == test_size and split['random_state'] == random_state:
+        return split['n_train']
+    return None
+
+
+def split_feature_store(store, test_size=0.2, random_state=42, sparse_matrix=False):
+    """split_training_data over a FeatureStore: the same train and test rows,
+    in the order split_training_data returns them.
+
+    The store's own rows need not be in the source frame's order. When the
+    store was written in this split's order (see stored_split; data_processor
+    writes the default split's train rows, then its test rows), the arrays
+    are slices of the store's memory maps and nothing is read until used.
+    Otherwise the selected rows are gathered into new in-memory arrays.
+    """
+    y = np.asarray(store.targets[TARGET_COLUMN])
+    n_train = stored_split(store, test_size, random_state)
+    if n_train is not None:
+        X_train, X_test, y_train, y_test = store.X[:n_train], store.X[n_train:], y[:n_train], y[n_train:]
+    else:
+        train_rows, test_rows = split_rows(y, test_size, random_state)
+        X_train, X_test, y_train, y_test = store.X[train_rows], store.X[test_rows], y[train_rows], y[test_rows]
+    if sparse_matrix:
+        X_train, X_test = sparse.csr_matrix(X_train), sparse.csr_matrix(X_test)
+    return TrainingData(X_train, X_test, y_train, y_test, columns=list(store.columns), cache_hit=False)
+
+
+def default_data_path():
+    """The feature store written by data_processor, unless model_data_with_proxy is newer"""
+    path = dataset_path('model_data_with_proxy')
+    if not feature_store_exists(FEATURE_STORE_DIR):
+        return path
+    manifest = os.path.join(FEATURE_STORE_DIR, FEATURE_STORE_MANIFEST)
+    if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(manifest):
+        return path
+    return FEATURE_STORE_DIR
+
+
+def _save_array(directory, name, array):
+    if sparse.issparse(array):
+        for part in ['data', 'indices', 'indptr']:
+            np.save(os.path.join(directory, f'{name}.{part}.npy'), getattr(array, part))
+        np.save(os.path.join(directory, f'{name}.shape.npy'), np.array(array.shape))
+    else:
+        np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+
+
+def _load_array(directory, name):
+    if not os.path.exists(os.path.join(directory, f'{name}.shape.npy')):
+        return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+    data, indices, indptr = (np.load(os.path.join(directory, f'{name}.{part}.npy'), mmap_mode='r')
+                             for part in ['data', 'indices', 'indptr'])
+    shape = tuple(np.load(os.path.join(directory, f'{name}.shape.npy')))
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def load_training_data(data_path=None, test_size=0.2, random_state=42, cache_dir=TrainingConfig().cache_dir,
+                       sparse_matrix=False):
+    """Train/test split of the model dataset, cached as .npy files.
+
+    The first call reads the dataset and writes the split to
+    `cache_dir/<key>/`, keyed by the file's path, size and mtime and the split
+    settings; later calls (and later processes) memory-map those files.
+    Within a process the mapped arrays are reused as they are. With
+    `sparse_matrix` the features are cached and returned as CSR matrices.
+
+    `data_path` is a model frame or a feature store directory (see
+    storage.write_feature_store); by default the store is used when it is
+    current. A dense split that the store's rows are already ordered by is
+    served as slices of the store's own memory maps, with no copy and no
+    cache files; any other split of a store is copied into the cache like a
+    frame's. `cache_hit` is set only when the split came from the in-process
+    or on-disk cache.
+    """
+    data_path = data_path or default_data_path()
+    key = _cache_key(data_path, test_size, random_state, sparse_matrix)
+    loaded_key = (os.path.realpath(cache_dir), key)
+    if loaded_key in _loaded:
+        return _loaded[loaded_key]._replace(cache_hit=True)
+
+    store = open_feature_store(data_path) if os.path.isdir(data_path) else None
+    if store is not None and not sparse_matrix and stored_split(store, test_size, random_state) is not None:
+        data = split_feature_store(store, test_size, random_state)
+        _loaded[loaded_key] = data
+        return data
+
+    directory = os.path.join(cache_dir, key)
+    names = ['X_train', 'X_test', 'y_train', 'y_test']
+    cache_hit = os.path.exists(os.path.join(directory, 'columns.json'))
+    if not cache_hit:
+        if store is not None:
+            split = split_feature_store(store, test_size, random_state, sparse_matrix)
+        else:
+            columns = [col for col in frame_columns(data_path) if col not in NON_FEATURE_COLUMNS]
+            split = split_training_data(read_frame(data_path, columns=columns), test_size, random_state,
+                                        sparse_matrix)
+        staging = f"{directory}.tmp-{os.getpid()}"
+        os.makedirs(staging, exist_ok=True)
+        for name in names:
+            _save_array(staging, name, getattr(split, name))
+        with open(os.path.join(staging, 'columns.json'), 'w') as f:
+            json.dump(split.columns, f)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Another run cached the same split first
+            pass
+
+    with open(os.path.join(directory, 'columns.json')) as f:
+        columns = json.load(f)
+    arrays = [_load_array(directory, name) for name in names]
+    data = TrainingData(*arrays, columns=columns, cache_hit=cache_hit)
+    _loaded[loaded_key] = data
+    return data
+
+
+def select_families(config):
+    """model_families() restricted to config.families, with any grid overrides"""
+    available = model_families(config.random_state)
+    families = {}
+    for name in config.families:
+        if name not in available:
+            raise ValueError(f"Unknown model family: {name}; expected one of {list(available)}")
+        family = available[name]
+        grid = (config.grids or {}).get(name)
+        if grid is not None:
+            resource = family['halving']['resource']
+            family['grid'] = grid
+            family['halving'] = dict(family['halving'], param_grid={k: v for k, v in grid.items() if k != resource})
+        families[name] = family
+    return families
+
+
+def evaluate(model, X_test, y_test):
     y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)[:, 1]
-    metrics = {
+    return {
         'accuracy': accuracy_score(y_test, y_pred),
         'precision': precision_score(y_test, y_pred),
         'recall': recall_score(y_test, y_pred),
         'f1': f1_score(y_test, y_pred),
         'roc_auc': roc_auc_score(y_test, y_proba)
     }
-    mlflow.log_params(model.best_params_)
-    mlflow.log_metrics(metrics)
-    mlflow.sklearn.log_model(model.best_estimator_, "model")
-    results.append(("RandomForest", metrics, model.best_estimator_))
-
-# Select best model by F1
-best_model_name, best_metrics, best_model = max(results, key=lambda x: x[1]['f1'])
-mlflow.set_experiment('credit-risk-proxy')
-with mlflow.start_run(run_name="RegisterBestModel"):
-    mlflow.sklearn.log_model(best_model, "best_model")
-    mlflow.log_metrics(best_metrics)
-    mlflow.set_tag("best_model", best_model_name)
-    mlflow.register_model(f"runs:/{mlflow.active_run().info.run_id}/best_model", f"credit-risk-proxy-best")
-
-print(f"Best model: {best_model_name}")
-print(f"Metrics: {best_metrics}") 
\ No newline at end of file
+
+
+def fit_family(family, data, config, n_jobs):
+    """Fit one model family's search on a TrainingData split.
+
+    Returns the fitted search, its test metrics, and the wall and CPU seconds
+    the search took.
+    """
+    # Frames share the memory-mapped arrays and keep the feature names on the model
+    X_train, X_test = (
+        sparse_frame(X, data.columns) if sparse.issparse(X)
+        else pd.DataFrame(X, columns=data.columns, copy=False)
+        for X in (data.X_train, data.X_test)
+    )
+    start_wall, start_cpu = time.perf_counter(), cpu_seconds()
+    model = make_search(family, config.search, cv=config.cv, n_jobs=n_jobs, random_state=config.random_state)
+    model.fit(X_train, data.y_train)
+    wall_seconds, cpu_used = time.perf_counter() - start_wall, cpu_seconds() - start_cpu
+    return model, evaluate(model, X_test, data.y_test), wall_seconds, cpu_used
+
+
+def run_experiment(name, family, data, config, n_jobs):
+    """Search one model family inside its own MLflow run.
+
+    CPU time is measured over the whole process tree, so when families run
+    concurrently each run's cpu_seconds also includes the other's work.
+    """
+    with mlflow.start_run(run_name=name) as run:
+        model, metrics, wall_seconds, cpu_used = fit_family(family, data, config, n_jobs)
+        mlflow.log_params(model.best_params_)
+        mlflow.log_params({'search_mode': config.search, 'cv': config.cv, 'n_jobs': n_jobs,
+                           'parallel_families': config.parallel_families})
+        mlflow.log_metrics(metrics)
+        mlflow.log_metrics({
+            'fit_wall_seconds': wall_seconds,
+            'fit_cpu_seconds': cpu_used,
+            'cpu_utilization': cpu_used / (wall_seconds * N_CPUS)
+        })
+        mlflow.sklearn.log_model(model.best_estimator_, "model", serialization_format=SERIALIZATION_FORMAT)
+    return FamilyResult(
+        name=name, best_params=model.best_params_, metrics=metrics,
+        fit_seconds=wall_seconds, cpu_seconds=cpu_used, cpu_utilization=cpu_used / (wall_seconds * N_CPUS),
+        estimator=model.best_estimator_, run_id=run.info.run_id
+    )
+
+
+def register_best(best, training_seconds, experiment):
+    """Log the best family's model and register it; returns the registry version"""
+    mlflow.set_experiment(experiment)
+    with mlflow.start_run(run_name="RegisterBestModel") as run:
+        mlflow.sklearn.log_model(best.estimator, "best_model", serialization_format=SERIALIZATION_FORMAT)
+        mlflow.log_metrics(best.metrics)
+        mlflow.log_metric('training_wall_seconds', training_seconds)
+        mlflow.set_tag("best_model", best.name)
+        version = mlflow.register_model(f"runs:/{run.info.run_id}/best_model", "credit-risk-proxy-best")
+    return version.version
+
+
+def train(config=TrainingConfig()):
+    """Search every configured model family, pick the best by test F1 and
+    (optionally) register it. Returns a TrainingResult."""
+    if config.search not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {config.search}; expected one of {SEARCH_MODES}")
+    start = time.perf_counter()
+    data = load_training_data(config.data_path, config.test_size, config.random_state, config.cache_dir,
+                              config.sparse)
+    load_seconds = time.perf_counter() - start
+
+    families = select_families(config)
+    mlflow.set_experiment(config.experiment)
+    family_workers = max(1, min(config.parallel_families, len(families)))
+    total_jobs = config.n_jobs if config.n_jobs > 0 else N_CPUS
+    n_jobs = max(1, total_jobs // family_workers)
+
+    training_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=family_workers) as pool:
+        results = list(pool.map(lambda item: run_experiment(*item, data, config, n_jobs), families.items()))
+    training_seconds = time.perf_counter() - training_start
+
+    # Select best model by F1
+    best = max(results, key=lambda result: result.metrics['f1'])
+    registered_version = register_best(best, training_seconds, config.experiment) if config.register else None
+
+    return TrainingResult(
+        best=best, families=results, load_seconds=load_seconds,
+        total_seconds=time.perf_counter() - start, cache_hit=data.cache_hit,
+        registered_version=registered_version
+    )
+
+
+def parse_args(argv=None):
+    defaults = TrainingConfig()
+    parser = argparse.ArgumentParser(description="Train and register the credit risk model")
+    parser.add_argument('--data', dest='data_path', default=defaults.data_path,
+                        help="model dataset or feature store directory (default: the processed feature store, "
+                             "else model_data_with_proxy)")
+    parser.add_argument('--families', nargs='+', default=list(defaults.families))
+    parser.add_argument('--grid', dest='grids', type=json.loads, default=None,
+                        help='JSON grids per family, e.g. \'{"LogisticRegression": {"C": [0.1, 1]}}\'')
+    parser.add_argument('--search', choices=SEARCH_MODES, default=defaults.search)
+    parser.add_argument('--cv', type=int, default=defaults.cv)
+    parser.add_argument('--n-jobs', type=int, default=defaults.n_jobs)
+    parser.add_argument('--parallel-families', type=int, default=defaults.parallel_families)
+    parser.add_argument('--cache-dir', default=defaults.cache_dir)
+    parser.add_argument('--no-register', dest='register', action='store_false')
+    parser.add_argument('--sparse', action='store_true', default=defaults.sparse,
+                        help="train on CSR matrices (wide categorical encodings)")
+    args = parser.parse_args(argv)
+    return TrainingConfig(**{**defaults._asdict(), **vars(args), 'families': tuple(args.families)})
+
+
+if __name__ == "__main__":
+    result = train(parse_args())
+    for family in result.families:
+        print(f"{family.name}: f1={family.metrics['f1']:.4f} fit={family.fit_seconds:.1f}s "
+              f"cpu={family.cpu_utilization:.0%} params={family.best_params}")
+    print(f"Best model: {result.best.name}")
+    print(f"Metrics: {result.best.metrics}")
+    print(f"Data load: {result.load_seconds:.2f}s (cache {'hit' if result.cache_hit else 'miss'}), "
+          f"total: {result.total_seconds:.1f}s")
@@ -3,51 +3,203 @@
 Proxy Target Variable Engineering for Credit Risk
 """
 
+import json
+import os
 import pandas as pd
 import numpy as np
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+try:
+    from .storage import (read_frame, write_frame, iter_frame, write_frame_chunks, frame_categories,
+                          dataset_path, DEFAULT_FORMAT, PROCESSED_DIR, load_raw_transactions)
+except ImportError:
+    from storage import (read_frame, write_frame, iter_frame, write_frame_chunks, frame_categories,
+                         dataset_path, DEFAULT_FORMAT, PROCESSED_DIR, load_raw_transactions)
+
+# 'kmeans' (full batch, the default), 'minibatch' or 'sampled'; see cluster_rfm
+CLUSTERING_METHODS = ('kmeans', 'minibatch', 'sampled')
+RFM_CLUSTERING = os.getenv('RFM_CLUSTERING', 'kmeans')
+
+RFM_COLUMNS = ['Recency', 'Frequency', 'Monetary']
+# Scaler, centroids and high-risk cluster for labelling new customers without refitting
+PROXY_MODEL_PATH = os.path.join(PROCESSED_DIR, 'proxy_label_model.json')
 
 def calculate_rfm(df, snapshot_date=None):
+    # Parse into a copy so a frame shared with other stages is never modified
+    df = df[['CustomerId', 'TransactionStartTime', 'TransactionId', 'Value']].assign(
+        TransactionStartTime=pd.to_datetime(df['TransactionStartTime'])
+    )
     if snapshot_date is None:
-        snapshot_date = pd.to_datetime(df['TransactionStartTime']).max() + pd.Timedelta(days=1)
-    df['TransactionStartTime'] = pd.to_datetime(df['TransactionStartTime'])
-    rfm = df.groupby('CustomerId').agg({
-        'TransactionStartTime': lambda x: (snapshot_date - x.max()).days,
-        'TransactionId': 'count',
-        'Value': 'sum'
-    }).reset_index()
-    rfm.columns = ['CustomerId', 'Recency', 'Frequency', 'Monetary']
+        snapshot_date = df['TransactionStartTime'].max() + pd.Timedelta(days=1)
+    rfm = df.groupby('CustomerId', observed=True).agg(
+        Recency=('TransactionStartTime', 'max'),
+        Frequency=('TransactionId', 'count'),
+        Monetary=('Value', 'sum')
+    ).reset_index()
+    # One vectorized subtraction instead of a Python call per customer
+    rfm['Recency'] = (snapshot_date - rfm['Recency']).dt.days
     return rfm
 
-def cluster_rfm(rfm, n_clusters=3, random_state=42):
+def cluster_rfm(rfm, n_clusters=3, random_state=42, method=None, sample_size=100000, batch_size=4096):
+    """Cluster standardized RFM values; returns the frame with a `cluster`
+    column and the fitted scaler + clusterer as a Pipeline.
+    
+    method 'kmeans' runs full-batch KMeans with 10 initializations. 'minibatch'
+    uses MiniBatchKMeans. 'sampled' picks the initialization with 10 KMeans
+    runs on a random sample of `sample_size` customers and refines it with a
+    single full-batch run. The faster methods scale to millions of customers.
+    """
+    method = method or RFM_CLUSTERING
     scaler = StandardScaler()
     rfm_scaled = scaler.fit_transform(rfm[['Recency', 'Frequency', 'Monetary']])
-    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    if method == 'kmeans':
+        kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    elif method == 'minibatch':
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state,
+                                 batch_size=batch_size, n_init=3)
+    elif method == 'sampled':
+        rng = np.random.RandomState(random_state)
+        sample = rfm_scaled
+        if len(rfm_scaled) > sample_size:
+            sample = rfm_scaled[rng.choice(len(rfm_scaled), sample_size, replace=False)]
+        init = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10).fit(sample).cluster_centers_
+        kmeans = KMeans(n_clusters=n_clusters, init=init, n_init=1, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown clustering method: {method}; expected one of {CLUSTERING_METHODS}")
     rfm['cluster'] = kmeans.fit_predict(rfm_scaled)
-    return rfm, kmeans
+    return rfm, Pipeline([('scaler', scaler), ('kmeans', kmeans)])
 
-def assign_high_risk(rfm):
+def high_risk_cluster(rfm):
+    """Cluster with the lowest frequency and monetary value and the highest recency"""
     cluster_stats = rfm.groupby('cluster')[['Recency', 'Frequency', 'Monetary']].mean()
-    high_risk_cluster = cluster_stats.sort_values(['Frequency', 'Monetary', 'Recency'], ascending=[True, True, False]).index[0]
-    rfm['is_high_risk'] = (rfm['cluster'] == high_risk_cluster).astype(int)
+    return cluster_stats.sort_values(['Frequency', 'Monetary', 'Recency'], ascending=[True, True, False]).index[0]
+
+def assign_high_risk(rfm):
+    rfm['is_high_risk'] = (rfm['cluster'] == high_risk_cluster(rfm)).astype(int)
     return rfm[['CustomerId', 'is_high_risk']]
 
-def merge_high_risk(main_path, out_path, rfm_high_risk, account_customer_map):
-    data = pd.read_csv(main_path)
+def save_proxy_label_model(model, high_risk, snapshot_date, path=PROXY_MODEL_PATH):
+    """Write the fitted scaler statistics, centroids and high-risk cluster id as JSON"""
+    scaler, kmeans = model.named_steps['scaler'], model.named_steps['kmeans']
+    with open(path, 'w') as f:
+        json.dump({
+            'features': RFM_COLUMNS,
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+            'centroids': kmeans.cluster_centers_.tolist(),
+            'high_risk_cluster': int(high_risk),
+            'snapshot_date': str(snapshot_date)
+        }, f, indent=2)
+    return path
+
+def load_proxy_label_model(path=PROXY_MODEL_PATH):
+    with open(path) as f:
+        model = json.load(f)
+    for key in ['mean', 'scale', 'centroids']:
+        model[key] = np.asarray(model[key], dtype=np.float64)
+    return model
+
+def assign_proxy_label(rfm_rows, model):
+    """is_high_risk of new customers by nearest centroid, without refitting.
+    
+    `rfm_rows` is a frame with Recency, Frequency and Monetary columns or an
+    (n, 3) array in that order. Returns (is_high_risk, cluster) int arrays.
+    """
+    if isinstance(rfm_rows, pd.DataFrame):
+        rfm_rows = rfm_rows[model['features']]
+    X = (np.asarray(rfm_rows, dtype=np.float64).reshape(-1, len(model['features'])) - model['mean']) / model['scale']
+    # Squared distances up to the per-row constant |x|^2, which argmin ignores
+    centroids = model['centroids']
+    distances = (centroids ** 2).sum(axis=1) - 2 * X @ centroids.T
+    cluster = distances.argmin(axis=1)
+    return (cluster == model['high_risk_cluster']).astype(int), cluster
+
+def create_proxy_labels(df, snapshot_date=None, method=None, model_path=None):
+    """RFM-cluster the customers of a transaction frame into high-risk labels
+    
+    With `model_path`, the fitted scaler, centroids and high-risk cluster are
+    also saved there for assign_proxy_label.
+    """
+    rfm = calculate_rfm(df, snapshot_date)
+    rfm, model = cluster_rfm(rfm, method=method)
+    if model_path:
+        if snapshot_date is None:
+            snapshot_date = pd.to_datetime(df['TransactionStartTime']).max() + pd.Timedelta(days=1)
+        save_proxy_label_model(model, high_risk_cluster(rfm), snapshot_date, model_path)
+    rfm_high_risk = assign_high_risk(rfm)
+    # Map AccountId to CustomerId (one-to-one mapping)
+    account_customer_map = df[['AccountId', 'CustomerId']].drop_duplicates()
+    return rfm_high_risk, account_customer_map
+
+def _positions(index, keys):
+    """Position of every key in `index`, -1 when missing; categorical keys are
+    looked up once per category and then expanded through their codes"""
+    keys = pd.Series(keys)
+    if isinstance(keys.dtype, pd.CategoricalDtype):
+        codes = keys.cat.codes.to_numpy()
+        return np.where(codes >= 0, index.get_indexer(keys.cat.categories)[codes], -1)
+    return index.get_indexer(keys)
+
+def high_risk_lookup(rfm_high_risk, account_customer_map):
+    """Integer-coded AccountId -> is_high_risk table.
+    
+    Returns the AccountId index and an array with each account's label
+    followed by a trailing 0, so position -1 (an unknown account) reads 0.
+    Returns None when an account maps to several customers, where the join
+    would duplicate rows.
+    """
+    accounts = pd.Index(account_customer_map['AccountId'])
+    if not accounts.is_unique:
+        return None
+    customer_labels = np.append(rfm_high_risk['is_high_risk'].to_numpy(dtype=np.int64), 0)
+    customer_codes = _positions(pd.Index(rfm_high_risk['CustomerId']), account_customer_map['CustomerId'])
+    return accounts, np.append(customer_labels[customer_codes], 0)
+
+def _join_high_risk(data, rfm_high_risk, account_customer_map):
     # Map AccountId to CustomerId
     data = data.merge(account_customer_map, on='AccountId', how='left')
     data = data.merge(rfm_high_risk, on='CustomerId', how='left')
     data['is_high_risk'] = data['is_high_risk'].fillna(0).astype(int)
     data.drop(columns=['CustomerId'], inplace=True)
-    data.to_csv(out_path, index=False)
     return data
 
+def attach_high_risk(data, rfm_high_risk, account_customer_map, lookup=None):
+    """Add the is_high_risk label to an account-level frame
+    
+    Labels are read from an array indexed by AccountId code (see
+    high_risk_lookup) instead of joining twice on string keys; the result is
+    the same as the two left joins.
+    """
+    lookup = lookup or high_risk_lookup(rfm_high_risk, account_customer_map)
+    if lookup is None:
+        return _join_high_risk(data, rfm_high_risk, account_customer_map)
+    accounts, account_labels = lookup
+    data = data.reset_index(drop=True)
+    data['is_high_risk'] = account_labels[_positions(accounts, data['AccountId'])]
+    return data
+
+def merge_high_risk(main_path, out_path, rfm_high_risk, account_customer_map, chunksize=None):
+    """Write the model dataset with is_high_risk attached.
+    
+    With `chunksize`, the model dataset is streamed in chunks of rows and
+    written chunk by chunk, so only one chunk is held in memory; the file is
+    the same as the in-memory path writes. Returns the labelled frame, or the
+    number of rows written when streaming.
+    """
+    if not chunksize:
+        data = attach_high_risk(read_frame(main_path), rfm_high_risk, account_customer_map)
+        write_frame(data, out_path)
+        return data
+    
+    lookup = high_risk_lookup(rfm_high_risk, account_customer_map)
+    chunks = (attach_high_risk(chunk, rfm_high_risk, account_customer_map, lookup)
+              for chunk in iter_frame(main_path, chunksize))
+    return write_frame_chunks(chunks, out_path, frame_categories(main_path))
+
 if __name__ == "__main__":
-    df = pd.read_csv('../data/raw/data.csv')
-    rfm = calculate_rfm(df)
-    rfm, _ = cluster_rfm(rfm)
-    rfm_high_risk = assign_high_risk(rfm)
-    # Map AccountId to CustomerId (one-to-one mapping)
-    account_customer_map = df[['AccountId', 'CustomerId']].drop_duplicates()
-    merge_high_risk('../data/processed/model_data.csv', '../data/processed/model_data_with_proxy.csv', rfm_high_risk, account_customer_map) 
\ No newline at end of file
+    df = load_raw_transactions()
+    rfm_high_risk, account_customer_map = create_proxy_labels(df, model_path=PROXY_MODEL_PATH)
+    merge_high_risk(dataset_path('model_data'), dataset_path('model_data_with_proxy', fmt=DEFAULT_FORMAT),
+                    rfm_high_risk, account_customer_map) 
\ No newline at end of file
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Scored-Account Store for Credit Risk
+SQLite-backed account features and per-model-version scores with an LRU memory tier
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_SCORE_STORE_PATH = '../data/processed/scores.sqlite'
+ID_COLUMNS = ['AccountId', 'default_risk', 'risk_category', 'risk_score', 'is_high_risk']
+
+
+class ScoreStore:
+    """Account feature rows plus cached risk scores keyed by model version.
+
+    Features are written once per batch run by `data_processor`, which then
+    scores them with the registered model via `precompute_scores` when one is
+    available; other scores are computed on demand and stored next to
+    the model version that produced them, so a new model version never serves
+    a stale score. The most recently used scores are also kept in memory.
+    """
+
+    def __init__(self, path=DEFAULT_SCORE_STORE_PATH, memory_size=10000):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._columns = None
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS features (account_id TEXT PRIMARY KEY, vector BLOB);
+                CREATE TABLE IF NOT EXISTS scores (
+                    account_id TEXT, model_version TEXT, risk_probability REAL,
+                    PRIMARY KEY (account_id, model_version)
+                );
+            """)
+        return self._conn
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def write_features(self, feature_df, id_column='AccountId'):
+        """Replace the stored feature rows; scores of the old features are dropped"""
+        columns = [col for col in feature_df.columns if col not in ID_COLUMNS]
+        matrix = np.ascontiguousarray(feature_df[columns].to_numpy(dtype=np.float64))
+        rows = ((str(account_id), matrix[i].tobytes())
+                for i, account_id in enumerate(feature_df[id_column]))
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM features")
+            self.conn.execute("DELETE FROM scores")
+            self.conn.executemany("INSERT INTO features VALUES (?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('columns', ?)", (json.dumps(columns),))
+            self._memory.clear()
+            self._columns = columns
+        return len(matrix)
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            with self._lock:
+                row = self.conn.execute("SELECT value FROM meta WHERE key = 'columns'").fetchone()
+            self._columns = json.loads(row[0]) if row else []
+        return self._columns
+
+    def get_features(self, account_id, columns=None):
+        """Stored feature vector of an account (optionally reordered), or None"""
+        with self._lock:
+            row = self.conn.execute("SELECT vector FROM features WHERE account_id = ?",
+                                    (str(account_id),)).fetchone()
+        if row is None:
+            return None
+        vector = np.frombuffer(row[0], dtype=np.float64)
+        if columns is not None and list(columns) != self.columns:
+            positions = {col: i for i, col in enumerate(self.columns)}
+            vector = vector[[positions[col] for col in columns]]
+        return vector
+
+    def get_score(self, account_id, model_version):
+        """Cached probability for this model version, or None on a miss"""
+        key = str(account_id)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and cached[0] == model_version:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return cached[1]
+            row = self.conn.execute(
+                "SELECT risk_probability FROM scores WHERE account_id = ? AND model_version = ?",
+                (key, model_version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.store_hits += 1
+            self._remember(key, model_version, row[0])
+            return row[0]
+
+    def put_score(self, account_id, model_version, risk_probability):
+        key = str(account_id)
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO scores VALUES (?, ?, ?)",
+                              (key, model_version, float(risk_probability)))
+            self._remember(key, model_version, float(risk_probability))
+
+    def _remember(self, key, model_version, risk_probability):
+        self._memory[key] = (model_version, risk_probability)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def precompute_scores(self, predict, model_version, columns=None, batch_size=900):
+        """Score every stored account with predict(X) -> probabilities in batches"""
+        positions = None
+        if columns is not None and list(columns) != self.columns:
+            index = {col: i for i, col in enumerate(self.columns)}
+            positions = [index[col] for col in columns]
+        with self._lock:
+            account_ids = [row[0] for row in self.conn.execute("SELECT account_id FROM features")]
+        n_scored = 0
+        for start in range(0, len(account_ids), batch_size):
+            batch_ids = account_ids[start:start + batch_size]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT account_id, vector FROM features WHERE account_id IN ({','.join('?' * len(batch_ids))})",
+                    batch_ids
+                ).fetchall()
+            X = np.vstack([np.frombuffer(vector, dtype=np.float64) for _, vector in rows])
+            if positions is not None:
+                X = X[:, positions]
+            probabilities = predict(X)
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?)",
+                    ((account_id, model_version, float(p)) for (account_id, _), p in zip(rows, probabilities))
+                )
+            n_scored += len(rows)
+        return n_scored
+
+    def invalidate(self, model_version):
+        """Drop every score that was not produced by `model_version`"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM scores WHERE model_version != ?", (model_version,))
+            stale = [key for key, (version, _) in self._memory.items() if version != model_version]
+            for key in stale:
+                del self._memory[key]
+
+    def metrics(self):
+        lookups = self.memory_hits + self.store_hits + self.misses
+        return {
+            'memory_size': len(self._memory),
+            'memory_capacity': self.memory_size,
+            'memory_hits': self.memory_hits,
+            'store_hits': self.store_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.memory_hits + self.store_hits) / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Dataset Storage for Credit Scoring Model
+Parquet by default, CSV as a fallback, with explicit dtypes and column projection
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = pq = None
+    PARQUET_AVAILABLE = False
+
+PROCESSED_DIR = '../data/processed'
+DEFAULT_FORMAT = os.getenv('CREDIT_RISK_STORAGE_FORMAT', 'parquet' if PARQUET_AVAILABLE else 'csv')
+EXTENSIONS = {'parquet': '.parquet', 'csv': '.csv'}
+
+# Explicit dtypes for columns that appear in the stored datasets
+CATEGORICAL_COLUMNS = ['ProviderId', 'ChannelId', 'ProductCategory', 'risk_category']
+INTEGER_COLUMNS = {
+    'transaction_count': 'int32', 'fraud_count': 'int32',
+    'high_value_count': 'int32', 'low_value_count': 'int32',
+    'default_risk': 'int8', 'is_high_risk': 'int8', 'risk_category_encoded': 'int8'
+}
+
+
+def apply_dtypes(df):
+    """Cast known columns to their storage dtypes (categoricals, narrow ints)"""
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns and df[col].notna().all():
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def storage_format(path):
+    """Format implied by a file extension"""
+    for fmt, ext in EXTENSIONS.items():
+        if str(path).endswith(ext):
+            return fmt
+    raise ValueError(f"Unknown dataset format for {path}")
+
+
+def dataset_path(name, directory=PROCESSED_DIR, fmt=None):
+    """Path of a named dataset; with no format, an existing file of either format is preferred"""
+    if fmt is None:
+        for candidate in [DEFAULT_FORMAT] + [f for f in EXTENSIONS if f != DEFAULT_FORMAT]:
+            path = os.path.join(directory, name + EXTENSIONS[candidate])
+            if os.path.exists(path):
+                return path
+        fmt = DEFAULT_FORMAT
+    return os.path.join(directory, name + EXTENSIONS[fmt])
+
+
+def sparse_frame(matrix, columns, index=None):
+    """Frame of Sparse[float64, 0] columns from a SciPy sparse matrix
+
+    DataFrame.sparse.from_spmatrix fills with NaN under newer pandas, which
+    would turn the implicit zeros into missing values when densified.
+    """
+    matrix = sparse.csc_matrix(matrix, dtype='float64')
+    return pd.DataFrame({
+        col: pd.arrays.SparseArray.from_spmatrix(matrix[:, [i]]) for i, col in enumerate(columns)
+    }, index=index)
+
+
+def write_frame(df, path):
+    """Write a frame in the format given by the path's extension"""
+    fmt = storage_format(path)
+    df = apply_dtypes(df.copy())
+    # Neither format stores pandas sparse columns; Parquet compresses the zeros
+    sparse_columns = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+    if sparse_columns:
+        df[sparse_columns] = df[sparse_columns].sparse.to_dense()
+    if fmt == 'parquet':
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is required to write Parquet; use a .csv path instead")
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def frame_columns(path):
+    """Column names of a stored frame without loading its data"""
+    if storage_format(path) == 'parquet':
+        return list(pq.read_schema(path).names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_frame(path, columns=None):
+    """Read a stored frame, loading only `columns` when given"""
+    if storage_format(path) == 'parquet':
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow is required to read Parquet")
+        return pd.read_parquet(path, columns=columns)
+    df = apply_dtypes(pd.read_csv(path, usecols=columns))
+    return df[columns] if columns is not None else df
+
+
+def frame_categories(path):
+    """CategoricalDtype that write_frame would give each categorical column of a stored frame"""
+    columns = [col for col in CATEGORICAL_COLUMNS if col in frame_columns(path)]
+    if not columns:
+        return {}
+    df = read_frame(path, columns=columns)
+    return {col: df[col].astype('category').dtype for col in columns}
+
+
+def iter_frame(path, chunksize=100000, columns=None):
+    """Yield a stored frame in chunks of rows"""
+    if storage_format(path) == 'parquet':
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+
+def write_frame_chunks(chunks, path, categories=None):
+    """Write frames one after another into a single file, like write_frame on their concatenation.
+
+    `categories` (see frame_categories) pins each categorical column's
+    categories so every chunk has the same schema and codes.
+    """
+    fmt = storage_format(path)
+    if fmt == 'parquet' and not PARQUET_AVAILABLE:
+        raise ImportError("pyarrow is required to write Parquet; use a .csv path instead")
+    writer, n_rows = None, 0
+    try:
+        for chunk in chunks:
+            chunk = apply_dtypes(chunk.copy())
+            for col, dtype in (categories or {}).items():
+                if col in chunk.columns:
+                    chunk[col] = chunk[col].astype(dtype)
+            if fmt == 'parquet':
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+            else:
+                chunk.to_csv(path, index=False, header=n_rows == 0, mode='w' if n_rows == 0 else 'a')
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return n_rows
+
+
+def save_dataset(df, name, directory=PROCESSED_DIR, fmt=None):
+    """Write a named dataset (features, targets, model_data, ...) in the default format"""
+    return write_frame(df, os.path.join(directory, name + EXTENSIONS[fmt or DEFAULT_FORMAT]))
+
+
+def load_dataset(name, directory=PROCESSED_DIR, columns=None):
+    """Load a named dataset from whichever format exists, Parquet first"""
+    return read_frame(dataset_path(name, directory), columns=columns)
+
+
+# Feature store: the model feature matrix as one C-contiguous .npy file with
+# target vectors and AccountIds next to it, for memory-mapped training. Each
+# write goes to its own version directory; manifest.json names the current one.
+FEATURE_STORE_DIR = os.path.join(PROCESSED_DIR, 'feature_store')
+FEATURE_STORE_DTYPE = os.getenv('FEATURE_STORE_DTYPE', 'float64')
+FEATURE_STORE_MANIFEST = 'manifest.json'
+FEATURE_STORE_VERSION_PREFIX = 'version-'
+
+# X and the targets are read-only memory maps; `targets` maps a name to its vector
+# `split` is the stored row split (test_size, random_state, n_train) or None
+FeatureStore = namedtuple('FeatureStore', ['X', 'targets', 'columns', 'account_ids', 'split', 'manifest'])
+
+
+def _read_manifest(directory):
+    with open(os.path.join(directory, FEATURE_STORE_MANIFEST)) as f:
+        return json.load(f)
+
+
+def write_feature_store(df, feature_columns, target_columns, directory=FEATURE_STORE_DIR,
+                        id_column='AccountId', dtype=FEATURE_STORE_DTYPE, row_order=None, split=None):
+    """Store a model frame as features.npy (rows x feature_columns, `dtype`),
+    one int8 .npy per target and the AccountIds, described by manifest.json.
+
+    Columns are copied into the matrix one at a time (sparse columns
+    densified), so the frame is never duplicated in memory as a whole.
+    Rows are written in `row_order` (positions in `df`) when given; `split`
+    records in the manifest that they are the train rows followed by the test
+    rows of that split, e.g. {'test_size': 0.2, 'random_state': 42,
+    'n_train': 800}, so training can slice the mapped matrix.
+
+    The files go into a new version directory and manifest.json, which names
+    it, is replaced once they are complete, so a reader always sees the files
+    of a single write. The previous version is kept for readers that loaded
+    the old manifest just before the switch; older ones are removed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_manifest(directory)['version'] if feature_store_exists(directory) else None
+    version_dir = tempfile.mkdtemp(prefix=FEATURE_STORE_VERSION_PREFIX, dir=directory)
+    # mkdtemp creates the directory 0700; readers may run as other users
+    os.chmod(version_dir, 0o755)
+    version = os.path.basename(version_dir)
+
+    matrix = np.lib.format.open_memmap(os.path.join(version_dir, 'features.npy'), mode='w+',
+                                       dtype=np.dtype(dtype), shape=(len(df), len(feature_columns)))
+    rows = slice(None) if row_order is None else np.asarray(row_order)
+    for i, col in enumerate(feature_columns):
+        matrix[:, i] = df[col].to_numpy(dtype=matrix.dtype)[rows]
+    matrix.flush()
+    del matrix
+    for col in target_columns:
+        np.save(os.path.join(version_dir, f'target_{col}.npy'), df[col].to_numpy(dtype=np.int8)[rows])
+    np.save(os.path.join(version_dir, 'account_ids.npy'), df[id_column].astype(str).to_numpy(dtype=str)[rows])
+
+    manifest = {'version': version, 'shape': [len(df), len(feature_columns)], 'dtype': np.dtype(dtype).name,
+                'columns': list(feature_columns), 'targets': list(target_columns), 'id_column': id_column,
+                'split': split}
+    manifest_path = os.path.join(directory, FEATURE_STORE_MANIFEST)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    for name in os.listdir(directory):
+        if name.startswith(FEATURE_STORE_VERSION_PREFIX) and name not in (version, previous):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return manifest_path
+
+
+def feature_store_exists(directory=FEATURE_STORE_DIR):
+    return os.path.exists(os.path.join(directory, FEATURE_STORE_MANIFEST))
+
+
+def open_feature_store(directory=FEATURE_STORE_DIR):
+    """Memory-map the current version of a store written by write_feature_store"""
+    manifest = _read_manifest(directory)
+    version_dir = os.path.join(directory, manifest['version'])
+    X = np.load(os.path.join(version_dir, 'features.npy'), mmap_mode='r')
+    targets = {col: np.load(os.path.join(version_dir, f'target_{col}.npy'), mmap_mode='r')
+               for col in manifest['targets']}
+    account_ids = np.load(os.path.join(version_dir, 'account_ids.npy'), mmap_mode='r')
+    return FeatureStore(X, targets, manifest['columns'], account_ids, manifest.get('split'),
+                        os.path.join(directory, FEATURE_STORE_MANIFEST))
+
+
+# Raw transaction schema (data/raw/data.csv)
+RAW_DATA_PATH = '../data/raw/data.csv'
+RAW_CODE_COLUMNS = ['TransactionId', 'BatchId']
+RAW_CATEGORICAL_COLUMNS = [
+    'AccountId', 'SubscriptionId', 'CustomerId', 'CurrencyCode',
+    'ProviderId', 'ProductId', 'ProductCategory', 'ChannelId'
+]
+RAW_ID_COLUMNS = RAW_CODE_COLUMNS + ['AccountId', 'SubscriptionId', 'CustomerId', 'ProviderId', 'ProductId', 'ChannelId']
+RAW_INTEGER_COLUMNS = ['CountryCode', 'Value', 'PricingStrategy', 'FraudResult']
+RAW_TIME_COLUMN = 'TransactionStartTime'
+
+
+def _integer_codes(series):
+    """'TransactionId_76871' -> 76871, or None when the IDs do not follow that pattern"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return series
+    codes = pd.to_numeric(series.astype(str).str.rsplit('_', n=1).str[-1], errors='coerce')
+    if codes.isna().any():
+        return None
+    return pd.to_numeric(codes, downcast='integer')
+
+
+def optimize_raw_dtypes(df, categoricals=True):
+    """Apply the raw schema in place: near-unique IDs become integer codes, the
+    other IDs and labels categoricals, integers are downcast and the timestamp
+    is parsed once. Amount stays float64 so sums and std match the originals.
+    
+    Chunked readers pass categoricals=False because categories would differ
+    from chunk to chunk.
+    """
+    for col in RAW_CODE_COLUMNS:
+        if col in df.columns:
+            codes = _integer_codes(df[col])
+            if codes is not None:
+                df[col] = codes
+            elif categoricals:
+                df[col] = df[col].astype('category')
+    if categoricals:
+        for col in RAW_CATEGORICAL_COLUMNS:
+            if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype('category')
+    for col in RAW_INTEGER_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col].dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    if RAW_TIME_COLUMN in df.columns and not pd.api.types.is_datetime64_any_dtype(df[RAW_TIME_COLUMN].dtype):
+        df[RAW_TIME_COLUMN] = pd.to_datetime(df[RAW_TIME_COLUMN])
+    return df
+
+
+def load_raw_transactions(path=RAW_DATA_PATH, columns=None, verbose=True):
+    """Load raw transactions (CSV or Parquet) with the compact raw schema"""
+    if storage_format(path) == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    before = df.memory_usage(deep=True).sum()
+    optimize_raw_dtypes(df)
+    after = df.memory_usage(deep=True).sum()
+    if verbose:
+        print(f"Loaded {len(df):,} transactions: {before / 1024**2:.2f} MB -> {after / 1024**2:.2f} MB in memory")
+    return df
+
+
+def iter_raw_transactions(path=RAW_DATA_PATH, chunksize=100000, columns=None):
+    """Yield raw transaction chunks with parsed timestamps and downcast numerics"""
+    if storage_format(path) == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            chunk = batch.to_pandas()
+            for col in chunk.select_dtypes('category').columns:
+                chunk[col] = chunk[col].astype(object)
+            yield optimize_raw_dtypes(chunk, categoricals=False)
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+            yield optimize_raw_dtypes(chunk, categoricals=False)
+
+
+def save_raw_transactions(df, path):
+    """Store raw transactions (e.g. data/raw/data.parquet) with the raw schema applied"""
+    df = optimize_raw_dtypes(df.copy())
+    if storage_format(path) == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
@@ -5,29 +5,39 @@ Target Variable Generator for Credit Scoring Model
 
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import LabelEncoder
+
+try:
+    from .feature_engineering import account_aggregates
+    from .storage import save_dataset, load_raw_transactions
+except ImportError:
+    from feature_engineering import account_aggregates
+    from storage import save_dataset, load_raw_transactions
+
+# Target column -> account_aggregates column
+TARGET_AGGREGATES = {
+    'fraud_count': 'FraudResult_sum', 'fraud_rate': 'FraudResult_mean',
+    'avg_value': 'Value_mean', 'max_value': 'Value_max',
+    'avg_amount': 'Amount_mean', 'amount_std': 'Amount_std'
+}
 
 def create_target_variable(df):
     """Create target variable for credit scoring"""
-    
-    customer_targets = df.groupby('AccountId').agg({
-        'FraudResult': ['sum', 'mean'],
-        'Value': ['mean', 'max'],
-        'Amount': ['mean', 'std']
-    }).round(4)
-    
-    customer_targets.columns = [
-        'fraud_count', 'fraud_rate', 'avg_value', 'max_value',
-        'avg_amount', 'amount_std'
-    ]
-    
+    return targets_from_aggregates(account_aggregates(df, columns=['FraudResult', 'Value', 'Amount'], modes=False))
+
+def targets_from_aggregates(aggregates):
+    """Target variables from account_aggregates, e.g. the frame the feature
+    pipeline already built (see build_features_and_aggregates)"""
+    customer_targets = aggregates[list(TARGET_AGGREGATES.values())].round(4)
+    customer_targets.columns = list(TARGET_AGGREGATES)
     customer_targets = customer_targets.reset_index()
     
     # Define risk categories based on fraud patterns and transaction behavior
+    # (both 90% quantiles in one call; NaN stds are skipped as in Series.quantile)
+    thresholds = customer_targets[['avg_value', 'amount_std']].quantile(0.9)
     customer_targets['risk_score'] = (
         customer_targets['fraud_rate'] * 100 +
-        (customer_targets['avg_value'] > customer_targets['avg_value'].quantile(0.9)).astype(int) * 20 +
-        (customer_targets['amount_std'] > customer_targets['amount_std'].quantile(0.9)).astype(int) * 10
+        (customer_targets['avg_value'] > thresholds['avg_value']).astype(int) * 20 +
+        (customer_targets['amount_std'] > thresholds['amount_std']).astype(int) * 10
     )
     
     # Create risk categories
@@ -43,19 +53,20 @@ def create_target_variable(df):
         (customer_targets['risk_score'] > customer_targets['risk_score'].quantile(0.8))
     ).astype(int)
     
-    # Encode risk categories
-    le = LabelEncoder()
-    customer_targets['risk_category_encoded'] = le.fit_transform(customer_targets['risk_category'])
+    # Encode risk categories like LabelEncoder: codes of the sorted labels present
+    customer_targets['risk_category_encoded'] = pd.factorize(
+        customer_targets['risk_category'].astype(str), sort=True
+    )[0]
     
     return customer_targets
 
 def save_targets(target_df):
     """Save target variables"""
-    target_df.to_csv('../data/processed/targets.csv', index=False)
+    save_dataset(target_df, 'targets')
     return target_df
 
 if __name__ == "__main__":
-    df = pd.read_csv('../data/raw/data.csv')
+    df = load_raw_transactions()
     targets = create_target_variable(df)
     save_targets(targets)
     print(f"Targets created: {targets.shape}")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Event-Time Transaction Index for Credit Risk
+Point-in-time rolling account features (7/30/90-day counts, sums and fraud
+rates, recency) for any snapshot date without re-filtering the transactions
+"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .storage import load_raw_transactions
+except ImportError:
+    from storage import load_raw_transactions
+
+DEFAULT_WINDOWS = (7, 30, 90)
+DAY_NS = 86400 * 10**9
+
+
+def _nanoseconds(times):
+    """int64 UTC nanoseconds of a datetime-like column, and its timezone"""
+    times = pd.DatetimeIndex(pd.to_datetime(times))
+    return times.as_unit('ns').asi8, times.tz
+
+
+class TransactionIndex:
+    """Transactions sorted by (AccountId, TransactionStartTime) with prefix sums
+
+    Account i owns rows offsets[i]:offsets[i + 1] of the sorted arrays. The
+    sums of Value, Amount and FraudResult over any time range of an account
+    are the difference of two prefix sums at positions found by binary search,
+    so a snapshot costs O(accounts * log(transactions)) whatever the size of
+    the window.
+
+    The searches for all accounts are one np.searchsorted over `keys`, which
+    is account code * (n distinct times + 1) + rank of the time among the
+    distinct times: sorted, exact, and a query key never crosses into the
+    neighbouring account's rows.
+    """
+
+    SUM_COLUMNS = {'value': 'Value', 'amount': 'Amount', 'fraud': 'FraudResult'}
+
+    def __init__(self, accounts, offsets, times, keys, distinct_times, prefix, tz=None):
+        self.accounts = accounts
+        self.offsets = offsets
+        self.times = times
+        self.keys = keys
+        self.distinct_times = distinct_times
+        self.stride = len(distinct_times) + 1
+        self.prefix = prefix
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, df):
+        """Index a transaction frame with AccountId, TransactionStartTime,
+        Value, Amount and FraudResult columns"""
+        codes, accounts = pd.factorize(df['AccountId'], sort=True)
+        times, tz = _nanoseconds(df['TransactionStartTime'])
+        ranks, distinct_times = pd.factorize(times, sort=True)
+        # Sorting the keys sorts by (account, time) in a single argsort
+        keys = codes.astype(np.int64) * (len(distinct_times) + 1) + ranks
+        order = np.argsort(keys, kind='stable')
+        offsets = np.zeros(len(accounts) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(accounts)), out=offsets[1:])
+        prefix = {}
+        for name, col in cls.SUM_COLUMNS.items():
+            values = df[col].to_numpy()[order]
+            dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+            prefix[name] = np.concatenate([[0], np.cumsum(values, dtype=dtype)])
+        return cls(pd.Index(accounts, name='AccountId'), offsets, times[order], keys[order],
+                   distinct_times, prefix, tz)
+
+    def __len__(self):
+        return len(self.times)
+
+    def _timestamp(self, snapshot_date):
+        snapshot_date = pd.Timestamp(snapshot_date)
+        if self.tz is not None and snapshot_date.tzinfo is None:
+            snapshot_date = snapshot_date.tz_localize(self.tz)
+        elif self.tz is None and snapshot_date.tzinfo is not None:
+            snapshot_date = snapshot_date.tz_convert(None)
+        return snapshot_date.as_unit('ns').value
+
+    def _search(self, positions, timestamp):
+        """Row of the first transaction at or after `timestamp` of each account"""
+        rank = np.searchsorted(self.distinct_times, timestamp)
+        return np.searchsorted(self.keys, positions * self.stride + rank)
+
+    def _segments(self, accounts):
+        if accounts is None:
+            return self.accounts, np.arange(len(self.accounts))
+        positions = self.accounts.get_indexer(pd.Index(accounts))
+        if (positions < 0).any():
+            missing = pd.Index(accounts)[positions < 0]
+            raise KeyError(f"Accounts not in the index: {list(missing[:5])}")
+        return self.accounts[positions], positions
+
+    def window_features(self, snapshot_date, windows=DEFAULT_WINDOWS, accounts=None):
+        """Rolling features of every account (or of `accounts`) as of `snapshot_date`
+
+        Only transactions strictly before the snapshot count, and the N-day
+        window covers [snapshot - N days, snapshot). For each window there are
+        `txn_count_Nd`, `value_sum_Nd`, `amount_sum_Nd`, `fraud_count_Nd` and
+        `fraud_rate_Nd` (0 when the window is empty); `recency_days` is the
+        whole days since the last earlier transaction, as in calculate_rfm,
+        and NaN for accounts without one.
+        """
+        index, positions = self._segments(accounts)
+        snapshot = self._timestamp(snapshot_date)
+        starts = self.offsets[positions]
+        end = self._search(positions, snapshot)
+
+        columns = {}
+        for days in windows:
+            start = self._search(positions, snapshot - days * DAY_NS)
+            count = end - start
+            fraud = self.prefix['fraud'][end] - self.prefix['fraud'][start]
+            columns[f'txn_count_{days}d'] = count
+            columns[f'value_sum_{days}d'] = self.prefix['value'][end] - self.prefix['value'][start]
+            columns[f'amount_sum_{days}d'] = (self.prefix['amount'][end] - self.prefix['amount'][start]).round(4)
+            columns[f'fraud_count_{days}d'] = fraud
+            columns[f'fraud_rate_{days}d'] = np.divide(fraud, count, out=np.zeros(len(count)), where=count > 0).round(4)
+
+        has_history = end > starts
+        last = self.times[np.where(has_history, end - 1, 0)] if len(self.times) else np.zeros(len(end), np.int64)
+        columns['recency_days'] = np.where(has_history, (snapshot - last) // DAY_NS, np.nan)
+        return pd.DataFrame(columns, index=index)
+
+    def snapshots(self, snapshot_dates, windows=DEFAULT_WINDOWS, accounts=None):
+        """window_features for several snapshot dates, indexed by (snapshot_date, AccountId)"""
+        frames = [self.window_features(date, windows, accounts) for date in snapshot_dates]
+        return pd.concat(frames, keys=list(snapshot_dates), names=['snapshot_date'])
+
+
+if __name__ == "__main__":
+    df = load_raw_transactions()
+    index = TransactionIndex.from_frame(df)
+    snapshot_date = pd.to_datetime(df['TransactionStartTime']).max() + pd.Timedelta(days=1)
+    features = index.window_features(snapshot_date)
+    print(f"Indexed {len(index)} transactions of {len(index.accounts)} accounts")
+    print(features.describe().T)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+def make_raw_transactions(n_rows=2000, n_accounts=60, seed=0, start='2018-11-15'):
+    """Synthetic transactions with the columns and formats of data/raw/data.csv"""
+    rng = np.random.RandomState(seed)
+    accounts = rng.randint(1, n_accounts + 1, n_rows)
+    amount = np.round(rng.lognormal(7, 1.5, n_rows) * np.where(rng.rand(n_rows) < 0.3, -1, 1), 0)
+    times = pd.Timestamp(start, tz='UTC') + pd.to_timedelta(rng.randint(0, 90 * 24 * 3600, n_rows), unit='s')
+    return pd.DataFrame({
+        'TransactionId': [f'TransactionId_{i}' for i in range(n_rows)],
+        'BatchId': [f'BatchId_{i // 3}' for i in range(n_rows)],
+        'AccountId': [f'AccountId_{a}' for a in accounts],
+        'SubscriptionId': [f'SubscriptionId_{a}' for a in accounts],
+        'CustomerId': [f'CustomerId_{a % (n_accounts - 5) + 1}' for a in accounts],
+        'CurrencyCode': 'UGX',
+        'CountryCode': 256,
+        'ProviderId': [f'ProviderId_{p}' for p in rng.randint(1, 7, n_rows)],
+        'ProductId': [f'ProductId_{p}' for p in rng.randint(1, 24, n_rows)],
+        'ProductCategory': rng.choice(['airtime', 'financial_services', 'utility_bill', 'data_bundles', 'tv'], n_rows),
+        'ChannelId': [f'ChannelId_{c}' for c in rng.randint(1, 5, n_rows)],
+        'Amount': amount,
+        'Value': np.abs(amount).astype(np.int64),
+        'TransactionStartTime': times.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'PricingStrategy': rng.randint(0, 5, n_rows),
+        'FraudResult': (rng.rand(n_rows) < 0.05).astype(int)
+    })
+
+@pytest.fixture
+def raw_transactions():
+    return make_raw_transactions()
@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from src.api import main
 from src.api.main import app
 
 client = TestClient(app)
@@ -14,4 +15,18 @@ def test_root_endpoint():
     response = client.get("/")
     assert response.status_code == 200
     data = response.json()
-    assert "message" in data 
\ No newline at end of file
+    assert "message" in data 
+
+
+def test_proxy_label_endpoint(tmp_path, raw_transactions, monkeypatch):
+    from src.proxy_target_engineering import calculate_rfm, create_proxy_labels, load_proxy_label_model
+    model_path = str(tmp_path / 'proxy_label_model.json')
+    rfm_high_risk, _ = create_proxy_labels(raw_transactions, model_path=model_path)
+    monkeypatch.setattr(main, 'proxy_model', load_proxy_label_model(model_path))
+    rfm = calculate_rfm(raw_transactions)
+    response = client.post("/proxy-label", json={
+        "customers": rfm[['Recency', 'Frequency', 'Monetary']].to_dict('records')
+    })
+    assert response.status_code == 200
+    labels = [result["is_high_risk"] for result in response.json()["results"]]
+    assert labels == list(rfm_high_risk['is_high_risk'])
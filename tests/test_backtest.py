@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from src.backtest import BacktestConfig, prepare_transactions, run_backtest, snapshot_dataset
+from src.model_training import TrainingConfig, split_rows
+from src.storage import load_raw_transactions
+from tests.conftest import make_raw_transactions
+
+GRIDS = {'LogisticRegression': {'C': [1]}, 'RandomForest': {'n_estimators': [10], 'max_depth': [3]}}
+
+def test_snapshot_uses_only_earlier_transactions(raw_transactions, tmp_path):
+    path = tmp_path / 'data.csv'
+    raw_transactions.to_csv(path, index=False)
+    df = load_raw_transactions(str(path), verbose=False)
+    transactions, times, index = prepare_transactions(df)
+    snapshot_date = pd.Timestamp('2019-01-01', tz='UTC')
+    model_data, n_transactions = snapshot_dataset(transactions, times, snapshot_date, index)
+
+    before = df[df['TransactionStartTime'] < snapshot_date]
+    assert n_transactions == len(before)
+    assert sorted(model_data['AccountId']) == sorted(before['AccountId'].astype(str).unique())
+    assert model_data['is_high_risk'].sum() > 0
+    assert {'num_txn_count_7d', 'num_fraud_rate_90d', 'num_recency_days'} <= set(model_data.columns)
+
+def test_backtest_runs_snapshots_in_worker_processes():
+    snapshot_dates = ['2019-01-01', '2019-01-20', '2019-02-15']
+    config = BacktestConfig(
+        snapshot_dates=snapshot_dates, max_workers=2,
+        training=TrainingConfig(grids=GRIDS, n_jobs=2, register=False)
+    )
+    results = run_backtest(config, make_raw_transactions(n_rows=3000, n_accounts=120))
+    assert [result.snapshot_date for result in results] == [pd.Timestamp(date) for date in snapshot_dates]
+    assert [r.n_transactions for r in results] == sorted(r.n_transactions for r in results)
+    for result in results:
+        assert set(result.family_metrics) == {'LogisticRegression', 'RandomForest'}
+        assert result.metrics == result.family_metrics[result.best_family]
+        assert result.total_seconds >= result.dataset_seconds > 0
+
+def test_snapshot_without_history_is_rejected(raw_transactions):
+    transactions, times, index = prepare_transactions(raw_transactions)
+    with pytest.raises(ValueError, match='no transactions before'):
+        snapshot_dataset(transactions, times, '2018-01-01', index)
+    config = BacktestConfig(snapshot_dates=['2019-01-01', '2018-01-01'],
+                            training=TrainingConfig(grids=GRIDS, register=False))
+    with pytest.raises(ValueError, match='2018-01-01'):
+        run_backtest(config, raw_transactions)
+
+def test_rolling_features_are_scaled_on_train_rows(raw_transactions):
+    transactions, times, index = prepare_transactions(raw_transactions)
+    model_data, _ = snapshot_dataset(transactions, times, '2019-01-01', index, test_size=0.25, random_state=3)
+    train_rows, _ = split_rows(model_data['is_high_risk'], 0.25, 3)
+    train = model_data.iloc[train_rows]
+    assert abs(train['num_txn_count_30d'].mean()) < 1e-9
+    assert abs(train['num_txn_count_30d'].std(ddof=0) - 1) < 1e-9
@@ -0,0 +1,71 @@
+import asyncio
+import numpy as np
+from src.api.batching import Histogram, MicroBatcher
+
+def test_histogram_buckets():
+    hist = Histogram((1, 2, 4))
+    for value in (1, 2, 3, 10):
+        hist.observe(value)
+    snap = hist.snapshot()
+    assert snap['buckets'] == {'1': 1, '2': 2, '4': 3, '+Inf': 4}
+    assert snap['count'] == 4
+    assert snap['sum'] == 16
+
+def test_micro_batcher_coalesces_concurrent_rows():
+    calls = []
+
+    def predict(X):
+        calls.append(X.shape[0])
+        return X[:, 0] / 100.0
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=500)
+        results = await asyncio.gather(*[batcher.submit(np.array([float(i), 0.0])) for i in range(20)])
+        metrics = batcher.metrics()
+        await batcher.stop()
+        return results, metrics
+
+    results, metrics = asyncio.run(run())
+    assert results == [i / 100.0 for i in range(20)]
+    assert calls == [8, 8, 4]
+    assert metrics['batch_size']['count'] == 3
+    assert metrics['queue_wait_ms']['count'] == 20
+
+def test_micro_batcher_propagates_errors():
+    def predict(X):
+        raise RuntimeError("model failed")
+
+    async def run():
+        batcher = MicroBatcher(predict, max_batch_size=4, max_wait_ms=1)
+        try:
+            await batcher.submit(np.zeros(2))
+        finally:
+            await batcher.stop()
+
+    try:
+        asyncio.run(run())
+    except RuntimeError as e:
+        assert str(e) == "model failed"
+    else:
+        raise AssertionError("expected the model error to reach the caller")
+
+def test_micro_batcher_scores_rows_with_their_own_predict():
+    calls = []
+
+    def model(offset):
+        def predict(X):
+            calls.append((offset, X.shape[0]))
+            return X[:, 0] + offset
+        return predict
+
+    old, new = model(100.0), model(200.0)
+
+    async def run():
+        batcher = MicroBatcher(max_batch_size=8, max_wait_ms=500)
+        results = await asyncio.gather(*[batcher.submit(np.array([float(i)]), old if i % 2 else new)
+                                         for i in range(6)])
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [i + (100.0 if i % 2 else 200.0) for i in range(6)]
+    assert sorted(calls) == [(100.0, 3), (200.0, 3)]
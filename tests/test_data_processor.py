@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from src.api.model_manager import ModelManager
+from src.data_processor import run_pipeline, create_model_dataset, save_model_dataset, TARGET_COLUMNS
+from src.model_training import load_training_data
+from src.score_store import ScoreStore, DEFAULT_SCORE_STORE_PATH
+from src.proxy_target_engineering import calculate_rfm, create_proxy_labels, merge_high_risk
+from src.storage import dataset_path, load_dataset, load_raw_transactions, open_feature_store, FEATURE_STORE_DIR
+
+def make_workspace(tmp_path, monkeypatch, raw_transactions):
+    (tmp_path / 'data' / 'raw').mkdir(parents=True)
+    (tmp_path / 'src').mkdir()
+    raw_path = tmp_path / 'data' / 'raw' / 'data.csv'
+    raw_transactions.to_csv(raw_path, index=False)
+    monkeypatch.chdir(tmp_path / 'src')
+    # An empty registry: batch runs find no model to precompute scores with
+    monkeypatch.setenv('MLFLOW_ALLOW_FILE_STORE', 'true')
+    monkeypatch.setenv('MLFLOW_TRACKING_URI', (tmp_path / 'mlruns').as_uri())
+    monkeypatch.setenv('MODEL_CACHE_DIR', str(tmp_path / 'models'))
+    return str(raw_path)
+
+def test_single_pass_pipeline_matches_stage_by_stage(tmp_path, monkeypatch, raw_transactions, capsys):
+    raw_path = make_workspace(tmp_path, monkeypatch, raw_transactions)
+    result = run_pipeline(raw_path, trace_memory=True)
+    report = capsys.readouterr().out
+    assert 'features + targets + rfm (concurrent)' in report
+    assert 'accounts will be scored on first request' in report
+    assert 'Peak (MB)' in report
+    for name in ['features', 'targets', 'model_data', 'model_data_with_proxy']:
+        assert load_dataset(name).shape[0] > 0
+    store = open_feature_store()
+    assert store.X.shape == (len(result), len(store.columns)) and 'num_total_amount' in store.columns
+    by_account = result.set_index('AccountId').loc[list(store.account_ids)]
+    assert (store.targets['is_high_risk'] == by_account['is_high_risk']).all()
+
+    # The stored rows are in the default split's order: training slices the map
+    data = load_training_data(FEATURE_STORE_DIR, cache_dir=str(tmp_path / 'cache'))
+    assert data.X_train.filename == store.X.filename and not (tmp_path / 'cache').exists()
+    assert not data.cache_hit
+    assert load_training_data(FEATURE_STORE_DIR, cache_dir=str(tmp_path / 'cache')).cache_hit
+    frame = load_training_data(dataset_path('model_data_with_proxy'), cache_dir=str(tmp_path / 'cache'))
+    np.testing.assert_allclose(data.X_train, frame.X_train)
+    np.testing.assert_array_equal(data.y_test, frame.y_test)
+
+    # The old flow: each stage loads the raw data on its own
+    create_model_dataset(load_raw_transactions(raw_path))
+    rfm_high_risk, account_customer_map = create_proxy_labels(load_raw_transactions(raw_path))
+    expected = merge_high_risk(dataset_path('model_data'), str(tmp_path / 'expected.parquet'),
+                               rfm_high_risk, account_customer_map)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False,
+                                  check_categorical=False)
+
+def test_batch_run_precomputes_account_scores(tmp_path, monkeypatch, raw_transactions):
+    make_workspace(tmp_path, monkeypatch, raw_transactions)
+    model_data = create_model_dataset(raw_transactions.copy())
+    feature_df = model_data.drop(columns=TARGET_COLUMNS)
+    X = feature_df.drop(columns='AccountId')
+    model = LogisticRegression().fit(X.iloc[:, ::-1], model_data['default_risk'])
+    manager = ModelManager(cache_dir=str(tmp_path / 'models'))
+    manager.swap('4', model)
+
+    save_model_dataset(model_data, feature_df, model_manager=manager)
+    store = ScoreStore(DEFAULT_SCORE_STORE_PATH)
+    expected = model.predict_proba(X.iloc[:, ::-1])[:, 1]
+    for i in [0, 5, len(X) - 1]:
+        assert abs(store.get_score(feature_df['AccountId'].iloc[i], '4') - expected[i]) < 1e-9
+    assert store.metrics()['misses'] == 0
+    store.close()
+
+def test_calculate_rfm_leaves_input_untouched(raw_transactions):
+    before = raw_transactions['TransactionStartTime'].copy()
+    calculate_rfm(raw_transactions)
+    pd.testing.assert_series_equal(raw_transactions['TransactionStartTime'], before)
+
+def test_vectorized_recency_and_fast_clustering_match(raw_transactions):
+    df = raw_transactions.assign(TransactionStartTime=pd.to_datetime(raw_transactions['TransactionStartTime']))
+    snapshot_date = df['TransactionStartTime'].max() + pd.Timedelta(days=1)
+    expected = df.groupby('CustomerId')['TransactionStartTime'].agg(lambda x: (snapshot_date - x.max()).days)
+    rfm = calculate_rfm(raw_transactions).set_index('CustomerId')
+    pd.testing.assert_series_equal(rfm['Recency'], expected, check_names=False)
+
+    labels = create_proxy_labels(raw_transactions, method='kmeans')[0].set_index('CustomerId')['is_high_risk']
+    sampled = create_proxy_labels(raw_transactions, method='sampled')[0].set_index('CustomerId')['is_high_risk']
+    minibatch = create_proxy_labels(raw_transactions, method='minibatch')[0].set_index('CustomerId')['is_high_risk']
+    pd.testing.assert_series_equal(sampled, labels)
+    assert (minibatch == labels).mean() >= 0.9
+
+def test_coded_and_chunked_merge_match_the_join(tmp_path, monkeypatch, raw_transactions):
+    from src.proxy_target_engineering import _join_high_risk
+    from src.storage import read_frame, write_frame
+    raw_path = make_workspace(tmp_path, monkeypatch, raw_transactions)
+    run_pipeline(raw_path, trace_memory=False)
+    rfm_high_risk, account_customer_map = create_proxy_labels(load_raw_transactions(raw_path))
+    # Drop a customer so some accounts fall back to the default label
+    rfm_high_risk = rfm_high_risk.iloc[1:]
+    for fmt in ['parquet', 'csv']:
+        main_path = str(tmp_path / f'model_data.{fmt}')
+        write_frame(load_dataset('model_data'), main_path)
+        expected_path = str(tmp_path / f'expected.{fmt}')
+        write_frame(_join_high_risk(read_frame(main_path), rfm_high_risk, account_customer_map), expected_path)
+        expected = read_frame(expected_path)
+        for chunksize in [None, 7]:
+            out_path = str(tmp_path / f'out_{chunksize}.{fmt}')
+            merge_high_risk(main_path, out_path, rfm_high_risk, account_customer_map, chunksize=chunksize)
+            pd.testing.assert_frame_equal(read_frame(out_path), expected)
+            if fmt == 'csv':
+                assert open(out_path).read() == open(expected_path).read()
+
+def test_persisted_proxy_model_reproduces_labels(tmp_path, raw_transactions):
+    from src.proxy_target_engineering import load_proxy_label_model, assign_proxy_label
+    model_path = str(tmp_path / 'proxy_label_model.json')
+    rfm_high_risk, _ = create_proxy_labels(raw_transactions, model_path=model_path)
+    model = load_proxy_label_model(model_path)
+    rfm = calculate_rfm(raw_transactions)
+    is_high_risk, _ = assign_proxy_label(rfm, model)
+    assert list(is_high_risk) == list(rfm_high_risk['is_high_risk'])
@@ -0,0 +1,129 @@
+import pandas as pd
+import pytest
+from src.feature_engineering import (
+    create_feature_pipeline, load_and_process_data, stream_customer_features
+)
+
+def in_memory_customer_features(df):
+    extraction = create_feature_pipeline().named_steps['feature_extraction']
+    return extraction.fit_transform(df)
+
+def test_streaming_matches_in_memory(raw_transactions, tmp_path):
+    path = tmp_path / 'data.csv'
+    raw_transactions.to_csv(path, index=False)
+    expected = in_memory_customer_features(pd.read_csv(path))
+    streamed = stream_customer_features(path, chunksize=137)
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, atol=2e-4)
+
+def test_streaming_load_and_process_data(raw_transactions, tmp_path):
+    path = tmp_path / 'data.csv'
+    raw_transactions.to_csv(path, index=False)
+    expected, _ = load_and_process_data(path)
+    streamed, pipeline = load_and_process_data(path, chunksize=500)
+    pd.testing.assert_frame_equal(streamed, expected, atol=1e-3)
+
+def test_streamed_pipeline_is_fitted(raw_transactions, tmp_path):
+    import numpy as np
+    from src.api.pydantic_models import TransactionRecord
+    from src.api.transactions import TransactionFeaturizer
+    path = tmp_path / 'data.csv'
+    raw_transactions.to_csv(path, index=False)
+    expected, in_memory = load_and_process_data(path)
+    _, pipeline = load_and_process_data(path, chunksize=500)
+    df = pd.read_csv(path)
+    features = pipeline.transform(df)
+    assert features.shape == (df['AccountId'].nunique(), len(expected.columns) - 1)
+    np.testing.assert_allclose(features, in_memory.transform(df), atol=1e-3)
+
+    account = raw_transactions[raw_transactions['AccountId'] == 'AccountId_7']
+    records = [TransactionRecord(**record) for record in account.to_dict('records')]
+    np.testing.assert_allclose(TransactionFeaturizer(pipeline).transform(records), pipeline.transform(account),
+                               atol=1e-9)
+
+def test_groupby_mode_matches_lambda_mode():
+    import numpy as np
+    from src.feature_engineering import groupby_mode
+    rng = np.random.RandomState(3)
+    keys = pd.Series(rng.choice(['b', 'a', 'c', 'd'], 400), name='AccountId')
+    values = pd.Series(rng.choice(['z', 'x', 'y', None], 400))
+    values[keys == 'd'] = None
+    expected = values.groupby(keys).agg(lambda x: x.mode().iloc[0] if len(x.mode()) > 0 else x.iloc[0])
+    for max_dense_cells in (10 ** 6, 0):
+        result = groupby_mode(keys, values.values, max_dense_cells=max_dense_cells)
+        pd.testing.assert_series_equal(result, expected, check_names=False)
+    ties = groupby_mode(pd.Series(['a', 'a', 'b', 'b']), ['y', 'x', 'x', 'y'])
+    assert list(ties) == ['x', 'x']
+
+def test_risk_extractor_uses_fitted_encodings(raw_transactions):
+    from src.feature_engineering import RiskFeatureExtractor
+    columns = ['category_fraud_rate', 'provider_fraud_rate', 'high_value_transaction', 'low_value_transaction']
+    extractor = RiskFeatureExtractor().fit(raw_transactions)
+    full = extractor.transform(raw_transactions)[columns]
+    batch = extractor.transform(raw_transactions.iloc[:5])[columns]
+    pd.testing.assert_frame_equal(batch, full.iloc[:5])
+    unseen = raw_transactions.iloc[:1].assign(ProductCategory='unseen', ProviderId='ProviderId_99')
+    scored = extractor.transform(unseen)
+    assert scored['category_fraud_rate'].iloc[0] == raw_transactions['FraudResult'].mean()
+    assert scored['provider_fraud_rate'].iloc[0] == raw_transactions['FraudResult'].mean()
+
+def test_shared_aggregates_give_features_and_targets(raw_transactions):
+    import numpy as np
+    from sklearn.preprocessing import LabelEncoder
+    from src.feature_engineering import build_features_and_aggregates
+    from src.target_generator import create_target_variable, targets_from_aggregates
+    feature_df, pipeline, aggregates = build_features_and_aggregates(raw_transactions)
+    expected = create_feature_pipeline().fit_transform(raw_transactions)
+    np.testing.assert_allclose(feature_df.drop(columns=['AccountId']).to_numpy(), expected)
+    
+    # The separate aggregation and encoding create_target_variable used to do
+    legacy = raw_transactions.groupby('AccountId').agg({
+        'FraudResult': ['sum', 'mean'], 'Value': ['mean', 'max'], 'Amount': ['mean', 'std']
+    }).round(4)
+    legacy.columns = ['fraud_count', 'fraud_rate', 'avg_value', 'max_value', 'avg_amount', 'amount_std']
+    legacy = legacy.reset_index()
+    targets = targets_from_aggregates(aggregates)
+    pd.testing.assert_frame_equal(targets[legacy.columns], legacy)
+    pd.testing.assert_frame_equal(create_target_variable(raw_transactions), targets)
+    assert targets['default_risk'].sum() > 0
+    encoded = LabelEncoder().fit_transform(targets['risk_category'])
+    assert list(targets['risk_category_encoded']) == list(encoded)
+
+def test_sparse_and_hashed_encodings(raw_transactions):
+    import numpy as np
+    from src.feature_engineering import build_features
+    from src.model_training import feature_matrix
+    dense_df, _ = build_features(raw_transactions)
+    sparse_df, pipeline = build_features(raw_transactions, sparse_output=True)
+    assert list(sparse_df.columns) == list(dense_df.columns)
+    assert all(isinstance(sparse_df[col].dtype, pd.SparseDtype) == col.startswith('cat_')
+               for col in sparse_df.columns if col != 'AccountId')
+    categorical = [col for col in sparse_df.columns if col.startswith('cat_')]
+    densified = sparse_df.copy()
+    densified[categorical] = sparse_df[categorical].sparse.to_dense()
+    pd.testing.assert_frame_equal(densified, dense_df)
+    matrix = feature_matrix(sparse_df.drop(columns='AccountId'), sparse_matrix=True)
+    np.testing.assert_array_equal(matrix.toarray(), dense_df.drop(columns='AccountId').to_numpy())
+
+    n_numeric = sum(col.startswith('num_') for col in dense_df.columns)
+    hashed, _ = build_features(raw_transactions, encoding='hashed', sparse_output=True, hash_size=16)
+    assert len(hashed.columns) - 1 - n_numeric == 16
+    assert (hashed.filter(like='cat_hash_').sum(axis=1) == 3).all()
+
+@pytest.mark.filterwarnings('ignore:Found unknown categories')
+def test_capped_encoding_buckets_rare_and_unseen_providers(raw_transactions):
+    import numpy as np
+    from src.feature_engineering import build_features
+    capped, pipeline = build_features(raw_transactions, encoding='capped', max_categories=3)
+    categorical = [col for col in capped.columns if col.startswith('cat_')]
+    # Each mode column has more than 3 categories: one kept, one dropped, the rest infrequent
+    assert len(categorical) == 6
+    # AccountId is the last column, so frame positions are matrix positions
+    providers = [capped.columns.get_loc(col) for col in categorical if col.startswith('cat_ProviderId_')]
+    infrequent = capped.columns.get_loc('cat_ProviderId_infrequent_sklearn')
+    encoder = pipeline.named_steps['preprocessor'].named_transformers_['cat']
+    rare = encoder.infrequent_categories_[1][0]
+
+    account = raw_transactions[raw_transactions['AccountId'] == 'AccountId_7']
+    for provider in [rare, 'ProviderId_99']:
+        row = pipeline.transform(account.assign(ProviderId=provider))[0]
+        assert row[infrequent] == 1 and row[providers].sum() == 1
@@ -0,0 +1,58 @@
+import joblib
+import numpy as np
+import pandas as pd
+from src.feature_engineering import create_feature_pipeline, build_features, build_features_and_aggregates
+from src.incremental_features import IncrementalCustomerAggregator, update_features
+from src.storage import save_dataset, load_dataset
+from tests.conftest import make_raw_transactions
+
+def full_recompute(df):
+    return create_feature_pipeline().named_steps['feature_extraction'].fit_transform(df)
+
+def test_incremental_matches_full_recompute(raw_transactions):
+    base, delta = raw_transactions.iloc[:1800], raw_transactions.iloc[1800:]
+    state = IncrementalCustomerAggregator()
+    state.update(base)
+    changed = state.update(delta)
+    expected = full_recompute(raw_transactions).set_index('AccountId')
+    emitted = state.to_features(changed).set_index('AccountId')
+    assert set(emitted.index) == set(delta['AccountId'])
+    pd.testing.assert_frame_equal(emitted, expected.loc[emitted.index], check_dtype=False, atol=2e-4)
+    pd.testing.assert_frame_equal(state.to_features().set_index('AccountId'), expected,
+                                  check_dtype=False, atol=2e-4)
+
+def test_update_features_matches_full_rebuild(raw_transactions, tmp_path):
+    base, delta = raw_transactions.iloc[:1900], raw_transactions.iloc[1900:]
+    feature_df, pipeline = build_features(base.copy())
+    save_dataset(feature_df, 'features', tmp_path)
+    joblib.dump(pipeline, tmp_path / 'feature_pipeline.pkl')
+    state = IncrementalCustomerAggregator()
+    state.update(base)
+    state.save(tmp_path / 'feature_state.pkl')
+    delta_path = tmp_path / 'delta.csv'
+    delta.to_csv(delta_path, index=False)
+
+    changed = update_features(delta_path, directory=tmp_path)
+    assert set(changed) == set(delta['AccountId'])
+    # Every row, including accounts with no new transactions, is rescaled with
+    # the statistics of all transactions; 1e-3 covers the 4-decimal rounding
+    # of the aggregated features before scaling
+    expected, full_pipeline, _ = build_features_and_aggregates(raw_transactions.copy())
+    updated = load_dataset('features', tmp_path)
+    assert list(updated.columns) == list(expected.columns)
+    pd.testing.assert_frame_equal(updated.set_index('AccountId'), expected.set_index('AccountId'),
+                                  check_dtype=False, atol=1e-3)
+
+    # The saved pipeline is refitted too, so it transforms new rows the same way
+    saved = joblib.load(tmp_path / 'feature_pipeline.pkl')
+    account = raw_transactions[raw_transactions['AccountId'] == 'AccountId_7']
+    np.testing.assert_allclose(saved.transform(account), full_pipeline.transform(account), atol=1e-3)
+
+def test_value_counts_are_bucketed_per_account():
+    rows = make_raw_transactions(n_rows=500, n_accounts=1)
+    rows['Value'] = np.arange(1000, 1500)
+    state = IncrementalCustomerAggregator()
+    state.update(rows)
+    # 500 distinct Values, but only the 51 three-digit roundings 1000..1500
+    assert len(state.account_counts('Value')) == 51
+    assert state.value_counts.sum() == 500
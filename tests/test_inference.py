@@ -0,0 +1,92 @@
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from src.api.inference import (
+    FEATURE_COLUMNS, risk_category, columns_to_records, records_to_matrix, score_matrix
+)
+
+def make_record(scale=1.0):
+    return {name: float(i + 1) * scale for i, name in enumerate(FEATURE_COLUMNS)}
+
+def fitted_model():
+    rng = np.random.RandomState(0)
+    X = rng.rand(50, len(FEATURE_COLUMNS)) * 50
+    y = (X[:, 0] > 25).astype(int)
+    return LogisticRegression().fit(X, y)
+
+def test_risk_category_vectorized():
+    assert risk_category(0.1) == 'low'
+    assert list(risk_category(np.array([0.1, 0.5, 0.9]))) == ['low', 'medium', 'high']
+
+def test_records_to_matrix_reports_errors_per_row():
+    bad = make_record()
+    bad['transaction_count'] = 'many'
+    X, valid_index, errors = records_to_matrix([make_record(), bad, 'not a record', make_record(2.0)])
+    assert X.shape == (2, len(FEATURE_COLUMNS))
+    assert valid_index == [0, 3]
+    assert set(errors) == {1, 2}
+    assert errors[1][0]['loc'] == ['transaction_count']
+    assert X[1, 0] == 2.0
+
+def test_batch_scores_match_row_by_row():
+    model = fitted_model()
+    records = [make_record(s) for s in (1, 2, 3)]
+    X, _, _ = records_to_matrix(records)
+    batch = score_matrix(model, X)
+    single = [model.predict_proba(X[i:i + 1])[0, 1] for i in range(len(records))]
+    np.testing.assert_allclose(batch, single)
+
+def test_columns_to_records():
+    records = columns_to_records({'a': [1, 2], 'b': [3, 4]})
+    assert records == [{'a': 1, 'b': 3}, {'a': 2, 'b': 4}]
+
+def test_compiled_scorers_match_predict_proba():
+    from sklearn.ensemble import RandomForestClassifier
+    from src.api.inference import compile_scorer, RowScorer
+    from src.api.pydantic_models import PredictionRequest
+    rng = np.random.RandomState(1)
+    X = rng.rand(200, len(FEATURE_COLUMNS)) * 50
+    y = ((X[:, 0] + X[:, 3] * rng.rand(200)) > 40).astype(int)
+    models = [
+        LogisticRegression(max_iter=500).fit(X, y),
+        RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0).fit(X, y),
+        RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y),
+    ]
+    for model in models:
+        score = compile_scorer(model)
+        np.testing.assert_allclose(score(X), model.predict_proba(X)[:, 1], rtol=0, atol=1e-12)
+        scorer = RowScorer(model)
+        request = PredictionRequest(**make_record(3))
+        row = scorer.row(request)
+        assert row.dtype == np.float64 and row.shape == (1, len(FEATURE_COLUMNS))
+        assert abs(scorer.score_request(request) - model.predict_proba(row)[0, 1]) < 1e-12
+
+def test_compiled_logistic_regression_saturates_without_warnings():
+    import warnings
+    from src.api.inference import compile_scorer
+    model = fitted_model()
+    extreme = np.vstack([np.full(len(FEATURE_COLUMNS), 1e6), np.full(len(FEATURE_COLUMNS), -1e6)])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        probabilities = compile_scorer(model)(extreme)
+    np.testing.assert_array_equal(probabilities, model.predict_proba(extreme)[:, 1])
+
+def test_unmappable_model_features_are_rejected():
+    import pandas as pd
+    import pytest
+    from src.api.inference import model_feature_order, RowScorer
+    rng = np.random.RandomState(0)
+    names = [f'num_{col}' for col in FEATURE_COLUMNS]
+    X = pd.DataFrame(rng.rand(50, len(names)), columns=names)
+    model = LogisticRegression().fit(X, np.arange(50) % 2)
+    with pytest.raises(ValueError, match='num_'):
+        model_feature_order(model)
+    scorer = RowScorer(model)
+    assert scorer.predict(X.to_numpy()[:2]).shape == (2,)
+    with pytest.raises(ValueError):
+        scorer.feature_order
+
+    with pytest.raises(ValueError, match='expects 3 features'):
+        model_feature_order(LogisticRegression().fit(rng.rand(50, 3), np.arange(50) % 2))
+    reordered = LogisticRegression().fit(pd.DataFrame(rng.rand(50, 3), columns=FEATURE_COLUMNS[2::-1]),
+                                         np.arange(50) % 2)
+    assert model_feature_order(reordered) == FEATURE_COLUMNS[2::-1]
@@ -0,0 +1,90 @@
+import asyncio
+import importlib
+import sys
+import threading
+import httpx
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from src.api.inference import FEATURE_COLUMNS
+
+class BlockedModel:
+    """Stand-in for a slow RandomForest: predict_proba waits until released"""
+    classes_ = np.array([0, 1])
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict_proba(self, X):
+        self.release.wait(10)
+        return np.tile([0.8, 0.2], (len(X), 1))
+
+def load_api(monkeypatch, model, **env):
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    sys.modules.pop('src.api.main', None)
+    main = importlib.import_module('src.api.main')
+    main.model_manager.swap('test', model)
+    return main
+
+def test_health_answers_while_predict_is_saturated(monkeypatch):
+    model = BlockedModel()
+    main = load_api(monkeypatch, model, INFERENCE_WORKERS='2', INFERENCE_MAX_QUEUE='4')
+    payload = {name: 1 for name in FEATURE_COLUMNS}
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            predictions = [asyncio.ensure_future(client.post('/predict', json=payload)) for _ in range(30)]
+            for _ in range(500):
+                if main.executor.in_flight == main.executor.capacity:
+                    break
+                await asyncio.sleep(0.01)
+            # Every worker is blocked inside predict_proba, yet /health answers
+            health = [await client.get('/health') for _ in range(10)]
+            pending = sum(not prediction.done() for prediction in predictions)
+            model.release.set()
+            responses = await asyncio.gather(*predictions)
+        return health, pending, responses
+
+    try:
+        health, pending, responses = asyncio.run(run())
+    finally:
+        model.release.set()
+        main.executor.shutdown()
+        sys.modules.pop('src.api.main', None)
+
+    assert all(response.status_code == 200 for response in health)
+    assert pending == 6
+    statuses = [r.status_code for r in responses]
+    # 2 running + 4 queued are accepted, the rest are shed with backpressure headers
+    assert statuses.count(200) == 6
+    assert statuses.count(503) == 24
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert rejected.headers['Retry-After'] == '1'
+    assert rejected.headers['X-Inference-Queue-Capacity'] == '6'
+
+def test_process_executor_scores_through_the_endpoints(monkeypatch):
+    rng = np.random.RandomState(0)
+    X = rng.randint(0, 10, (50, len(FEATURE_COLUMNS))).astype(float)
+    model = LogisticRegression(max_iter=1000).fit(X, (X[:, 0] > 4).astype(int))
+    main = load_api(monkeypatch, model, INFERENCE_EXECUTOR='process', INFERENCE_WORKERS='2')
+    records = [dict(zip(FEATURE_COLUMNS, row)) for row in X[:5]]
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            single = await client.post('/predict', json=records[0])
+            batch = await client.post('/predict/batch', json={'records': records})
+        return single, batch
+
+    try:
+        single, batch = asyncio.run(run())
+    finally:
+        main.executor.shutdown()
+        sys.modules.pop('src.api.main', None)
+
+    assert main.executor.kind == 'process'
+    expected = model.predict_proba(X[:5])[:, 1]
+    assert single.status_code == 200 and abs(single.json()['risk_probability'] - expected[0]) < 1e-9
+    assert batch.status_code == 200
+    np.testing.assert_allclose([r['risk_probability'] for r in batch.json()['results']], expected, atol=1e-9)
@@ -0,0 +1,59 @@
+import numpy as np
+import mlflow
+import mlflow.sklearn
+import pytest
+from mlflow.tracking import MlflowClient
+from sklearn.linear_model import LogisticRegression
+from src.api.model_manager import ModelManager, ModelUnavailableError
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setenv('MLFLOW_ALLOW_FILE_STORE', 'true')
+    monkeypatch.setenv('MLFLOW_TRACKING_URI', (tmp_path / 'mlruns').as_uri())
+    return tmp_path
+
+def register_model(name, C):
+    rng = np.random.RandomState(0)
+    X = rng.rand(40, 3)
+    y = (X[:, 0] > 0.5).astype(int)
+    model = LogisticRegression(C=C).fit(X, y)
+    with mlflow.start_run() as run:
+        mlflow.sklearn.log_model(model, "best_model")
+    version = mlflow.register_model(f"runs:/{run.info.run_id}/best_model", name)
+    MlflowClient().transition_model_version_stage(name, version.version, "Production")
+    return model
+
+class UnreachableRegistry:
+    def search_model_versions(self, filter_string):
+        raise ConnectionError("registry down")
+
+def test_lazy_load_cache_and_hot_swap(registry):
+    first = register_model('credit-risk-test', C=0.01)
+    manager = ModelManager('credit-risk-test', cache_dir=str(registry / 'cache'))
+    assert manager.current is None
+
+    in_flight = manager.get()
+    assert in_flight.version == '1'
+    assert (registry / 'cache' / 'credit-risk-test' / '1' / 'MLmodel').exists()
+    np.testing.assert_allclose(in_flight.model.coef_, first.coef_)
+    assert manager.refresh() is False
+
+    second = register_model('credit-risk-test', C=10.0)
+    swapped = []
+    manager.on_swap(swapped.append)
+    assert manager.refresh() is True
+    assert manager.current.version == '2'
+    assert [loaded.version for loaded in swapped] == ['2']
+    np.testing.assert_allclose(manager.current.model.coef_, second.coef_)
+    # A request that started before the swap keeps its own snapshot
+    assert in_flight.version == '1'
+    assert in_flight.scorer.predict(np.ones((1, 3))).shape == (1,)
+
+    # With the registry down a fresh process serves the newest cached version
+    offline = ModelManager('credit-risk-test', cache_dir=str(registry / 'cache'), client=UnreachableRegistry())
+    assert offline.get().version == '2'
+
+def test_no_registry_and_empty_cache(tmp_path):
+    manager = ModelManager('missing', cache_dir=str(tmp_path), client=UnreachableRegistry())
+    with pytest.raises(ModelUnavailableError):
+        manager.get()
@@ -0,0 +1,18 @@
+import pytest
+from sklearn.datasets import make_classification
+from src.model_search import SEARCH_MODES, model_families, make_search
+
+@pytest.mark.parametrize('mode', SEARCH_MODES)
+def test_search_modes_pick_from_the_baseline_grid(mode):
+    X, y = make_classification(n_samples=600, n_features=8, weights=[0.8], random_state=0)
+    for name, family in model_families().items():
+        search = make_search(family, mode, cv=3).fit(X, y)
+        resource = family['halving']['resource'] if mode == 'halving' else None
+        for param, value in search.best_params_.items():
+            if param != resource:
+                assert value in family['grid'][param]
+        assert search.predict_proba(X).shape == (len(X), 2)
+
+def test_unknown_search_mode():
+    with pytest.raises(ValueError):
+        make_search(model_families()['LogisticRegression'], 'random')
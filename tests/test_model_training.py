@@ -0,0 +1,94 @@
+import mlflow
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from src.model_training import TrainingConfig, load_training_data, train
+from src.storage import open_feature_store, read_frame, write_feature_store, write_frame
+
+@pytest.fixture
+def model_data(tmp_path, monkeypatch):
+    monkeypatch.setenv('MLFLOW_ALLOW_FILE_STORE', 'true')
+    monkeypatch.setenv('MLFLOW_TRACKING_URI', (tmp_path / 'mlruns').as_uri())
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.randn(300, 5), columns=[f'num_f{i}' for i in range(5)])
+    df['AccountId'] = [f'AccountId_{i}' for i in range(300)]
+    df['default_risk'] = rng.randint(0, 2, 300)
+    df['risk_score'] = rng.rand(300)
+    df['is_high_risk'] = (df['num_f0'] + 0.5 * rng.randn(300) > 0.8).astype(int)
+    return write_frame(df, str(tmp_path / 'model_data_with_proxy.parquet'))
+
+def test_train_returns_results_and_caches_split(model_data, tmp_path):
+    config = TrainingConfig(
+        data_path=model_data, cache_dir=str(tmp_path / 'cache'), n_jobs=2, register=False,
+        grids={'LogisticRegression': {'C': [0.1, 1]}, 'RandomForest': {'n_estimators': [10], 'max_depth': [3]}}
+    )
+    result = train(config)
+    assert {family.name for family in result.families} == {'LogisticRegression', 'RandomForest'}
+    assert result.best.metrics['f1'] == max(family.metrics['f1'] for family in result.families)
+    assert result.registered_version is None
+    assert list(result.best.estimator.feature_names_in_) == [f'num_f{i}' for i in range(5)]
+    assert all(family.fit_seconds > 0 and family.run_id for family in result.families)
+
+    data = load_training_data(model_data, cache_dir=str(tmp_path / 'cache'))
+    assert data.cache_hit and isinstance(data.X_train, np.memmap)
+    assert data.X_train.shape == (240, 5) and data.columns == [f'num_f{i}' for i in range(5)]
+
+def test_train_rejects_unknown_family(model_data, tmp_path):
+    with pytest.raises(ValueError):
+        train(TrainingConfig(data_path=model_data, cache_dir=str(tmp_path / 'cache'), families=('SVM',)))
+
+def test_train_on_sparse_split(model_data, tmp_path):
+    config = TrainingConfig(
+        data_path=model_data, cache_dir=str(tmp_path / 'cache'), n_jobs=1, register=False, sparse=True,
+        families=('LogisticRegression',), grids={'LogisticRegression': {'C': [1]}}
+    )
+    result = train(config)
+    assert list(result.best.estimator.feature_names_in_) == [f'num_f{i}' for i in range(5)]
+
+    data = load_training_data(model_data, cache_dir=str(tmp_path / 'cache'), sparse_matrix=True)
+    dense = load_training_data(model_data, cache_dir=str(tmp_path / 'cache'))
+    assert data.cache_hit and sparse.isspmatrix_csr(data.X_train)
+    np.testing.assert_array_equal(data.X_train.toarray(), dense.X_train)
+
+def test_feature_store_split_matches_frame(model_data, tmp_path):
+    df = read_frame(model_data)
+    columns = [f'num_f{i}' for i in range(5)]
+    write_feature_store(df, columns, ['is_high_risk', 'default_risk'], str(tmp_path / 'store'), dtype='float32')
+    store = open_feature_store(str(tmp_path / 'store'))
+    assert isinstance(store.X, np.memmap) and store.X.flags['C_CONTIGUOUS'] and store.X.dtype == np.float32
+    assert list(store.account_ids[:2]) == ['AccountId_0', 'AccountId_1']
+
+    frame = load_training_data(model_data, cache_dir=str(tmp_path / 'cache'))
+    stored = load_training_data(str(tmp_path / 'store'), cache_dir=str(tmp_path / 'cache'))
+    assert not stored.cache_hit and stored.columns == columns
+    np.testing.assert_array_equal(stored.y_test, frame.y_test)
+    np.testing.assert_allclose(stored.X_train, frame.X_train, rtol=1e-6)
+
+    result = train(TrainingConfig(data_path=str(tmp_path / 'store'), cache_dir=str(tmp_path / 'cache'), n_jobs=1,
+                                  register=False, families=('LogisticRegression',),
+                                  grids={'LogisticRegression': {'C': [1]}}))
+    assert result.cache_hit and list(result.best.estimator.feature_names_in_) == columns
+
+def test_loaded_splits_are_per_cache_dir(model_data, tmp_path):
+    first = load_training_data(model_data, cache_dir=str(tmp_path / 'first'))
+    second = load_training_data(model_data, cache_dir=str(tmp_path / 'second'))
+    assert not second.cache_hit
+    assert second.X_train.filename.startswith(str(tmp_path / 'second'))
+    assert load_training_data(model_data, cache_dir=str(tmp_path / 'first')).X_train is first.X_train
+
+def test_families_train_in_parallel_runs(model_data, tmp_path):
+    config = TrainingConfig(
+        data_path=model_data, cache_dir=str(tmp_path / 'cache'), n_jobs=2, parallel_families=2, register=False,
+        grids={'LogisticRegression': {'C': [0.1, 1]}, 'RandomForest': {'n_estimators': [10], 'max_depth': [3]}}
+    )
+    result = train(config)
+    assert len({family.run_id for family in result.families}) == 2
+    for family in result.families:
+        run = mlflow.get_run(family.run_id)
+        assert run.info.run_name == family.name and run.info.status == 'FINISHED'
+        assert {key: run.data.params[key] for key in family.best_params} == \
+            {key: str(value) for key, value in family.best_params.items()}
+        assert run.data.params['parallel_families'] == '2' and run.data.params['n_jobs'] == '1'
+        assert run.data.metrics['f1'] == family.metrics['f1']
+        assert family.cpu_seconds > 0 and run.data.metrics['fit_cpu_seconds'] == family.cpu_seconds
@@ -0,0 +1,72 @@
+import importlib
+import sys
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from sklearn.linear_model import LogisticRegression
+from src.score_store import ScoreStore
+
+def make_features(n=5):
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(n, 3), columns=['num_a', 'num_b', 'cat_c'])
+    df['AccountId'] = [f'AccountId_{i}' for i in range(n)]
+    return df
+
+def test_lru_tiers_and_version_invalidation(tmp_path):
+    path = str(tmp_path / 'scores.sqlite')
+    store = ScoreStore(path, memory_size=2)
+    assert store.write_features(make_features()) == 5
+    assert store.columns == ['num_a', 'num_b', 'cat_c']
+    np.testing.assert_allclose(store.get_features('AccountId_1', ['cat_c', 'num_a']),
+                               make_features().loc[1, ['cat_c', 'num_a']].to_numpy(dtype=float))
+    assert store.get_features('AccountId_99') is None
+
+    assert store.get_score('AccountId_0', '1') is None
+    for i in range(3):
+        store.put_score(f'AccountId_{i}', '1', i / 10)
+    assert store.evictions == 1
+    assert store.get_score('AccountId_2', '1') == 0.2   # memory tier
+    assert store.get_score('AccountId_0', '1') == 0.0   # evicted, served from SQLite
+    assert store.get_score('AccountId_0', '2') is None  # other model version
+    metrics = store.metrics()
+    assert (metrics['memory_hits'], metrics['store_hits'], metrics['misses']) == (1, 1, 2)
+
+    store.invalidate('2')
+    assert store.get_score('AccountId_0', '1') is None
+    store.close()
+
+    reopened = ScoreStore(path)
+    assert reopened.precompute_scores(lambda X: X[:, 0], '2', batch_size=2) == 5
+    assert reopened.get_score('AccountId_3', '2') == make_features().loc[3, 'num_a']
+    reopened.close()
+
+def test_account_endpoint(tmp_path, monkeypatch):
+    path = str(tmp_path / 'scores.sqlite')
+    features = make_features(20)
+    store = ScoreStore(path)
+    store.write_features(features)
+    store.close()
+
+    X = features[['num_b', 'num_a', 'cat_c']]
+    model = LogisticRegression().fit(X, (X['num_a'] > 0.5).astype(int))
+    monkeypatch.setenv('SCORE_STORE_PATH', path)
+    sys.modules.pop('src.api.main', None)
+    main = importlib.import_module('src.api.main')
+    try:
+        main.model_manager.swap('7', model)
+        client = TestClient(main.app)
+        first = client.get('/predict/account/AccountId_4').json()
+        second = client.get('/predict/account/AccountId_4').json()
+        assert first['cached'] is False and second['cached'] is True
+        assert first['model_version'] == '7'
+        expected = model.predict_proba(X.iloc[[4]])[0, 1]
+        assert abs(first['risk_probability'] - expected) < 1e-12
+        assert client.get('/predict/account/missing').status_code == 404
+        assert client.get('/metrics/score-cache').json()['memory_hits'] == 1
+
+        main.model_manager.swap('8', model)
+        assert client.get('/predict/account/AccountId_4').json()['cached'] is False
+    finally:
+        main.executor.shutdown()
+        main.score_store.close()
+        sys.modules.pop('src.api.main', None)
@@ -0,0 +1,94 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from src import storage
+from src.storage import dataset_path, frame_columns, load_dataset, read_frame, save_dataset, write_frame
+
+def make_model_data(n=50):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({
+        'AccountId': [f'AccountId_{i}' for i in range(n)],
+        'num_total_amount': rng.randn(n),
+        'cat_ProviderId_ProviderId_4': rng.randint(0, 2, n).astype(float),
+        'ProviderId': rng.choice(['ProviderId_1', 'ProviderId_4'], n),
+        'risk_category': rng.choice(['low_risk', 'high_risk'], n),
+        'default_risk': rng.randint(0, 2, n),
+    })
+
+@pytest.mark.parametrize('fmt', ['parquet', 'csv'])
+def test_roundtrip_keeps_dtypes_and_projects_columns(tmp_path, fmt):
+    df = make_model_data()
+    path = save_dataset(df, 'model_data', directory=str(tmp_path), fmt=fmt)
+    assert path.endswith('.' + fmt)
+    loaded = load_dataset('model_data', directory=str(tmp_path))
+    assert isinstance(loaded['ProviderId'].dtype, pd.CategoricalDtype)
+    assert loaded['default_risk'].dtype == np.int8
+    np.testing.assert_allclose(loaded['num_total_amount'], df['num_total_amount'])
+    assert frame_columns(path) == list(df.columns)
+
+    projected = read_frame(path, columns=['default_risk', 'num_total_amount'])
+    assert list(projected.columns) == ['default_risk', 'num_total_amount']
+
+def test_dataset_path_prefers_existing_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'DEFAULT_FORMAT', 'parquet')
+    assert dataset_path('targets', str(tmp_path)).endswith('targets.parquet')
+    write_frame(make_model_data(), str(tmp_path / 'targets.csv'))
+    assert dataset_path('targets', str(tmp_path)).endswith('targets.csv')
+    with pytest.raises(ValueError):
+        write_frame(make_model_data(), str(tmp_path / 'targets.txt'))
+
+def test_raw_schema_loader(raw_transactions, tmp_path, capsys):
+    from src.storage import load_raw_transactions, save_raw_transactions, iter_raw_transactions
+    path = str(tmp_path / 'data.csv')
+    raw_transactions.to_csv(path, index=False)
+    df = load_raw_transactions(path)
+    assert 'MB ->' in capsys.readouterr().out
+    assert pd.api.types.is_integer_dtype(df['TransactionId'])
+    assert df['TransactionId'].iloc[5] == 5
+    assert isinstance(df['AccountId'].dtype, pd.CategoricalDtype)
+    assert pd.api.types.is_datetime64_any_dtype(df['TransactionStartTime'])
+    assert df['FraudResult'].dtype == np.int8
+    assert df['Amount'].dtype == np.float64
+    assert df.memory_usage(deep=True).sum() < pd.read_csv(path).memory_usage(deep=True).sum() / 2
+
+    parquet_path = save_raw_transactions(raw_transactions, str(tmp_path / 'data.parquet'))
+    from_parquet = load_raw_transactions(parquet_path, verbose=False)
+    pd.testing.assert_frame_equal(from_parquet, df, check_categorical=False)
+    chunks = list(iter_raw_transactions(parquet_path, chunksize=700))
+    assert [len(chunk) for chunk in chunks] == [700, 700, 600]
+    assert not isinstance(chunks[0]['AccountId'].dtype, pd.CategoricalDtype)
+
+def test_compact_schema_gives_same_features(raw_transactions, tmp_path):
+    from src.feature_engineering import create_feature_pipeline
+    from src.storage import load_raw_transactions
+    path = str(tmp_path / 'data.csv')
+    raw_transactions.to_csv(path, index=False)
+    extraction = create_feature_pipeline().named_steps['feature_extraction']
+    expected = extraction.fit_transform(pd.read_csv(path))
+    result = extraction.fit_transform(load_raw_transactions(path, verbose=False))
+    result['AccountId'] = result['AccountId'].astype(str)
+    expected['AccountId'] = expected['AccountId'].astype(str)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def test_feature_store_rewrite_switches_versions(tmp_path):
+    from src.storage import open_feature_store, write_feature_store
+    directory = str(tmp_path / 'store')
+    df = make_model_data()
+    write_feature_store(df, ['num_total_amount'], ['default_risk'], directory)
+    old = open_feature_store(directory)
+    old_X = np.array(old.X)
+
+    df2 = make_model_data(80).assign(default_risk=1)
+    write_feature_store(df2, ['num_total_amount', 'cat_ProviderId_ProviderId_4'], ['default_risk'], directory)
+    # A reader of the old version keeps a consistent view of it
+    np.testing.assert_array_equal(old.X, old_X)
+    assert len(old.targets['default_risk']) == 50
+    new = open_feature_store(directory)
+    assert new.X.shape == (80, 2) and new.targets['default_risk'].all()
+    assert new.columns == ['num_total_amount', 'cat_ProviderId_ProviderId_4']
+
+    write_feature_store(df, ['num_total_amount'], ['default_risk'], directory)
+    versions = [name for name in os.listdir(directory) if name.startswith('version-')]
+    assert len(versions) == 2 and os.path.basename(os.path.dirname(old.X.filename)) not in versions
+    assert all(os.stat(os.path.join(directory, name)).st_mode & 0o777 == 0o755 for name in versions)
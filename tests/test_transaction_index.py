@@ -0,0 +1,37 @@
+import pandas as pd
+from src.transaction_index import TransactionIndex
+
+def filtered_window_features(df, snapshot_date, days):
+    """The per-snapshot DataFrame filter the index replaces"""
+    times = pd.to_datetime(df['TransactionStartTime'])
+    window = df[(times >= snapshot_date - pd.Timedelta(days=days)) & (times < snapshot_date)]
+    grouped = window.groupby('AccountId')
+    return pd.DataFrame({
+        f'txn_count_{days}d': grouped.size(),
+        f'value_sum_{days}d': grouped['Value'].sum(),
+        f'amount_sum_{days}d': grouped['Amount'].sum(),
+        f'fraud_count_{days}d': grouped['FraudResult'].sum(),
+        f'fraud_rate_{days}d': grouped['FraudResult'].mean().round(4),
+    })
+
+def test_windows_match_dataframe_filters(raw_transactions):
+    index = TransactionIndex.from_frame(raw_transactions)
+    times = pd.to_datetime(raw_transactions['TransactionStartTime'])
+    for snapshot_date in [times.min(), pd.Timestamp('2018-12-20T13:45:00Z'), times.max() + pd.Timedelta(days=1)]:
+        features = index.window_features(snapshot_date)
+        assert list(features.index) == sorted(raw_transactions['AccountId'].unique())
+        for days in (7, 30, 90):
+            expected = filtered_window_features(raw_transactions, snapshot_date, days)
+            expected = expected.reindex(features.index).fillna(0)
+            pd.testing.assert_frame_equal(features[expected.columns], expected, check_dtype=False)
+        last = times[times < snapshot_date].groupby(raw_transactions['AccountId']).max()
+        recency = (snapshot_date - last.reindex(features.index)).dt.days
+        pd.testing.assert_series_equal(features['recency_days'], recency.astype(float), check_names=False)
+
+def test_subset_of_accounts_and_naive_snapshot(raw_transactions):
+    index = TransactionIndex.from_frame(raw_transactions)
+    accounts = ['AccountId_7', 'AccountId_3']
+    subset = index.snapshots(['2018-12-01', '2019-01-01'], windows=(30,), accounts=accounts)
+    full = index.snapshots(['2018-12-01', '2019-01-01'], windows=(30,))
+    pd.testing.assert_frame_equal(subset, full.loc[[(date, account) for date in ['2018-12-01', '2019-01-01']
+                                                    for account in accounts]])
@@ -0,0 +1,82 @@
+import asyncio
+import importlib
+import sys
+import httpx
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from src.feature_engineering import build_features
+from src.api.pydantic_models import TransactionRecord
+from src.api.transactions import TransactionFeaturizer
+
+def account_transactions(raw_transactions, account_id):
+    rows = raw_transactions[raw_transactions['AccountId'] == account_id]
+    return rows, [TransactionRecord(**record) for record in rows.to_dict('records')]
+
+def test_featurizer_matches_pipeline_transform(raw_transactions):
+    feature_df, pipeline = build_features(raw_transactions.copy())
+    featurizer = TransactionFeaturizer(pipeline)
+    assert featurizer.feature_names == [col for col in feature_df.columns if col != 'AccountId']
+    for account_id in ['AccountId_1', 'AccountId_7', 'AccountId_42']:
+        rows, records = account_transactions(raw_transactions, account_id)
+        np.testing.assert_allclose(featurizer.transform(records), pipeline.transform(rows), atol=1e-9)
+
+def test_predict_transactions_endpoint(raw_transactions):
+    feature_df, pipeline = build_features(raw_transactions.copy())
+    X = feature_df.drop(columns='AccountId')
+    model = LogisticRegression().fit(X.iloc[:, ::-1], np.arange(len(X)) % 2)
+    sys.modules.pop('src.api.main', None)
+    main = importlib.import_module('src.api.main')
+    main.featurizer = TransactionFeaturizer(pipeline)
+    main.model_manager.swap('7', model)
+
+    rows, _ = account_transactions(raw_transactions, 'AccountId_7')
+    payload = {'account_id': 'AccountId_7',
+               'transactions': rows.drop(columns=['AccountId']).to_dict('records')}
+    expected = model.predict_proba(pd.DataFrame(pipeline.transform(rows), columns=X.columns).iloc[:, ::-1])[0, 1]
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            ok = await client.post('/predict/transactions', json=payload)
+            unknown = await client.post('/predict/transactions', json={
+                'transactions': [dict(payload['transactions'][0], ChannelId='ChannelId_99')] * 2})
+            main.model_manager.swap('8', LogisticRegression().fit(X.add_prefix('old_'), np.arange(len(X)) % 2))
+            mismatched = await client.post('/predict/transactions', json=payload)
+            return ok, unknown, mismatched
+
+    try:
+        ok, unknown, mismatched = asyncio.run(run())
+    finally:
+        main.executor.shutdown()
+        sys.modules.pop('src.api.main', None)
+    assert ok.status_code == 200
+    body = ok.json()
+    assert body['model_version'] == '7' and body['transaction_count'] == len(rows)
+    assert abs(body['risk_probability'] - expected) < 1e-9
+    assert unknown.status_code == 422
+    assert mismatched.status_code == 503 and 'old_num_total_amount' in mismatched.json()['detail']
+
+@pytest.mark.filterwarnings('ignore:Found unknown categories')
+def test_featurizer_with_capped_and_hashed_encodings(raw_transactions):
+    for encoding in ['capped', 'hashed']:
+        feature_df, pipeline = build_features(raw_transactions.copy(), encoding=encoding, sparse_output=True,
+                                              max_categories=3, hash_size=16)
+        featurizer = TransactionFeaturizer(pipeline)
+        assert featurizer.feature_names == [col for col in feature_df.columns if col != 'AccountId']
+        rows, records = account_transactions(raw_transactions, 'AccountId_7')
+        np.testing.assert_allclose(featurizer.transform(records), pipeline.transform(rows).toarray(), atol=1e-9)
+
+    # Capped: a rare (seen) or unseen provider goes to the infrequent column
+    feature_df, pipeline = build_features(raw_transactions.copy(), encoding='capped', max_categories=3)
+    featurizer = TransactionFeaturizer(pipeline)
+    encoder = pipeline.named_steps['preprocessor'].named_transformers_['cat']
+    infrequent = featurizer.feature_names.index('cat_ProviderId_infrequent_sklearn')
+    providers = [i for i, name in enumerate(featurizer.feature_names) if name.startswith('cat_ProviderId_')]
+    rows, _ = account_transactions(raw_transactions, 'AccountId_7')
+    for provider in [encoder.infrequent_categories_[1][0], 'ProviderId_99']:
+        changed = rows.assign(ProviderId=provider)
+        row = featurizer.transform([TransactionRecord(**record) for record in changed.to_dict('records')])[0]
+        assert row[infrequent] == 1 and row[providers].sum() == 1
+        np.testing.assert_allclose(row, pipeline.transform(changed)[0], atol=1e-9)